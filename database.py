@@ -14,6 +14,9 @@ Tables:
 
 import os
 import json
+import queue
+import asyncio
+import orjson
 import aiosqlite
 from datetime import datetime
 from typing import Dict, List, Optional, Any
@@ -21,6 +24,98 @@ import gzip
 
 DB_FILE = "world.db"
 MAX_HISTORY_CACHE = int(os.getenv("MAX_HISTORY_CACHE", "500"))
+# Memory-mapped I/O window for reads (full-table scans: export, startup load). 0 disables.
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache in KiB (negative = size, not pages) and WAL checkpoint threshold in pages
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_WAL_AUTOCHECKPOINT = int(os.getenv("DB_WAL_AUTOCHECKPOINT", "1000"))
+# Extra read-only connections for per-action searches (WAL lets them read while the writer commits).
+# Each aiosqlite connection has its own thread; 0 = everything shares the writer connection.
+DB_READ_CONNECTIONS = int(os.getenv("DB_READ_CONNECTIONS", "2"))
+
+
+def _dumps(obj) -> str:
+    """
+    JSON column encode (orjson, C-level) — still stored as UTF-8 TEXT, readable by json.loads.
+    Falls back to json.dumps for what orjson rejects (ints beyond 64 bits).
+    """
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        return json.dumps(obj, ensure_ascii=False)
+
+def _loads(text):
+    """
+    JSON column decode (orjson).
+    Rows written by the old json.dumps may hold NaN / Infinity, which orjson rejects → json.loads.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+# Chunks are joined into ~1 MiB batches before crossing to the writer thread
+STREAM_BATCH_CHARS = 1 << 20
+STREAM_QUEUE_BATCHES = 8
+
+async def write_text_stream(opener, chunks) -> None:
+    """
+    Write an async iterator of str chunks to the file returned by opener().
+    open / (gzip) compression / write() all run in one worker thread; the event loop only
+    batches chunks onto a bounded queue (waits in a thread only when the writer falls behind).
+    """
+    batches: queue.Queue = queue.Queue(maxsize=STREAM_QUEUE_BATCHES)
+    
+    def drain():
+        error = None
+        f = None
+        try:
+            f = opener()
+        except Exception as e:
+            error = e
+        # Keep consuming until the sentinel even after an error, so the producer never blocks forever
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if error is None:
+                try:
+                    f.write("".join(batch))
+                except Exception as e:
+                    error = e
+        if f is not None:
+            try:
+                f.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+    
+    async def put(batch):
+        if batches.full():
+            await asyncio.to_thread(batches.put, batch)
+        else:
+            batches.put_nowait(batch)  # single producer: only the writer frees slots
+    
+    writer = asyncio.ensure_future(asyncio.to_thread(drain))
+    batch: List[str] = []
+    size = 0
+    try:
+        async for chunk in chunks:
+            batch.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_BATCH_CHARS:
+                await put(batch)
+                batch, size = [], 0
+        if batch:
+            await put(batch)
+    except BaseException:
+        # Producer failed: still let the writer close the file, but keep the original error
+        await put(None)
+        await asyncio.gather(writer, return_exceptions=True)
+        raise
+    await put(None)
+    await writer
 
 # ╔═══════════════════════════════════════════════════════════════════════════════╗
 # ║                         DATABASE SCHEMA                                        ║
@@ -137,6 +232,8 @@ class Database:
     def __init__(self, db_path: str = DB_FILE):
         self.db_path = db_path
         self._connection: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._next_reader = 0
     
     async def connect(self):
         """Connect to database and initialize schema"""
@@ -144,9 +241,15 @@ class Database:
         self._connection.row_factory = aiosqlite.Row
         
         # Optimize for high concurrency and robustness
+        # WAL + synchronous=NORMAL: commits no longer fsync; durability is per checkpoint
+        # (a power loss can drop the last few commits, never corrupt the DB) — fine for a game world
         await self._connection.execute("PRAGMA journal_mode=WAL")
         await self._connection.execute("PRAGMA synchronous=NORMAL")
         await self._connection.execute("PRAGMA busy_timeout=5000")
+        await self._connection.execute("PRAGMA temp_store=MEMORY")
+        await self._connection.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        await self._connection.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        await self._connection.execute(f"PRAGMA wal_autocheckpoint={DB_WAL_AUTOCHECKPOINT}")
         
         await self._connection.executescript(SCHEMA)
         
@@ -175,11 +278,24 @@ class Database:
             await self._connection.commit()
         except Exception as e:
             print(f"[DB MIGRATION ERROR] {e}")
+        
+        # Reader connections (after schema/migrations so they see the final tables)
+        if self.db_path != ":memory:":
+            for _ in range(DB_READ_CONNECTIONS):
+                reader = await aiosqlite.connect(self.db_path)
+                reader.row_factory = aiosqlite.Row
+                await reader.execute("PRAGMA query_only=ON")
+                await reader.execute("PRAGMA busy_timeout=5000")
+                await reader.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+                self._readers.append(reader)
             
-        print(f"[DB] Connected to {self.db_path} (WAL mode enabled)")
+        print(f"[DB] Connected to {self.db_path} (WAL mode enabled, {len(self._readers)} reader connections)")
     
     async def close(self):
         """Close database connection"""
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
         if self._connection:
             await self._connection.close()
             self._connection = None
@@ -191,6 +307,14 @@ class Database:
             raise RuntimeError("Database not connected")
         return self._connection
     
+    @property
+    def reader(self) -> aiosqlite.Connection:
+        """Read-only connection for searches (round-robin); the writer connection if none are open"""
+        if not self._readers:
+            return self.conn
+        self._next_reader = (self._next_reader + 1) % len(self._readers)
+        return self._readers[self._next_reader]
+    
     # ═══════════════════════════════════════════════════════════════════
     #                           USERS
     # ═══════════════════════════════════════════════════════════════════
@@ -205,56 +329,71 @@ class Database:
                 return self._row_to_user_dict(row)
         return None
     
+    _USER_UPSERT_SQL = """
+        INSERT INTO users (uuid, nickname, x, y, z, status, inventory, attributes, skills, name_set, is_dead, time_offset, last_exercise)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(uuid) DO UPDATE SET
+            nickname = excluded.nickname,
+            x = excluded.x,
+            y = excluded.y,
+            z = excluded.z,
+            status = excluded.status,
+            inventory = excluded.inventory,
+            attributes = excluded.attributes,
+            skills = excluded.skills,
+            name_set = excluded.name_set,
+            is_dead = excluded.is_dead,
+            time_offset = excluded.time_offset,
+            last_exercise = excluded.last_exercise
+    """
+    
+    @staticmethod
+    def user_row(uuid: str, data: dict) -> tuple:
+        """Serialize user dict into an immutable column tuple (for save_user_rows)"""
+        position = data.get("position", {"x": 0, "y": 0, "z": 0})
+        if isinstance(position, list):
+            x, y = position[0], position[1]
+            z = position[2] if len(position) > 2 else 0
+        else:
+            x = position.get("x", 0)
+            y = position.get("y", 0)
+            z = position.get("z", 0)
+        return (
+            uuid,
+            data.get("nickname", "Unknown"),
+            int(x), int(y), int(z),
+            data.get("status", "Healthy"),
+            _dumps(data.get("inventory", {})),
+            _dumps(data.get("attributes", {})),
+            _dumps(data.get("skills", {})),
+            1 if data.get("name_set", False) else 0,
+            1 if data.get("is_dead", False) else 0,
+            float(data.get("time_offset", 0)),
+            _dumps(data.get("last_exercise", {}))
+        )
+    
     async def save_user(self, uuid: str, data: dict) -> bool:
         """Insert or update user"""
         try:
-            inventory = json.dumps(data.get("inventory", {}), ensure_ascii=False)
-            attributes = json.dumps(data.get("attributes", {}), ensure_ascii=False)
-            skills = json.dumps(data.get("skills", {}), ensure_ascii=False)
-            position = data.get("position", {"x": 0, "y": 0, "z": 0})
-            if isinstance(position, list):
-                x, y = position[0], position[1]
-                z = position[2] if len(position) > 2 else 0
-            else:
-                x = position.get("x", 0)
-                y = position.get("y", 0)
-                z = position.get("z", 0)
-            
-            await self.conn.execute("""
-                INSERT INTO users (uuid, nickname, x, y, z, status, inventory, attributes, skills, name_set, is_dead, time_offset, last_exercise)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(uuid) DO UPDATE SET
-                    nickname = excluded.nickname,
-                    x = excluded.x,
-                    y = excluded.y,
-                    z = excluded.z,
-                    status = excluded.status,
-                    inventory = excluded.inventory,
-                    attributes = excluded.attributes,
-                    skills = excluded.skills,
-                    name_set = excluded.name_set,
-                    is_dead = excluded.is_dead,
-                    time_offset = excluded.time_offset,
-                    last_exercise = excluded.last_exercise
-            """, (
-                uuid,
-                data.get("nickname", "Unknown"),
-                int(x), int(y), int(z),
-                data.get("status", "Healthy"),
-                inventory,
-                attributes,
-                skills,
-                1 if data.get("name_set", False) else 0,
-                1 if data.get("is_dead", False) else 0,
-                float(data.get("time_offset", 0)),
-                json.dumps(data.get("last_exercise", {}), ensure_ascii=False)
-            ))
+            await self.conn.execute(self._USER_UPSERT_SQL, self.user_row(uuid, data))
             await self.conn.commit()
             return True
         except Exception as e:
             print(f"[DB ERROR] save_user: {e}")
             return False
     
+    async def save_user_rows(self, rows: List[tuple]) -> bool:
+        """Bulk upsert pre-serialized user rows (one executemany, one commit)"""
+        if not rows:
+            return True
+        try:
+            await self.conn.executemany(self._USER_UPSERT_SQL, rows)
+            await self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"[DB ERROR] save_user_rows: {e}")
+            return False
+    
     async def get_all_users(self) -> Dict[str, dict]:
         """Get all users as dict[uuid -> user_data]"""
         users = {}
@@ -270,12 +409,12 @@ class Database:
             "name_set": bool(row["name_set"]),
             "position": {"x": row["x"], "y": row["y"], "z": row["z"]},
             "status": row["status"],
-            "inventory": json.loads(row["inventory"] or "{}"),
-            "attributes": json.loads(row["attributes"] or "{}"),
-            "skills": json.loads(row["skills"] or "{}"),
+            "inventory": _loads(row["inventory"] or "{}"),
+            "attributes": _loads(row["attributes"] or "{}"),
+            "skills": _loads(row["skills"] or "{}"),
             "is_dead": bool(row["is_dead"]),
             "time_offset": float(row["time_offset"] or 0),
-            "last_exercise": json.loads(row["last_exercise"] or "{}"),
+            "last_exercise": _loads(row["last_exercise"] or "{}"),
             "created_at": row["created_at"]
         }
     
@@ -293,39 +432,66 @@ class Database:
                 return self._row_to_object_dict(row)
         return None
     
+    _OBJECT_UPSERT_SQL = """
+        INSERT INTO objects (id, name, x, y, z, description, properties, indestructible, creator)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            x = excluded.x,
+            y = excluded.y,
+            z = excluded.z,
+            description = excluded.description,
+            properties = excluded.properties,
+            indestructible = excluded.indestructible,
+            creator = excluded.creator
+    """
+    
+    @staticmethod
+    def object_row(obj_id: str, data: dict) -> tuple:
+        """Serialize object dict into an immutable column tuple (for save_object_row)"""
+        properties = _dumps(data.get("properties", {}))
+        position = data.get("position", [0, 0, 0])
+        if isinstance(position, list):
+            x = position[0] if len(position) > 0 else 0
+            y = position[1] if len(position) > 1 else 0
+            z = position[2] if len(position) > 2 else 0
+        else:
+            x, y, z = 0, 0, 0
+        return (
+            obj_id,
+            data.get("name", obj_id),
+            int(x), int(y), int(z),
+            data.get("description", ""),
+            properties,
+            1 if data.get("indestructible", False) else 0,
+            data.get("creator")
+        )
+    
     async def save_object(self, obj_id: str, data: dict) -> bool:
         """Insert or update object"""
         try:
-            properties = json.dumps(data.get("properties", {}), ensure_ascii=False)
-            position = data.get("position", [0, 0, 0])
-            if isinstance(position, list):
-                x = position[0] if len(position) > 0 else 0
-                y = position[1] if len(position) > 1 else 0
-                z = position[2] if len(position) > 2 else 0
-            else:
-                x, y, z = 0, 0, 0
-            
-            await self.conn.execute("""
-                INSERT INTO objects (id, name, x, y, z, description, properties, indestructible, creator)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name = excluded.name,
-                    x = excluded.x,
-                    y = excluded.y,
-                    z = excluded.z,
-                    description = excluded.description,
-                    properties = excluded.properties,
-                    indestructible = excluded.indestructible,
-                    creator = excluded.creator
-            """, (
-                obj_id,
-                data.get("name", obj_id),
-                int(x), int(y), int(z),
-                data.get("description", ""),
-                properties,
-                1 if data.get("indestructible", False) else 0,
-                data.get("creator")
-            ))
+            row = self.object_row(obj_id, data)
+        except Exception as e:
+            print(f"[DB ERROR] save_object: {e}")
+            return False
+        return await self.save_object_row(row)
+    
+    async def save_object_rows(self, rows: List[tuple]) -> bool:
+        """Bulk upsert pre-serialized object rows (one executemany, one commit)"""
+        if not rows:
+            return True
+        try:
+            await self.conn.executemany(self._OBJECT_UPSERT_SQL, rows)
+            await self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"[DB ERROR] save_object_rows: {e}")
+            return False
+    
+    async def save_object_row(self, row: tuple) -> bool:
+        """Insert or update object from a pre-serialized row (see object_row)"""
+        try:
+            await self.conn.execute(self._OBJECT_UPSERT_SQL, row)
             await self.conn.commit()
             return True
         except Exception as e:
@@ -368,7 +534,7 @@ class Database:
             "name": row["name"],
             "position": [row["x"], row["y"], row["z"]],
             "description": row["description"],
-            "properties": json.loads(row["properties"] or "{}"),
+            "properties": _loads(row["properties"] or "{}"),
             "indestructible": bool(row["indestructible"]),
             "creator": row["creator"]
         }
@@ -387,32 +553,38 @@ class Database:
                 return self._row_to_material_dict(row)
         return None
     
+    _MATERIAL_UPSERT_SQL = """
+        INSERT INTO materials (id, name, name_en, type, recipe, description, properties, creator, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            name_en = excluded.name_en,
+            type = excluded.type,
+            recipe = excluded.recipe,
+            description = excluded.description,
+            properties = excluded.properties,
+            creator = excluded.creator
+    """
+    
+    @staticmethod
+    def material_row(material_id: str, data: dict) -> tuple:
+        """Serialize material dict into an immutable column tuple (for write_rows)"""
+        return (
+            material_id,
+            data.get("name", material_id),
+            data.get("name_en", data.get("name", material_id)),
+            data.get("type", "invented"),
+            data.get("recipe", ""),
+            data.get("description", ""),
+            _dumps(data.get("properties", {})),
+            data.get("creator"),
+            data.get("created_at", datetime.now().isoformat())
+        )
+    
     async def save_material(self, material_id: str, data: dict) -> bool:
         """Insert or update material"""
         try:
-            properties = json.dumps(data.get("properties", {}), ensure_ascii=False)
-            await self.conn.execute("""
-                INSERT INTO materials (id, name, name_en, type, recipe, description, properties, creator, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name = excluded.name,
-                    name_en = excluded.name_en,
-                    type = excluded.type,
-                    recipe = excluded.recipe,
-                    description = excluded.description,
-                    properties = excluded.properties,
-                    creator = excluded.creator
-            """, (
-                material_id,
-                data.get("name", material_id),
-                data.get("name_en", data.get("name", material_id)),
-                data.get("type", "invented"),
-                data.get("recipe", ""),
-                data.get("description", ""),
-                properties,
-                data.get("creator"),
-                data.get("created_at", datetime.now().isoformat())
-            ))
+            await self.conn.execute(self._MATERIAL_UPSERT_SQL, self.material_row(material_id, data))
             await self.conn.commit()
             return True
         except Exception as e:
@@ -439,7 +611,7 @@ class Database:
             "type": row["type"],
             "recipe": row["recipe"],
             "description": row["description"],
-            "properties": json.loads(row["properties"] or "{}"),
+            "properties": _loads(row["properties"] or "{}"),
             "creator": row["creator"],
             "created_at": row["created_at"]
         }
@@ -458,39 +630,73 @@ class Database:
                 return self._row_to_object_type_dict(row)
         return None
     
+    _OBJECT_TYPE_UPSERT_SQL = """
+        INSERT INTO object_types (id, name, name_en, category, base_materials, description, properties, creator, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            name_en = excluded.name_en,
+            category = excluded.category,
+            base_materials = excluded.base_materials,
+            description = excluded.description,
+            properties = excluded.properties,
+            creator = excluded.creator
+    """
+    
+    @staticmethod
+    def object_type_row(type_id: str, data: dict) -> tuple:
+        """Serialize object type dict into an immutable column tuple (for write_rows)"""
+        return (
+            type_id,
+            data.get("name", type_id),
+            data.get("name_en", data.get("name", type_id)),
+            data.get("category", "misc"),
+            _dumps(data.get("base_materials", [])),
+            data.get("description", ""),
+            _dumps(data.get("properties", {})),
+            data.get("creator"),
+            data.get("created_at", datetime.now().isoformat())
+        )
+    
     async def save_object_type(self, type_id: str, data: dict) -> bool:
         """Insert or update object type (blueprint)"""
         try:
-            properties = json.dumps(data.get("properties", {}), ensure_ascii=False)
-            base_materials = json.dumps(data.get("base_materials", []), ensure_ascii=False)
-            await self.conn.execute("""
-                INSERT INTO object_types (id, name, name_en, category, base_materials, description, properties, creator, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name = excluded.name,
-                    name_en = excluded.name_en,
-                    category = excluded.category,
-                    base_materials = excluded.base_materials,
-                    description = excluded.description,
-                    properties = excluded.properties,
-                    creator = excluded.creator
-            """, (
-                type_id,
-                data.get("name", type_id),
-                data.get("name_en", data.get("name", type_id)),
-                data.get("category", "misc"),
-                base_materials,
-                data.get("description", ""),
-                properties,
-                data.get("creator"),
-                data.get("created_at", datetime.now().isoformat())
-            ))
+            await self.conn.execute(self._OBJECT_TYPE_UPSERT_SQL, self.object_type_row(type_id, data))
             await self.conn.commit()
             return True
         except Exception as e:
             print(f"[DB ERROR] save_object_type: {e}")
             return False
     
+    async def write_rows(self, upserts: Dict[str, List[tuple]], deletes: Dict[str, List[str]]) -> bool:
+        """
+        Apply a write-behind batch in ONE transaction (one executemany per table, single commit).
+        upserts: table -> pre-serialized rows (user_row / object_row / material_row / object_type_row)
+        deletes: table -> primary keys (only "objects" supports deletion)
+        """
+        upsert_sql = {
+            "users": self._USER_UPSERT_SQL,
+            "objects": self._OBJECT_UPSERT_SQL,
+            "materials": self._MATERIAL_UPSERT_SQL,
+            "object_types": self._OBJECT_TYPE_UPSERT_SQL,
+        }
+        try:
+            for table, rows in upserts.items():
+                if rows:
+                    await self.conn.executemany(upsert_sql[table], rows)
+            object_deletes = deletes.get("objects")
+            if object_deletes:
+                await self.conn.executemany("DELETE FROM objects WHERE id = ?", [(k,) for k in object_deletes])
+            await self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"[DB ERROR] write_rows: {e}")
+            try:
+                await self.conn.rollback()
+            except Exception:
+                pass
+            return False
+    
     async def get_all_object_types(self) -> Dict[str, dict]:
         """Get all object types as dict"""
         types = {"_README": {"description": "User-created object blueprints registry", "total_blueprints": 0}}
@@ -509,9 +715,9 @@ class Database:
             "name": row["name"],
             "name_en": row["name_en"],
             "category": row["category"],
-            "base_materials": json.loads(row["base_materials"] or "[]"),
+            "base_materials": _loads(row["base_materials"] or "[]"),
             "description": row["description"],
-            "properties": json.loads(row["properties"] or "{}"),
+            "properties": _loads(row["properties"] or "{}"),
             "creator": row["creator"],
             "created_at": row["created_at"]
         }
@@ -533,6 +739,24 @@ class Database:
             print(f"[DB ERROR] add_log: {e}")
             return False
     
+    async def add_logs(self, entries: List[dict]) -> bool:
+        """Add multiple history log entries in one transaction (executemany + single commit)"""
+        if not entries:
+            return True
+        try:
+            await self.conn.executemany("""
+                INSERT INTO logs (timestamp, actor, action, result)
+                VALUES (?, ?, ?, ?)
+            """, [
+                (e.get("timestamp"), e.get("actor"), e.get("action", ""), e.get("result", ""))
+                for e in entries
+            ])
+            await self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"[DB ERROR] add_logs: {e}")
+            return False
+    
     async def get_recent_logs(self, limit: int = 100) -> List[dict]:
         """Get recent log entries"""
         logs = []
@@ -567,7 +791,7 @@ class Database:
         logs = []
         pattern = f"%{query}%"
         try:
-            async with self.conn.execute(
+            async with self.reader.execute(
                 "SELECT * FROM logs WHERE (action LIKE ? OR result LIKE ?) ORDER BY id DESC LIMIT ?",
                 (pattern, pattern, limit)
             ) as cursor:
@@ -587,7 +811,7 @@ class Database:
         """Get logs for a specific actor"""
         logs = []
         try:
-            async with self.conn.execute(
+            async with self.reader.execute(
                 "SELECT * FROM logs WHERE actor = ? ORDER BY id DESC LIMIT ?",
                 (actor, limit)
             ) as cursor:
@@ -608,7 +832,7 @@ class Database:
         objs = []
         pattern = f"%{query}%"
         try:
-            async with self.conn.execute(
+            async with self.reader.execute(
                 "SELECT * FROM objects WHERE (name LIKE ? OR description LIKE ?) ORDER BY created_at DESC LIMIT ?",
                 (pattern, pattern, limit)
             ) as cursor:
@@ -618,7 +842,7 @@ class Database:
                         "name": r["name"],
                         "position": [r["x"], r["y"], r["z"]],
                         "description": r["description"],
-                        "properties": json.loads(r["properties"] or "{}")
+                        "properties": _loads(r["properties"] or "{}")
                     })
         except Exception as e:
             print(f"[DB ERROR] search_objects: {e}")
@@ -676,24 +900,17 @@ class Database:
         base_name = f"logs_{date_tag}_{min_id}-{max_id}.jsonl"
         archive_path = os.path.join(archive_dir, base_name + (".gz" if compress_gzip else ""))
 
-        # Stream rows to file (avoid loading everything into RAM)
-        opener = (lambda p: gzip.open(p, "wt", encoding="utf-8")) if compress_gzip else (lambda p: open(p, "w", encoding="utf-8"))
+        # Stream rows to file (avoid loading everything into RAM; compression + writes in a worker thread)
+        opener = (lambda: gzip.open(archive_path, "wt", encoding="utf-8")) if compress_gzip else (lambda: open(archive_path, "w", encoding="utf-8"))
         written = 0
-        with opener(archive_path) as f:
-            async with self.conn.execute(
-                "SELECT id, timestamp, actor, action, result FROM logs WHERE id < ? ORDER BY id",
-                (cutoff_id,),
-            ) as cursor:
-                async for r in cursor:
-                    rec = {
-                        "id": int(r["id"]),
-                        "timestamp": r["timestamp"],
-                        "actor": r["actor"],
-                        "action": r["action"],
-                        "result": r["result"],
-                    }
-                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                    written += 1
+        
+        async def lines():
+            nonlocal written
+            async for rec in self._iter_log_records("id < ?", (cutoff_id,)):
+                yield _dumps(rec) + "\n"
+                written += 1
+        
+        await write_text_stream(opener, lines())
 
         # Trim old rows from DB
         await self.conn.execute("DELETE FROM logs WHERE id < ?", (cutoff_id,))
@@ -709,6 +926,37 @@ class Database:
             "path": archive_path,
         }
     
+    async def append_logs_to_jsonl(self, path: str, after_id: int = 0) -> int:
+        """
+        Append log rows with id > after_id to a JSONL file (incremental history backup).
+        Returns the last appended id (after_id if nothing new).
+        """
+        last_id = after_id
+        
+        async def lines():
+            nonlocal last_id
+            async for rec in self._iter_log_records("id > ?", (after_id,)):
+                yield _dumps(rec) + "\n"
+                last_id = rec["id"]
+        
+        await write_text_stream(lambda: open(path, "a", encoding="utf-8"), lines())
+        return last_id
+    
+    async def _iter_log_records(self, where: str, params: tuple):
+        """Log rows as archive/backup records (id order)"""
+        async with self.conn.execute(
+            f"SELECT id, timestamp, actor, action, result FROM logs WHERE {where} ORDER BY id",
+            params,
+        ) as cursor:
+            async for r in cursor:
+                yield {
+                    "id": int(r["id"]),
+                    "timestamp": r["timestamp"],
+                    "actor": r["actor"],
+                    "action": r["action"],
+                    "result": r["result"],
+                }
+    
     # ═══════════════════════════════════════════════════════════════════
     #                           SUPPORTERS
     # ═══════════════════════════════════════════════════════════════════
@@ -779,9 +1027,8 @@ class Database:
     async def save_natural_element(self, name: str, data: dict) -> bool:
         """Insert or update natural element"""
         try:
-            properties = json.dumps({k: v for k, v in data.items() 
-                                    if k not in ["name", "type", "hardness", "density", "melting_point", "boiling_point", "flammable"]},
-                                   ensure_ascii=False)
+            properties = _dumps({k: v for k, v in data.items() 
+                                 if k not in ["name", "type", "hardness", "density", "melting_point", "boiling_point", "flammable"]})
             await self.conn.execute("""
                 INSERT INTO natural_elements (name, type, hardness, density, melting_point, boiling_point, flammable, properties)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -826,7 +1073,7 @@ class Database:
                     elem["boiling_point"] = row["boiling_point"]
                 if row["flammable"]:
                     elem["flammable"] = True
-                extra = json.loads(row["properties"] or "{}")
+                extra = _loads(row["properties"] or "{}")
                 elem.update(extra)
                 elements[row["name"].lower()] = elem
         return elements
@@ -842,13 +1089,13 @@ class Database:
         ) as cursor:
             row = await cursor.fetchone()
             if row:
-                return json.loads(row["value"])
+                return _loads(row["value"])
         return None
     
     async def set_rule(self, key: str, value: Any) -> bool:
         """Set rule value"""
         try:
-            value_json = json.dumps(value, ensure_ascii=False)
+            value_json = _dumps(value)
             await self.conn.execute("""
                 INSERT INTO rules (key, value) VALUES (?, ?)
                 ON CONFLICT(key) DO UPDATE SET value = excluded.value
@@ -864,7 +1111,7 @@ class Database:
         rules = {}
         async with self.conn.execute("SELECT * FROM rules") as cursor:
             async for row in cursor:
-                rules[row["key"]] = json.loads(row["value"])
+                rules[row["key"]] = _loads(row["value"])
         return rules
     
     # ═══════════════════════════════════════════════════════════════════
@@ -889,10 +1136,49 @@ class Database:
             "server_time_started": server_time or datetime.now().isoformat()
         }
     
-    async def export_to_json(self) -> str:
-        """Export full world state to JSON string (for backup)"""
+    async def export_to_json(self, include_history: bool = True) -> str:
+        """
+        Export full world state to JSON string (for backup)
+        - include_history=False: history is left empty (backed up separately as JSONL)
+        """
         state = await self.get_full_world_state()
+        if not include_history:
+            state["history"] = []
         return json.dumps(state, ensure_ascii=False, indent=2)
+    
+    async def _iter_json_table(self, sql: str, key_col: str, convert):
+        """Yield `"key": {...}` members of a JSON object straight off the cursor"""
+        sep = "\n    "
+        async with self.conn.execute(sql) as cursor:
+            async for row in cursor:
+                yield f"{sep}{json.dumps(row[key_col], ensure_ascii=False)}: {json.dumps(convert(row), ensure_ascii=False)}"
+                sep = ",\n    "
+    
+    async def iter_export_json(self, include_history: bool = True):
+        """
+        Stream the export_to_json document in chunks (str).
+        - objects/users are encoded row by row, never held as one dict/string
+        - Output is a single JSON document with the same keys, so restore/migration read it unchanged
+        """
+        dumps = lambda v: json.dumps(v, ensure_ascii=False)
+        
+        yield '{\n  "objects": {'
+        async for chunk in self._iter_json_table("SELECT * FROM objects", "id", self._row_to_object_dict):
+            yield chunk
+        yield "\n  },\n"
+        yield f'  "materials": {dumps(await self.get_all_materials())},\n'
+        yield f'  "object_types": {dumps(await self.get_all_object_types())},\n'
+        yield f'  "natural_elements": {dumps(await self.get_all_natural_elements())},\n'
+        yield f'  "biomes_discovered": {dumps(await self.get_rule("biomes_discovered") or {})},\n'
+        history = await self.get_recent_logs(limit=MAX_HISTORY_CACHE) if include_history else []
+        yield f'  "history": {dumps(history)},\n'
+        yield '  "players": {},\n  "users": {'
+        async for chunk in self._iter_json_table("SELECT * FROM users", "uuid", self._row_to_user_dict):
+            yield chunk
+        yield "\n  },\n"
+        yield f'  "supporters": {dumps(await self.get_all_supporters())},\n'
+        server_time = await self.get_rule("server_time_started")
+        yield f'  "server_time_started": {dumps(server_time or datetime.now().isoformat())}\n}}\n'
 
 
 # ╔═══════════════════════════════════════════════════════════════════════════════╗
@@ -912,10 +1198,15 @@ async def migrate_from_json(db: Database, json_data: dict):
         await db.save_user(uuid, user_data)
     print(f"[MIGRATION] Users: {len(users)} migrated")
     
-    # Migrate objects
+    # Migrate objects (one executemany + one commit)
     objects = json_data.get("objects", {})
+    rows = []
     for obj_id, obj_data in objects.items():
-        await db.save_object(obj_id, obj_data)
+        try:
+            rows.append(db.object_row(obj_id, obj_data))
+        except Exception as e:
+            print(f"[MIGRATION] Skipping object {obj_id}: {e}")
+    await db.save_object_rows(rows)
     print(f"[MIGRATION] Objects: {len(objects)} migrated")
     
     # Migrate materials
@@ -932,15 +1223,13 @@ async def migrate_from_json(db: Database, json_data: dict):
             await db.save_object_type(type_id, type_data)
     print(f"[MIGRATION] Object Types: {len([k for k in object_types if k != '_README'])} migrated")
     
-    # Migrate history logs
+    # Migrate history logs (one executemany + one commit)
     history = json_data.get("history", [])
-    for entry in history:
-        await db.add_log(
-            timestamp=entry.get("timestamp", datetime.now().isoformat()),
-            actor=entry.get("actor"),
-            action=entry.get("action", ""),
-            result=entry.get("result", "")
-        )
+    now_iso = datetime.now().isoformat()
+    await db.add_logs([
+        {**entry, "timestamp": entry.get("timestamp", now_iso)}
+        for entry in history
+    ])
     print(f"[MIGRATION] History logs: {len(history)} migrated")
     
     # Migrate supporters
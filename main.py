@@ -11,34 +11,109 @@ undefined - Text-Based Multiplayer Reality Simulation
 """
 
 import os
-import json
+import re
+import time
+import gzip
+import hashlib
+import threading
 import shutil
 import random
 import asyncio
-import traceback
+import bisect
 import ast
 import operator
+import functools
+import heapq
+import itertools
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import orjson
+from collections import deque
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 import litellm
 from litellm import exceptions
 
 # SQLite Database
-from database import Database, migrate_from_json, get_db, close_db
+from database import Database, migrate_from_json, get_db, close_db, write_text_stream
 
 load_dotenv()
 
 # ╔═══════════════════════════════════════════════════════════════════════════════╗
 # ║                         CONCURRENCY CONTROL                                   ║
 # ╚═══════════════════════════════════════════════════════════════════════════════╝
+class AsyncRWLock:
+    """
+    asyncio reader-writer lock (writer-preferring)
+    - `async with lock:`          exclusive writer (drop-in for asyncio.Lock)
+    - `async with lock.reader():` shared reader — readers don't block each other
+    Release paths never await: a task cancelled while leaving the lock can't leave it held.
+    """
+    
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._waiters: List[asyncio.Future] = []
+    
+    async def _wait(self):
+        """Park until the next state change (every waiter re-checks its own condition)"""
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        await fut
+    
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+    
+    async def acquire(self):
+        self._writers_waiting += 1
+        try:
+            while self._writer or self._readers:
+                await self._wait()
+        except BaseException:
+            self._writers_waiting -= 1
+            self._wake()  # readers held back by writer preference may proceed now
+            raise
+        self._writers_waiting -= 1
+        self._writer = True
+    
+    def release(self):
+        self._writer = False
+        self._wake()
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+    
+    @asynccontextmanager
+    async def reader(self):
+        # Writer preference: new readers wait while a writer is queued
+        while self._writer or self._writers_waiting:
+            await self._wait()
+        self._readers += 1
+        try:
+            yield self
+        finally:
+            self._readers -= 1
+            if self._readers == 0:
+                self._wake()
+
 # Global locks for thread-safe operations
-world_data_lock = asyncio.Lock()    # Protects world_data dictionary access
+world_data_lock = AsyncRWLock()     # Protects world_data dictionary access (reader() for read-only paths)
 file_write_lock = asyncio.Lock()    # Protects file I/O operations
 
 # Optimization: O(1) Nickname lookup
@@ -47,26 +122,151 @@ all_nicknames: set = set()
 
 # Heavy task concurrency limiter (Oracle Free Tier RAM 1GB friendly)
 # - Limits simultaneous /do (AI + DB write) to avoid memory/CPU spikes.
-DO_SEMAPHORE = asyncio.Semaphore(5)
+class FairAsyncSemaphore:
+    """
+    FIFO semaphore: a released slot is handed straight to the oldest waiter's future.
+    - Waiters are served strictly in arrival order (newcomers can't grab a slot that is being handed over)
+    - Slot is returned in `finally`, so errors/cancellation can't leak slots
+    - Exposes in_use / waiting for the /metrics endpoint
+    """
+    
+    def __init__(self, value: int):
+        self.capacity = value
+        self._free = value
+        self._waiters: deque = deque()
+    
+    @property
+    def in_use(self) -> int:
+        return self.capacity - self._free
+    
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+    
+    def locked(self) -> bool:
+        return self._free == 0
+    
+    async def acquire(self):
+        if self._free and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # slot was already handed to us → pass it on
+            else:
+                self._waiters.remove(fut)
+            raise
+    
+    def release(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # slot moves to the waiter; _free unchanged
+                return
+        self._free += 1
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+DO_SEMAPHORE = FairAsyncSemaphore(5)
 DO_QUEUE_WAITING_MESSAGE = "[QUEUED] High traffic — waiting for your turn..."
 
+# Outbound WebSocket queues (per connection)
+WS_OUTBOX_MAXSIZE = 1000   # 읽지 않는 클라이언트는 zombie로 간주
+WS_OUTBOX_BATCH = 32       # frames sent per writer wakeup
+# permessage-deflate: JSON text frames compress well (repeated keys); disable to trade bandwidth for CPU
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes", "y", "on")
+
 # Memory guardrails (keep in-memory history bounded)
 MAX_IN_MEMORY_HISTORY = 10000
-MEMORY_CLEANUP_INTERVAL_SECONDS = 60
+# Most recent history entries included in each /do prompt (kept pre-encoded, see history_prompt_tail)
+PROMPT_HISTORY_ENTRIES = 100
+# Backup retention sweep runs on a timer (not on every save)
+BACKUP_CLEANUP_INTERVAL_SECONDS = int(os.getenv("BACKUP_CLEANUP_INTERVAL_SECONDS", "3600"))
+
+# Background persistence (non-critical DB writes off the /do response path) — write-behind queue bound
+PERSIST_QUEUE_MAXSIZE = int(os.getenv("PERSIST_QUEUE_MAXSIZE", "10000"))
+HISTORY_QUEUE_MAXSIZE = 10000
+HISTORY_FLUSH_BATCH = 64   # max log rows per DB transaction
+# Write-behind for users / objects / materials / object_types: coalesced per row, one transaction per window
+WRITE_BEHIND_FLUSH_BATCH = 256
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "250"))
+
+# Non-blocking logger for hot paths: records are queued, a background thread does the stdout write
+log_queue: queue.Queue = queue.Queue(-1)
+logger = logging.getLogger("undefined")
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(log_queue))
+logger.propagate = False
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+log_listener = QueueListener(log_queue, _log_stream_handler)
+log_listener.start()
+
+# Shared read-only defaults for `.get(k, default)` on read paths (a `{}` / `[...]` literal is rebuilt per call).
+# Never store them or pass them to to_json; EMPTY_MAP raises TypeError on mutation.
+EMPTY_MAP = MappingProxyType({})
+_ORIGIN = (0, 0, 0)
+
+def to_json(obj) -> str:
+    """Fast JSON encode to str (orjson, C-level) — WebSocket text frames, prompt fragments"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def frame_prefix(msg_type: str, content: str) -> str:
+    """Encode a {"type", "content", "timestamp"} frame once, up to its timestamp (close with stamp_frame)"""
+    return '{"type":' + to_json(msg_type) + ',"content":' + to_json(content) + ',"timestamp":'
+
+def stamp_frame(prefix: str, timestamp: str) -> str:
+    """Finish a frame_prefix() with an ISO timestamp (isoformat never needs escaping)"""
+    return f'{prefix}"{timestamp}"}}'
+
+# Wire-frame timestamps only feed the client's toLocaleTimeString → one isoformat per wall-clock second.
+# Persisted records (created_at, death_time, history, facts) keep datetime.now() precision.
+_frame_ts_cache = [-1, ""]
+
+def frame_timestamp() -> str:
+    """ISO timestamp for outgoing frames, formatted at most once per second"""
+    second = int(time.time())
+    if second != _frame_ts_cache[0]:
+        _frame_ts_cache[1] = datetime.fromtimestamp(second).isoformat()
+        _frame_ts_cache[0] = second
+    return _frame_ts_cache[1]
+
+# /do contention notice — only sent when DO_SEMAPHORE is saturated, so keep it pre-encoded
+_DO_WAITING_FRAME_PREFIX = frame_prefix("system", DO_QUEUE_WAITING_MESSAGE)
+# Fixed /do status frames (processing notice on every action, AI timeout)
+_PROCESSING_FRAME_PREFIX = frame_prefix("system", "[PROCESSING...] Reality responds...")
+_AI_TIMEOUT_FRAME_PREFIX = frame_prefix("error", "[ERROR] AI is not responding. Please try again later. (60s timeout)")
 
 # === Server Configuration ===
 SERVER_API_KEY = os.getenv("SERVER_API_KEY", "")
 SERVER_DEFAULT_MODEL = os.getenv("SERVER_DEFAULT_MODEL", "gemini-2.5-flash")
+# Privileged UUIDs (/grant, admin /give, admin broadcast) — parsed once; restart to change
+ADMIN_UUIDS = frozenset(u.strip() for u in os.getenv("ADMIN_UUIDS", "").split(",") if u.strip())
 
 # If true, every AI narrative becomes a persistent "scene snapshot" object at the current location.
 # This makes the described world become the world state (visible to others later).
 PERSIST_SCENE_SNAPSHOTS = os.getenv("PERSIST_SCENE_SNAPSHOTS", "true").lower() in ("1", "true", "yes", "y", "on")
 MAX_SCENE_SNAPSHOT_CHARS = int(os.getenv("MAX_SCENE_SNAPSHOT_CHARS", "5000"))
+# Extracted-fact id suffix: process-wide sequence (unique within a run; the date-time stamp separates runs)
+_fact_seq = itertools.count()
 
 # === File Paths ===
 WORLD_RULES_FILE = "world_rules.json"
 WORLD_DATA_FILE = "world_data.json"
 BACKUP_DIR = "backups"
+BACKUP_INDEX_FILE = os.path.join(BACKUP_DIR, "_index.json")  # [{name, mtime, sha256, ok}]
+
+# fsync world_data.json (and its directory) on every save — crash-durable, but costs ms per save
+SYNC_ON_SAVE = os.getenv("SYNC_ON_SAVE", "false").lower() in ("1", "true", "yes", "y", "on")
 
 
 
@@ -202,34 +402,114 @@ class SafePythonInterpreter:
             # Re-raise with a clear message that this was a security or parsing failure
             raise RuntimeError(f"Safe Execution Failed: {str(e)}")
 
-def load_rules() -> dict:
+# Parsed world_rules.json: (rules_stamp, rules) — re-read only when the file changes
+_rules_cache: Optional[tuple] = None
+
+def load_rules(rules_stamp: Optional[tuple] = None) -> dict:
     """
     Load world_rules.json dynamically.
     Rules can be changed without server restart.
+    - Parsed once per file version (mtime_ns, size); callers must not mutate the result
+    - rules_stamp: pass a get_rules_stamp() taken earlier to avoid a second stat
     """
+    global _rules_cache
+    if rules_stamp is None:
+        rules_stamp = get_rules_stamp()
+    if rules_stamp is not None and _rules_cache is not None and _rules_cache[0] == rules_stamp:
+        return _rules_cache[1]
     try:
-        with open(WORLD_RULES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(WORLD_RULES_FILE, 'rb') as f:
+            rules = orjson.loads(f.read())
+        if rules_stamp is not None:
+            _rules_cache = (rules_stamp, rules)
+        return rules
     except FileNotFoundError:
         print(f"[WARNING] {WORLD_RULES_FILE} not found. Using default rules.")
         return {}
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"[ERROR] Failed to parse {WORLD_RULES_FILE}: {e}")
         return {}
 
-def build_system_prompt(rules: dict, world_state: str, player_state: str, 
-                        location_context: str, materials_registry: str, 
-                        object_types_registry: str) -> str:
-    """
-    Dynamically generates system prompt based on world_rules.json.
-    Latest rules are applied on each request.
-    """
-    if not rules:
-        return "You are a helpful assistant. Respond in JSON format. OUTPUT IN ENGLISH ONLY."
-    
-    # CRITICAL: ENGLISH OUTPUT ENFORCEMENT (Hardcoded - Cannot be overridden)
-    core = rules.get("core_identity", {})
-    prompt = """
+def get_rules_stamp() -> Optional[tuple]:
+    """(mtime_ns, size) of world_rules.json — cache key for the static prompt sections"""
+    try:
+        st = os.stat(WORLD_RULES_FILE)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _render_engine(i: int, eng_key: str, eng: dict) -> str:
+    """One simulation engine block of the system prompt"""
+    parts: List[str] = [f"## ENGINE {i}: {eng.get('name', eng_key)}\n"]
+    parts.append(f"**Principle:** {eng.get('principle', '')}\n\n")
+    
+    # Add detailed rules per engine
+    for key, value in eng.items():
+        if key not in ['name', 'principle', 'note']:
+            if isinstance(value, dict):
+                parts.append(f"### {key.replace('_', ' ').title()}:\n")
+                for k, v in value.items():
+                    if isinstance(v, dict):
+                        parts.append(f"- **{k}:** {to_json(v)}\n")
+                    else:
+                        parts.append(f"- **{k}:** {v}\n")
+                parts.append("\n")
+            elif isinstance(value, list):
+                parts.append(f"### {key.replace('_', ' ').title()}:\n")
+                for item in value:
+                    parts.append(f"- {item}\n")
+                parts.append("\n")
+    
+    if eng.get('note'):
+        parts.append(f"**Note:** {eng.get('note')}\n\n")
+    return "".join(parts)
+
+def _render_protocol(proto_key: str, proto: dict) -> str:
+    """One core protocol block of the system prompt"""
+    parts: List[str] = [f"# {proto.get('name', proto_key)}\n"]
+    for key, value in proto.items():
+        if key != 'name':
+            if isinstance(value, list):
+                parts.append(f"- {key}: {', '.join(value)}\n")
+            elif isinstance(value, dict):
+                for k, v in value.items():
+                    parts.append(f"  - {k}: {v}\n")
+            else:
+                parts.append(f"- {key}: {value}\n")
+    parts.append("\n")
+    return "".join(parts)
+
+def _render_system(sys_key: str, sys: dict) -> str:
+    """One system (Patent Judge, Pacing, ...) block of the system prompt"""
+    parts: List[str] = ["═══════════════════════════════════════════════════════════════════\n"]
+    parts.append(f"              {sys.get('name', sys_key.upper())}\n")
+    parts.append("═══════════════════════════════════════════════════════════════════\n\n")
+    
+    if sys.get('principle'):
+        parts.append(f"**Principle:** {sys.get('principle')}\n\n")
+    
+    for key, value in sys.items():
+        if key not in ['name', 'principle']:
+            if isinstance(value, list):
+                parts.append(f"**{key.replace('_', ' ').title()}:**\n")
+                for item in value:
+                    parts.append(f"- {item}\n")
+                parts.append("\n")
+            elif isinstance(value, dict):
+                parts.append(f"**{key.replace('_', ' ').title()}:**\n")
+                for k, v in value.items():
+                    if isinstance(v, dict):
+                        parts.append(f"- {k}: {to_json(v)}\n")
+                    elif isinstance(v, list):
+                        parts.append(f"- {k}: {', '.join(str(x) for x in v)}\n")
+                    else:
+                        parts.append(f"- {k}: {v}\n")
+                parts.append("\n")
+    return "".join(parts)
+
+# ── Invariant system prompt blocks (rules-independent) ──
+# CRITICAL: ENGLISH OUTPUT ENFORCEMENT (Hardcoded - Cannot be overridden)
+_LANG_DIRECTIVE_HEADER = """
 ╔═══════════════════════════════════════════════════════════════════════════════╗
 ║  ⚠️  CRITICAL LANGUAGE DIRECTIVE - ABSOLUTE PRIORITY  ⚠️                      ║
 ║                                                                               ║
@@ -244,121 +524,37 @@ def build_system_prompt(rules: dict, world_state: str, player_state: str,
 ╚═══════════════════════════════════════════════════════════════════════════════╝
 
 """
-    prompt += f"""# Role: {core.get('role', 'The Omni-Engine')}
-
-{core.get('description', '')}
-
-# World Setting: {rules.get('world_setting', {}).get('base', 'Adaptive Reality')}
-- Spawn Point (0,0): {rules.get('world_setting', {}).get('spawn_point', {}).get('description', 'Unknown')}
-"""
-    
-    # Zone settings
-    regions = rules.get('world_setting', {}).get('regions', {})
-    for key, desc in regions.items():
-        prompt += f"- {key}: {desc}\n"
-    
-    prompt += "\n═══════════════════════════════════════════════════════════════════\n"
-    prompt += "                    THE 7 SIMULATION ENGINES\n"
-    prompt += "    Process EVERY user action through ALL engines before output\n"
-    prompt += "═══════════════════════════════════════════════════════════════════\n\n"
-    
-    # 7 Simulation Engines
-    engines = rules.get('engines', {})
-    engine_order = ['bio_engine', 'decay_engine', 'social_engine', 'economic_engine', 
-                    'meteorological_engine', 'epistemic_engine', 'ecological_engine']
-    
-    for i, eng_key in enumerate(engine_order, 1):
-        eng = engines.get(eng_key, {})
-        if eng:
-            prompt += f"## ENGINE {i}: {eng.get('name', eng_key)}\n"
-            prompt += f"**Principle:** {eng.get('principle', '')}\n\n"
-            
-            # Add detailed rules per engine
-            for key, value in eng.items():
-                if key not in ['name', 'principle', 'note']:
-                    if isinstance(value, dict):
-                        prompt += f"### {key.replace('_', ' ').title()}:\n"
-                        for k, v in value.items():
-                            if isinstance(v, dict):
-                                prompt += f"- **{k}:** {json.dumps(v, ensure_ascii=False)}\n"
-                            else:
-                                prompt += f"- **{k}:** {v}\n"
-                        prompt += "\n"
-                    elif isinstance(value, list):
-                        prompt += f"### {key.replace('_', ' ').title()}:\n"
-                        for item in value:
-                            prompt += f"- {item}\n"
-                        prompt += "\n"
-            
-            if eng.get('note'):
-                prompt += f"**Note:** {eng.get('note')}\n\n"
-    
-    # Protocols
-    prompt += "═══════════════════════════════════════════════════════════════════\n"
-    prompt += "                       CORE PROTOCOLS\n"
-    prompt += "═══════════════════════════════════════════════════════════════════\n\n"
-    
-    protocols = rules.get('protocols', {})
-    for proto_key, proto in protocols.items():
-        prompt += f"# {proto.get('name', proto_key)}\n"
-        for key, value in proto.items():
-            if key != 'name':
-                if isinstance(value, list):
-                    prompt += f"- {key}: {', '.join(value)}\n"
-                elif isinstance(value, dict):
-                    for k, v in value.items():
-                        prompt += f"  - {k}: {v}\n"
-                else:
-                    prompt += f"- {key}: {value}\n"
-        prompt += "\n"
-    
-    prompt += "\n# 🚨 DATA INTEGRITY PROTOCOL (MANDATORY)\n"
-    prompt += "1. NARRATIVE-DATA SYNC: Your narrative is the 'physical reality'. Every person met, item found, or building entered MUST be reflected in 'world_update'.\n"
-    prompt += "2. PERMANENCE: If a user declares a location as 'home' or meets a key NPC (like Mira), you MUST use 'world_update.create' to save them as permanent objects with coordinates.\n"
-    prompt += "3. NO GHOST DATA: Do not just say it in text. If it's not in the JSON 'world_update', it doesn't exist in the future. FORCE synchronization.\n"
-    prompt += "4. HISTORICAL RECOVERY: If a user mentions a past event or object that is missing from current state, search 'recent_history', 'long_term_memories', and 'established_facts'. Verify it, and RE-CREATE it in 'world_update' immediately. This is how you maintain continuity.\n"
-    prompt += "5. FACT EXTRACTION: You MUST include a field 'extracted_facts' (list of strings) in your JSON response summarizing every new permanent reality established in this turn.\n\n"
 
-    # Systems (Patent Judge, Pacing, Processing, Creation, Navigation)
-    systems = rules.get('systems', {})
-    for sys_key in ['omni_lab_simulation', 'patent_judge', 'pacing', 'processing', 'creation', 'navigation', 'vertical']:
-        sys = systems.get(sys_key, {})
-        if sys:
-            prompt += "═══════════════════════════════════════════════════════════════════\n"
-            prompt += f"              {sys.get('name', sys_key.upper())}\n"
-            prompt += "═══════════════════════════════════════════════════════════════════\n\n"
-            
-            if sys.get('principle'):
-                prompt += f"**Principle:** {sys.get('principle')}\n\n"
-            
-            for key, value in sys.items():
-                if key not in ['name', 'principle']:
-                    if isinstance(value, list):
-                        prompt += f"**{key.replace('_', ' ').title()}:**\n"
-                        for item in value:
-                            prompt += f"- {item}\n"
-                        prompt += "\n"
-                    elif isinstance(value, dict):
-                        prompt += f"**{key.replace('_', ' ').title()}:**\n"
-                        for k, v in value.items():
-                            if isinstance(v, dict):
-                                prompt += f"- {k}: {json.dumps(v, ensure_ascii=False)}\n"
-                            elif isinstance(v, list):
-                                prompt += f"- {k}: {', '.join(str(x) for x in v)}\n"
-                            else:
-                                prompt += f"- {k}: {v}\n"
-                        prompt += "\n"
-    
-    # Context data
-    prompt += "═══════════════════════════════════════════════════════════════════\n"
-    prompt += "                         CONTEXT DATA\n"
-    prompt += "═══════════════════════════════════════════════════════════════════\n\n"
-    prompt += f"# Current World State\n{world_state}\n\n"
-    prompt += f"# Player State\n{player_state}\n\n"
-    prompt += f"# Location Context\n{location_context}\n\n"
-    
-    # Highlight Known Locations (for long distance travel)
-    prompt += """
+_ENGINES_HEADER = (
+    "\n═══════════════════════════════════════════════════════════════════\n"
+    "                    THE 7 SIMULATION ENGINES\n"
+    "    Process EVERY user action through ALL engines before output\n"
+    "═══════════════════════════════════════════════════════════════════\n\n"
+)
+
+_PROTOCOLS_HEADER = (
+    "═══════════════════════════════════════════════════════════════════\n"
+    "                       CORE PROTOCOLS\n"
+    "═══════════════════════════════════════════════════════════════════\n\n"
+)
+
+_DATA_INTEGRITY_BLOCK = (
+    "\n# 🚨 DATA INTEGRITY PROTOCOL (MANDATORY)\n"
+    "1. NARRATIVE-DATA SYNC: Your narrative is the 'physical reality'. Every person met, item found, or building entered MUST be reflected in 'world_update'.\n"
+    "2. PERMANENCE: If a user declares a location as 'home' or meets a key NPC (like Mira), you MUST use 'world_update.create' to save them as permanent objects with coordinates.\n"
+    "3. NO GHOST DATA: Do not just say it in text. If it's not in the JSON 'world_update', it doesn't exist in the future. FORCE synchronization.\n"
+    "4. HISTORICAL RECOVERY: If a user mentions a past event or object that is missing from current state, search 'recent_history', 'long_term_memories', and 'established_facts'. Verify it, and RE-CREATE it in 'world_update' immediately. This is how you maintain continuity.\n"
+    "5. FACT EXTRACTION: You MUST include a field 'extracted_facts' (list of strings) in your JSON response summarizing every new permanent reality established in this turn.\n\n"
+)
+
+_CONTEXT_HEADER = (
+    "═══════════════════════════════════════════════════════════════════\n"
+    "                         CONTEXT DATA\n"
+    "═══════════════════════════════════════════════════════════════════\n\n"
+)
+
+# Highlight Known Locations (for long distance travel)
+_KNOWN_LOCATIONS_BLOCK = """
 ═══════════════════════════════════════════════════════════════════
 ⚠️ KNOWN LOCATIONS - For Long Distance Travel
 ═══════════════════════════════════════════════════════════════════
@@ -377,17 +573,14 @@ Example:
 - position_delta = [0-10, 0-5, 0-0] = [-10, -5, 0]
 
 """
-    
-    prompt += f"# Materials Registry - Quick Craft Available!\n{materials_registry}\n\n"
-    prompt += f"# Object Types Registry - Quick Craft Available!\n{object_types_registry}\n\n"
-    
-    # Output format
-    output_fmt = rules.get('output_format', {})
-    prompt += "═══════════════════════════════════════════════════════════════════\n"
-    prompt += "                       OUTPUT FORMAT\n"
-    prompt += "═══════════════════════════════════════════════════════════════════\n\n"
-    prompt += f"{output_fmt.get('instruction', 'Respond with valid JSON.')}\n\n"
-    prompt += """{
+
+_OUTPUT_FORMAT_HEADER = (
+    "═══════════════════════════════════════════════════════════════════\n"
+    "                       OUTPUT FORMAT\n"
+    "═══════════════════════════════════════════════════════════════════\n\n"
+)
+
+_OUTPUT_FORMAT_TEMPLATE = """{
   "success": boolean,
   "narrative": "2-4 sentences. Sensory-rich. ALWAYS IN ENGLISH.",
   "world_update": { 
@@ -439,8 +632,100 @@ FINAL INSTRUCTION:
 - Output ONLY the JSON. No preamble, no postamble.
 ═══════════════════════════════════════════════════════════════════
 """
+
+def _build_rules_sections(rules: dict) -> tuple:
+    """
+    Static (rules-only) parts of the system prompt: (head, known_locations, tail).
+    Per-request context is spliced in between by build_system_prompt.
+    """
+    core = rules.get("core_identity", EMPTY_MAP)
+    parts: List[str] = [_LANG_DIRECTIVE_HEADER]
+    parts.append(f"""# Role: {core.get('role', 'The Omni-Engine')}
+
+{core.get('description', '')}
+
+# World Setting: {rules.get('world_setting', EMPTY_MAP).get('base', 'Adaptive Reality')}
+- Spawn Point (0,0): {rules.get('world_setting', EMPTY_MAP).get('spawn_point', EMPTY_MAP).get('description', 'Unknown')}
+""")
+    
+    # Zone settings
+    regions = rules.get('world_setting', EMPTY_MAP).get('regions', EMPTY_MAP)
+    for key, desc in regions.items():
+        parts.append(f"- {key}: {desc}\n")
+    
+    parts.append(_ENGINES_HEADER)
+    
+    # 7 Simulation Engines
+    engines = rules.get('engines', EMPTY_MAP)
+    engine_order = ['bio_engine', 'decay_engine', 'social_engine', 'economic_engine', 
+                    'meteorological_engine', 'epistemic_engine', 'ecological_engine']
+    
+    for i, eng_key in enumerate(engine_order, 1):
+        eng = engines.get(eng_key, EMPTY_MAP)
+        if eng:
+            parts.append(_render_engine(i, eng_key, eng))
+    
+    # Protocols
+    parts.append(_PROTOCOLS_HEADER)
+    
+    protocols = rules.get('protocols', EMPTY_MAP)
+    for proto_key, proto in protocols.items():
+        parts.append(_render_protocol(proto_key, proto))
+    
+    parts.append(_DATA_INTEGRITY_BLOCK)
+
+    # Systems (Patent Judge, Pacing, Processing, Creation, Navigation)
+    systems = rules.get('systems', EMPTY_MAP)
+    for sys_key in ['omni_lab_simulation', 'patent_judge', 'pacing', 'processing', 'creation', 'navigation', 'vertical']:
+        sys = systems.get(sys_key, EMPTY_MAP)
+        if sys:
+            parts.append(_render_system(sys_key, sys))
+    
+    # Context data
+    parts.append(_CONTEXT_HEADER)
+    head = "".join(parts)
+    
+    # Output format
+    output_fmt = rules.get('output_format', EMPTY_MAP)
+    parts = [_OUTPUT_FORMAT_HEADER]
+    parts.append(f"{output_fmt.get('instruction', 'Respond with valid JSON.')}\n\n")
+    parts.append(_OUTPUT_FORMAT_TEMPLATE)
+    
+    return head, _KNOWN_LOCATIONS_BLOCK, "".join(parts)
+
+# Static prompt sections cache: {rules_stamp: (head, known_locations, tail)}
+_rules_sections_cache: Dict[Any, tuple] = {}
+
+def build_system_prompt(rules: dict, world_state: str, player_state: str, 
+                        location_context: str, materials_registry: str, 
+                        object_types_registry: str, rules_stamp: Optional[tuple] = None) -> str:
+    """
+    Dynamically generates system prompt based on world_rules.json.
+    Latest rules are applied on each request.
+    - rules_stamp: get_rules_stamp() value; static sections are rebuilt only when it changes
+    """
+    if not rules:
+        return "You are a helpful assistant. Respond in JSON format. OUTPUT IN ENGLISH ONLY."
     
-    return prompt
+    sections = _rules_sections_cache.get(rules_stamp) if rules_stamp is not None else None
+    if sections is None:
+        sections = _build_rules_sections(rules)
+        if rules_stamp is not None:
+            # Only the current rules file version is worth keeping
+            _rules_sections_cache.clear()
+            _rules_sections_cache[rules_stamp] = sections
+    head, known_locations, tail = sections
+    
+    return "".join((
+        head,
+        f"# Current World State\n{world_state}\n\n",
+        f"# Player State\n{player_state}\n\n",
+        f"# Location Context\n{location_context}\n\n",
+        known_locations,
+        f"# Materials Registry - Quick Craft Available!\n{materials_registry}\n\n",
+        f"# Object Types Registry - Quick Craft Available!\n{object_types_registry}\n\n",
+        tail,
+    ))
 
 # === [NOTE] SYSTEM_PROMPT is now loaded dynamically from world_rules.json ===
 # Changes to world_rules.json are applied immediately without server restart.
@@ -1124,15 +1409,23 @@ NOTES:
 # ║           Uses Repository pattern for future DB migration                      ║
 # ╚═══════════════════════════════════════════════════════════════════════════════╝
 
+_WORLD_SECTIONS = ("users", "supporters", "objects", "materials", "object_types", "natural_elements")
+
+def ensure_world_sections(data: dict) -> dict:
+    """Guarantee the keyed sections exist, so lookups can index them directly (no per-call `.get(k, {})`)"""
+    for section in _WORLD_SECTIONS:
+        data.setdefault(section, {})
+    return data
+
 def load_world_data() -> dict:
     """Load world state (sync wrapper for startup)"""
     if os.path.exists(WORLD_DATA_FILE):
         try:
-            with open(WORLD_DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(WORLD_DATA_FILE, "rb") as f:
+                data = orjson.loads(f.read())
                 print(f"[LOAD] {WORLD_DATA_FILE} loaded successfully.")
                 return data
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"[ERROR] Failed to parse {WORLD_DATA_FILE}: {e}")
             return _try_restore_from_backup()
         except Exception as e:
@@ -1142,26 +1435,93 @@ def load_world_data() -> dict:
     return _create_initial_world()
 
 def _try_restore_from_backup() -> dict:
-    """Attempt recovery from backups"""
+    """
+    Attempt recovery from backups
+    1. Indexed backups (newest first): sha256 must match before we pay for a parse
+    2. Anything not in the index (older backups): plain parse attempt
+    """
     if not os.path.exists(BACKUP_DIR):
         return _create_initial_world()
     
+    tried = set()
+    for entry in sorted(_load_backup_index(), key=lambda e: e.get("mtime", 0), reverse=True):
+        name = entry.get("name")
+        if not name or not entry.get("ok"):
+            continue
+        tried.add(name)
+        path = os.path.join(BACKUP_DIR, name)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            if hashlib.sha256(raw).hexdigest() != entry.get("sha256"):
+                print(f"[BACKUP] {name} failed checksum, skipping")
+                continue
+            data = _parse_backup(name, raw)
+            print(f"[RECOVERED] Loaded from {name}")
+            return _restore_history_backup(data)
+        except (OSError, EOFError, orjson.JSONDecodeError):
+            continue
+    
     backups = sorted(
-        [f for f in os.listdir(BACKUP_DIR) if f.startswith("world_data_")],
+        [f for f in os.listdir(BACKUP_DIR) if f.startswith("world_data_") and f not in tried],
         reverse=True
     )
     
     for backup in backups:
         try:
-            with open(os.path.join(BACKUP_DIR, backup), "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(os.path.join(BACKUP_DIR, backup), "rb") as f:
+                data = _parse_backup(backup, f.read())
                 print(f"[RECOVERED] Loaded from {backup}")
-                return data
+                return _restore_history_backup(data)
         except:
             continue
     
     return _create_initial_world()
 
+def _read_json_file(path: str):
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+def _parse_backup(name: str, raw: bytes) -> dict:
+    """world_data_* backup → dict (.json.gz midnight exports are gzip-compressed)"""
+    if name.endswith(".gz"):
+        raw = gzip.decompress(raw)
+    return orjson.loads(raw)
+
+def _restore_history_backup(data: dict) -> dict:
+    """
+    Snapshots are written with "history": [] (history goes to the append-only JSONL instead),
+    so splice the JSONL tail back in. Older snapshots that still embed history are left as-is.
+    """
+    if data.get("history"):
+        return data
+    path = os.path.join(BACKUP_DIR, HISTORY_BACKUP_FILE)
+    if not os.path.exists(path):
+        return data
+    tail = deque(maxlen=MAX_IN_MEMORY_HISTORY)
+    last_id = 0
+    try:
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    rec = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # blank / torn last line
+                # Ids are appended in ascending order; a crash before history_backup_last_id
+                # was saved re-appends the same ids on the next backup → skip them
+                rec_id = rec.pop("id", None)
+                if rec_id is not None:
+                    if rec_id <= last_id:
+                        continue
+                    last_id = rec_id
+                tail.append(rec)
+    except OSError as e:
+        print(f"[BACKUP] Could not read {path}: {e}")
+        return data
+    data["history"] = list(tail)
+    print(f"[RECOVERED] {len(tail)} history entries from {HISTORY_BACKUP_FILE}")
+    return data
+
 def _create_initial_world() -> dict:
     """Create default world state (English-native)"""
     world = {
@@ -1195,6 +1555,72 @@ def _create_initial_world() -> dict:
     _save_world_sync(world)
     return world
 
+def _snapshot_file(src: str, dst: str):
+    """
+    Backup snapshot via hard link (O(1), no data copy).
+    Writes always go through tmp + os.replace, so the link keeps the old inode.
+    Falls back to a full copy where hard links are unsupported (cross-device, some FS).
+    """
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)  # copy2 semantics: overwrite existing snapshot
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+# _index.json is rewritten from the save thread and the janitor thread
+_backup_index_lock = threading.Lock()
+
+def _load_backup_index() -> list:
+    try:
+        with open(BACKUP_INDEX_FILE, "rb") as f:
+            index = orjson.loads(f.read())
+        return index if isinstance(index, list) else []
+    except (OSError, orjson.JSONDecodeError):
+        return []
+
+def _write_backup_index(index: list):
+    temp_file = BACKUP_INDEX_FILE + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(orjson.dumps(index))
+    os.replace(temp_file, BACKUP_INDEX_FILE)
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _record_backup(backup_path: str):
+    """Add/refresh a backup's checksum in _index.json (used by _try_restore_from_backup)"""
+    try:
+        entry = {
+            "name": os.path.basename(backup_path),
+            "mtime": os.path.getmtime(backup_path),
+            "sha256": _sha256_file(backup_path),
+            "ok": True,
+        }
+        with _backup_index_lock:
+            index = [e for e in _load_backup_index() if e.get("name") != entry["name"]]
+            index.append(entry)
+            _write_backup_index(index)
+    except OSError as e:
+        print(f"[BACKUP] Failed to update backup index: {e}")
+
+def _fsync_dir(path: str):
+    """Persist a rename (directory entry). No-op where directories can't be opened (Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
 def _save_world_sync(data: dict):
     """Synchronous atomic save with backup (for initialization)"""
     try:
@@ -1206,14 +1632,20 @@ def _save_world_sync(data: dict):
             timestamp = datetime.now().strftime("%Y%m%d_%H")
             backup_path = os.path.join(BACKUP_DIR, f"world_data_{timestamp}.json")
             if not os.path.exists(backup_path):
-                shutil.copy2(WORLD_DATA_FILE, backup_path)
-                _cleanup_old_backups()
+                _snapshot_file(WORLD_DATA_FILE, backup_path)
+                _record_backup(backup_path)
         
         # Atomic write
         temp_file = WORLD_DATA_FILE + ".tmp"
-        with open(temp_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        shutil.move(temp_file, WORLD_DATA_FILE)
+        with open(temp_file, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            if SYNC_ON_SAVE:
+                f.flush()
+                os.fsync(f.fileno())
+        # os.replace: atomic rename → new inode, hard-linked backups keep the previous version
+        os.replace(temp_file, WORLD_DATA_FILE)
+        if SYNC_ON_SAVE:
+            _fsync_dir(os.path.dirname(os.path.abspath(WORLD_DATA_FILE)))
         
     except Exception as e:
         print(f"[ERROR] Save failed: {e}")
@@ -1226,11 +1658,7 @@ async def save_world_data(data: dict):
     Async world data save - now saves to SQLite DB
     캐시(world_data)와 DB를 동기화
     """
-    global db_instance
     async with file_write_lock:
-        if db_instance is None:
-            db_instance = await get_db()
-        
         # 변경된 데이터를 DB에 저장 (증분 저장 - 성능 최적화)
         # 주요 변경 항목만 저장하고, 전체 저장은 백업 시에만 수행
         # 여기서는 호환성을 위해 호출만 유지하고, 실제 저장은 개별 함수에서 처리
@@ -1244,14 +1672,38 @@ def _cleanup_old_backups(max_backups: int = 48):
         [f for f in os.listdir(BACKUP_DIR) if f.startswith("world_data_")],
         reverse=True
     )
+    removed = set()
     for old in backups[max_backups:]:
         try:
             os.remove(os.path.join(BACKUP_DIR, old))
+            removed.add(old)
         except:
             pass
+    
+    if removed:
+        with _backup_index_lock:
+            index = _load_backup_index()
+            kept = [e for e in index if e.get("name") not in removed]
+            if len(kept) != len(index):
+                _write_backup_index(kept)
 
 # === Global State ===
-world_data = load_world_data()
+world_data = ensure_world_sections(load_world_data())
+# history는 고정 크기 ring buffer (append 시 O(1) eviction, slice 복사 없음)
+world_data["history"] = deque(world_data.get("history") or [], maxlen=MAX_IN_MEMORY_HISTORY)
+
+# Prompt view of the history tail: each entry encoded once on record, joined per /do
+history_prompt_tail: deque = deque(maxlen=PROMPT_HISTORY_ENTRIES)
+
+def reset_history_prompt_tail():
+    """Re-seed history_prompt_tail from world_data["history"] (after the deque is replaced)"""
+    history_prompt_tail.clear()
+    history_prompt_tail.extend(to_json(e) for e in itertools.islice(reversed(world_data["history"]), PROMPT_HISTORY_ENTRIES))
+    history_prompt_tail.reverse()
+
+reset_history_prompt_tail()
+
+_MISSING = object()  # dict.pop sentinel (None can be a stored value)
 
 class ConnectionManager:
     """
@@ -1267,14 +1719,57 @@ class ConnectionManager:
         self.connection_times: Dict[str, datetime] = {}
         self.nickname_to_uuid: Dict[str, str] = {}  # nickname -> uuid mapping
         self.last_action_time: Dict[str, datetime] = {} # Rate limiting
+        # Per-socket outbound queue + writer task (keyed by id(websocket) so nickname changes keep ordering)
+        self.outboxes: Dict[int, asyncio.Queue] = {}
+        self.writer_tasks: Dict[int, asyncio.Task] = {}
+        # id(websocket) -> number of client_ids mapped to it (O(1) "still registered?" for the writer)
+        self.socket_refs: Dict[int, int] = {}
+        # Fire-and-forget close() tasks for dropped sockets (strong refs until done)
+        self._closing: set = set()
+        # Players with a save in flight → True if another save was requested meanwhile (coalescing)
+        self.pending_saves: Dict[str, bool] = {}
+        # Grid over player_data positions (broadcast_nearby); call reindex_player after a position write
+        self.player_index = ObjectSpatialIndex()
     
     def get_uuid_by_nickname(self, nickname: str) -> Optional[str]:
         """Get UUID from nickname"""
         return self.nickname_to_uuid.get(nickname)
     
+    def rename(self, old_nickname: str, new_nickname: str, user_id: str):
+        """Move every per-nickname entry from old to new (each map is hashed once via pop)"""
+        websocket = self.active_connections.get(old_nickname)
+        if websocket is not None:
+            # Register under the new name first so the socket's refcount never drops to 0
+            self._register(new_nickname, websocket)
+            self._unregister(old_nickname)
+        for table in (self.connection_times, self.last_action_time):
+            value = table.pop(old_nickname, _MISSING)
+            if value is not _MISSING:
+                table[new_nickname] = value
+        player = self.player_data.pop(old_nickname, None)
+        self.player_index.unindex(old_nickname)
+        if player is not None:
+            player["id"] = new_nickname
+            self.player_data[new_nickname] = player
+            self.player_index.index(new_nickname, player)
+        self.nickname_to_uuid.pop(old_nickname, None)
+        self.nickname_to_uuid[new_nickname] = user_id
+    
+    def reindex_player(self, player: dict):
+        """Re-file a player in player_index after its position was assigned (keyed by player["id"], which follows /name)"""
+        client_id = player.get("id")
+        if client_id in self.player_data:
+            self.player_index.index(client_id, player)
+    
+    def refresh_supporter(self, user_id: str):
+        """Re-sync the cached is_supporter flag of an online player after a supporter change"""
+        for nickname, uuid in self.nickname_to_uuid.items():
+            if uuid == user_id and nickname in self.player_data:
+                self.player_data[nickname]["is_supporter"] = is_supporter(user_id)
+    
     async def save_player_to_db(self, client_id: str):
         """Save player state to SQLite database"""
-        global world_data, db_instance
+        global world_data
         if client_id not in self.player_data:
             return
         
@@ -1285,34 +1780,44 @@ class ConnectionManager:
             return
         
         player = self.player_data[client_id]
-        pos = player.get("position", [0, 0, 0])
-        # Ensure z exists and all values are integers
-        if len(pos) < 3:
-            pos = [pos[0], pos[1], 0]
-        pos = [int(pos[0]), int(pos[1]), int(pos[2])]  # Force integer coordinates
-        
-        # Update world_data cache
-        if "users" not in world_data:
-            world_data["users"] = {}
-        if uuid not in world_data["users"]:
-            world_data["users"][uuid] = {}
+        # Ensure z exists and all values are integers (canonical positions pass through as-is)
+        pos = ensure_int_position(player.get("position", _ORIGIN))
         
-        world_data["users"][uuid]["position"] = {"x": pos[0], "y": pos[1], "z": pos[2]}
-        world_data["users"][uuid]["status"] = player.get("status", "Healthy")
-        world_data["users"][uuid]["inventory"] = player.get("inventory", {})
-        world_data["users"][uuid]["attributes"] = player.get("attributes", {})
-        world_data["users"][uuid]["skills"] = player.get("skills", {})
-        world_data["users"][uuid]["pinned_ids"] = player.get("pinned_ids", [])
-        world_data["users"][uuid]["is_dead"] = player.get("is_dead", False)
-        world_data["users"][uuid]["time_offset"] = player.get("time_offset", 0)
-        world_data["users"][uuid]["last_exercise"] = player.get("last_exercise", {})
-        world_data["users"][uuid]["nickname"] = client_id
+        # Update world_data cache (one users lookup; fields written in a single update)
+        user = world_data["users"].setdefault(uuid, {})
+        user.update({
+            "position": {"x": pos[0], "y": pos[1], "z": pos[2]},
+            "status": player.get("status", "Healthy"),
+            "inventory": player.get("inventory", {}),
+            "attributes": player.get("attributes", {}),
+            "skills": player.get("skills", {}),
+            "pinned_ids": player.get("pinned_ids", []),
+            "is_dead": player.get("is_dead", False),
+            "time_offset": player.get("time_offset", 0),
+            "last_exercise": player.get("last_exercise", {}),
+            "nickname": client_id,
+        })
         
-        # Save to SQLite DB
-        if db_instance is None:
-            db_instance = await get_db()
-        await db_instance.save_user(uuid, world_data["users"][uuid])
-        print(f"[SAVE] {client_id} saved to DB: pos=({pos[0]}, {pos[1]}, {pos[2]})")
+        # Save to SQLite DB (write-behind: coalesced + batched by write_behind_writer)
+        await write_behind("users", uuid, Database.user_row(uuid, user))
+        logger.info("[SAVE] %s queued for DB: pos=(%s, %s, %s)", client_id, pos[0], pos[1], pos[2])
+    
+    async def schedule_save(self, client_id: str):
+        """
+        Save the player via write-behind (row built now, DB write batched by write_behind_writer).
+        save가 진행 중이면 (write-behind 큐가 가득 찬 경우만 await) 합침 — 끝난 뒤 최신 상태로 한 번 더 저장하므로 손실 없음
+        """
+        if client_id in self.pending_saves:
+            self.pending_saves[client_id] = True  # re-save once the in-flight save returns
+            return
+        self.pending_saves[client_id] = False
+        try:
+            await self.save_player_to_db(client_id)
+            while self.pending_saves.get(client_id):
+                self.pending_saves[client_id] = False
+                await self.save_player_to_db(client_id)
+        finally:
+            self.pending_saves.pop(client_id, None)
     
     async def connect(self, websocket: WebSocket, client_id: str, accept: bool = True):
         """WebSocket connection. accept=False means only change ID for existing socket"""
@@ -1324,7 +1829,7 @@ class ConnectionManager:
             if client_id in self.active_connections:
                 await self.safe_close(client_id)
             
-            self.active_connections[client_id] = websocket
+            self._register(client_id, websocket)
             self.connection_times[client_id] = datetime.now()
             # player_data is initialized in websocket_endpoint
         except Exception as e:
@@ -1333,8 +1838,7 @@ class ConnectionManager:
     
     def disconnect(self, client_id: str):
         """Disconnect and cleanup"""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        self._unregister(client_id)
         if client_id in self.connection_times:
             del self.connection_times[client_id]
         print(f"[WS] {client_id} disconnected. Active: {len(self.active_connections)}")
@@ -1347,73 +1851,170 @@ class ConnectionManager:
             except Exception:
                 pass  # Connection might already be closed
     
-    async def send_personal(self, message: str, client_id: str) -> bool:
+    def _register(self, client_id: str, websocket: WebSocket):
+        """Map client_id → websocket (keeps socket_refs in sync)"""
+        old = self.active_connections.get(client_id)
+        if old is websocket:
+            return
+        self.active_connections[client_id] = websocket
+        key = id(websocket)
+        self.socket_refs[key] = self.socket_refs.get(key, 0) + 1
+        if old is not None:
+            self._release(old)
+    
+    def _unregister(self, client_id: str):
+        """Unmap client_id; the socket's writer is stopped once no client_id uses it"""
+        websocket = self.active_connections.pop(client_id, None)
+        if websocket is not None:
+            self._release(websocket)
+    
+    def _release(self, websocket: WebSocket):
+        key = id(websocket)
+        refs = self.socket_refs.get(key, 0) - 1
+        if refs > 0:
+            self.socket_refs[key] = refs
+            return
+        self.socket_refs.pop(key, None)
+        # Let the writer flush what is queued, then stop (unless the socket is re-registered)
+        outbox = self.outboxes.get(key)
+        if outbox is not None:
+            try:
+                outbox.put_nowait(None)
+            except asyncio.QueueFull:
+                # No room for the sentinel → the writer would wait on get() forever
+                self._stop_writer(websocket)
+    
+    def _stop_writer(self, websocket: WebSocket):
+        """Cancel the socket's writer and drop its queue (a task cancelled before it starts never runs its finally)"""
+        key = id(websocket)
+        self.outboxes.pop(key, None)
+        task = self.writer_tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+    
+    def _close_later(self, websocket: WebSocket):
+        """Close a dropped socket in the background so websocket_endpoint stops reading from it"""
+        async def close():
+            try:
+                await websocket.close()
+            except Exception:
+                pass  # Connection might already be closed
+        task = asyncio.create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    def _is_registered(self, websocket: WebSocket) -> bool:
+        """True if the socket is still mapped to any client_id"""
+        return id(websocket) in self.socket_refs
+    
+    def _cleanup_socket(self, websocket: WebSocket):
+        """Clean up every client_id still mapped to this socket"""
+        for client_id, conn in list(self.active_connections.items()):
+            if conn is websocket:
+                self.cleanup_client_state(client_id)
+    
+    async def _outbox_writer(self, websocket: WebSocket, outbox: asyncio.Queue):
         """
-        Send personal message (with error handling)
-        Returns: Success status
+        Drain one socket's outbound queue.
+        - 준비된 프레임을 모아서 (최대 WS_OUTBOX_BATCH) 스케줄러 재진입 없이 연속 전송
+        - None = disconnect sentinel
         """
-        if client_id not in self.active_connections:
-            return False
-        
+        key = id(websocket)
         try:
-            await self.active_connections[client_id].send_text(message)
-            return True
+            while True:
+                batch = [await outbox.get()]
+                while len(batch) < WS_OUTBOX_BATCH and not outbox.empty():
+                    batch.append(outbox.get_nowait())
+                for message in batch:
+                    if message is None:
+                        if not self._is_registered(websocket):
+                            return
+                        continue
+                    await websocket.send_text(message)
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            print(f"[WS ERROR] Failed to send to {client_id}: {e}")
+            print(f"[WS ERROR] Outbound writer failed: {e}")
             # Clean up zombie connection
-            self.cleanup_client_state(client_id)
+            self._cleanup_socket(websocket)
+        finally:
+            # Only drop our own entries (_stop_writer may already have removed them)
+            if self.outboxes.get(key) is outbox:
+                del self.outboxes[key]
+                self.writer_tasks.pop(key, None)
+    
+    def _enqueue(self, websocket: WebSocket, message: str) -> bool:
+        """Queue a text frame for the socket's writer (starts the writer lazily)"""
+        key = id(websocket)
+        outbox = self.outboxes.get(key)
+        if outbox is None:
+            if key not in self.socket_refs:
+                return False  # Dropped socket (e.g. later in a broadcast snapshot) — don't restart its writer
+            outbox = asyncio.Queue(maxsize=WS_OUTBOX_MAXSIZE)
+            self.outboxes[key] = outbox
+            self.writer_tasks[key] = asyncio.create_task(self._outbox_writer(websocket, outbox))
+        try:
+            outbox.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            # Client is not reading — treat as zombie: stop the writer, drop state, close the socket
+            print("[WS ERROR] Outbound queue full, dropping connection")
+            self._stop_writer(websocket)
+            self._cleanup_socket(websocket)
+            self._close_later(websocket)
+            return False
+    
+    async def send_personal(self, message: str, client_id: str) -> bool:
+        """
+        Send personal message (queued to the per-socket writer, never blocks on network I/O)
+        Returns: Success status (queued)
+        """
+        websocket = self.active_connections.get(client_id)
+        if websocket is None:
+            return False
+        return self._enqueue(websocket, message)
+    
+    async def send_message(self, client_id: str, msg_type: str, content: str, timestamp: Optional[str] = None) -> bool:
+        """
+        Send a {"type", "content", "timestamp"} frame to one client.
+        If the client is already gone (disconnect race on error paths) nothing is encoded at all.
+        """
+        websocket = self.active_connections.get(client_id)
+        if websocket is None:
             return False
+        return self._enqueue(websocket, to_json({
+            "type": msg_type,
+            "content": content,
+            "timestamp": timestamp or frame_timestamp()
+        }))
     
     async def broadcast(self, message: str, exclude: str = None):
         """
         Send message to all connected clients
         - Automatically cleans up failed connections
         """
-        dead_connections = []
-        
         for client_id, connection in list(self.active_connections.items()):
             if client_id == exclude:
                 continue
-            
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"[WS ERROR] Broadcast failed for {client_id}: {e}")
-                dead_connections.append(client_id)
-        
-        # Clean up zombie connections
-        for client_id in dead_connections:
-            self.cleanup_client_state(client_id)
+            # Failed sockets are cleaned up by their writer
+            self._enqueue(connection, message)
 
     async def broadcast_nearby(self, message: str, position: List[int], radius: int = 5, exclude: str = None):
         """
-        Broadcast message to players within a certain radius (Manhattan distance)
+        Broadcast message to players within a certain radius (square box: |dx| <= r and |dy| <= r)
         - position: [x, y, z] or [x, y]
-        - radius: distance threshold
+        - radius: distance threshold (integer compares only, no sqrt; z is ignored)
         """
-        dead_connections = []
         x = position[0] if len(position) > 0 else 0
         y = position[1] if len(position) > 1 else 0
         
-        for client_id, connection in list(self.active_connections.items()):
+        # Grid lookup → only players in the surrounding cells are checked
+        for client_id, _ in self.player_index.within(x, y, radius, self.player_data):
             if client_id == exclude:
                 continue
-            
-            # Get player position
-            pdata = self.player_data.get(client_id, {})
-            ppos = pdata.get("position", [9999, 9999]) # Default to far away
-            
-            # Manhattan distance check
-            if abs(ppos[0] - x) <= radius and abs(ppos[1] - y) <= radius:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    print(f"[WS ERROR] Nearby broadcast failed for {client_id}: {e}")
-                    dead_connections.append(client_id)
-        
-        # Clean up zombie connections
-        for client_id in dead_connections:
-            self.cleanup_client_state(client_id)
+            connection = self.active_connections.get(client_id)
+            if connection is not None:
+                self._enqueue(connection, message)
     
     def get_active_count(self) -> int:
         """Return active connection count"""
@@ -1436,9 +2037,92 @@ class ConnectionManager:
         # Player/cache cleanup
         if client_id in self.player_data:
             del self.player_data[client_id]
+        self.player_index.unindex(client_id)
         if client_id in self.nickname_to_uuid:
             del self.nickname_to_uuid[client_id]
 
+# Object spatial index cell size (world units)
+OBJECT_GRID_CELL = 16
+
+class ObjectSpatialIndex:
+    """
+    Uniform 2D grid over world_data["objects"]: (x // cell, y // cell) -> {obj_id}
+    - Nearby queries only visit the surrounding cells instead of every object
+    - Callers must index()/unindex() wherever objects are inserted, moved or removed
+    """
+    
+    def __init__(self, cell_size: int = OBJECT_GRID_CELL):
+        self.cell_size = cell_size
+        self.cells: Dict[tuple, set] = {}
+        self.obj_cells: Dict[str, tuple] = {}
+    
+    def _cell_of(self, obj: dict) -> tuple:
+        # Same default as the old linear scans (no position → far away)
+        pos = ensure_int_position(obj.get("position", [999, 999]) if isinstance(obj, dict) else None)
+        return (pos[0] // self.cell_size, pos[1] // self.cell_size)
+    
+    def rebuild(self, objects: dict):
+        """Re-index every object (startup / cache reload)"""
+        self.cells = {}
+        self.obj_cells = {}
+        for obj_id, obj in objects.items():
+            self.index(obj_id, obj)
+    
+    def index(self, obj_id: str, obj: dict):
+        """Insert or move an object"""
+        cell = self._cell_of(obj)
+        old_cell = self.obj_cells.get(obj_id)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self._discard(obj_id, old_cell)
+        self.cells.setdefault(cell, set()).add(obj_id)
+        self.obj_cells[obj_id] = cell
+    
+    def unindex(self, obj_id: str):
+        """Remove an object"""
+        old_cell = self.obj_cells.pop(obj_id, None)
+        if old_cell is not None:
+            self._discard(obj_id, old_cell)
+    
+    def _discard(self, obj_id: str, cell: tuple):
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(obj_id)
+            if not bucket:
+                del self.cells[cell]
+    
+    def within(self, x: int, y: int, radius: int, objects: dict) -> List[tuple]:
+        """
+        (obj_id, obj) pairs with |dx| <= radius and |dy| <= radius.
+        Cells lying entirely inside the box are taken whole; only the
+        border ring of cells needs the per-object position check.
+        """
+        cs = self.cell_size
+        x, y = int(x), int(y)
+        x_lo, x_hi, y_lo, y_hi = x - radius, x + radius, y - radius, y + radius
+        result = []
+        cells = self.cells
+        for cx in range(x_lo // cs, x_hi // cs + 1):
+            x_inside = cx * cs >= x_lo and cx * cs + cs - 1 <= x_hi
+            for cy in range(y_lo // cs, y_hi // cs + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                inside = x_inside and cy * cs >= y_lo and cy * cs + cs - 1 <= y_hi
+                for obj_id in bucket:
+                    obj = objects.get(obj_id)
+                    if obj is None:
+                        continue
+                    if not inside:
+                        obj_pos = ensure_int_position(obj.get("position", [999, 999]))
+                        if abs(obj_pos[0] - x) > radius or abs(obj_pos[1] - y) > radius:
+                            continue
+                    result.append((obj_id, obj))
+        return result
+
+object_index = ObjectSpatialIndex()
+
 manager = ConnectionManager()
 
 # === Backup System (Git Integration) ===
@@ -1450,77 +2134,66 @@ LOG_ARCHIVE_KEEP_LAST = int(os.getenv("LOG_ARCHIVE_KEEP_LAST", "50000"))
 LOG_ARCHIVE_COMPRESS_GZIP = os.getenv("LOG_ARCHIVE_COMPRESS_GZIP", "true").lower() in ("1", "true", "yes", "y", "on")
 LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", os.path.join(BACKUP_DIR, "logs"))
 
-def backup_world_data_with_git(auto_git: bool = False):
-    """
-    DB에서 world_data를 추출하여 JSON 백업 및 선택적 Git 푸시
-    (시작 시 호출 - 동기 버전)
-    """
-    # 시작 시에는 DB가 아직 초기화되지 않았을 수 있으므로
-    # 기존 JSON 파일이 있으면 그것을 백업
-    if os.path.exists(WORLD_DATA_FILE):
-        # backup 폴더 생성
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        
-        # 타임스탬프 생성 (YYYYMMDD_HHMM)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-        backup_filename = f"world_data_{timestamp}.json"
-        backup_path = os.path.join(BACKUP_DIR, backup_filename)
-        
-        # 파일 복사
-        shutil.copy2(WORLD_DATA_FILE, backup_path)
-        print(f"[BACKUP] World data backed up to: {backup_path}")
-        
-        # Git 자동 커밋 & 푸시
-        if auto_git and GIT_AUTO_PUSH:
-            git_commit_and_push(backup_path, timestamp)
-        
-        return backup_path
-    
-    print("[BACKUP] No JSON file to backup (using SQLite DB)")
-    return None
+# Backup/archive folders are created once at import (not on every backup)
+os.makedirs(BACKUP_DIR, exist_ok=True)
+os.makedirs(LOG_ARCHIVE_DIR, exist_ok=True)
+
+def _backup_timestamp() -> str:
+    """Backup file timestamp (YYYYMMDD_HHMM)"""
+    return datetime.now().strftime("%Y%m%d_%H%M")
+
+# Incremental history backup (append-only JSONL next to the world snapshots)
+HISTORY_BACKUP_FILE = "world_history.jsonl"
+# Midnight DB export as .json.gz (level 1: fast, still ~5-10x smaller for repetitive world JSON)
+BACKUP_COMPRESS_GZIP = os.getenv("BACKUP_COMPRESS_GZIP", "true").lower() in ("1", "true", "yes", "y", "on")
+
+async def _run_git(*args: str) -> tuple:
+    """git 서브프로세스를 이벤트 루프를 막지 않고 실행 → (returncode, stdout, stderr)"""
+    proc = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
 
-def git_commit_and_push(backup_path: str, timestamp: str):
+async def git_commit_and_push(backup_path: str, timestamp: str):
     """Git에 백업 파일 커밋 및 푸시"""
-    import subprocess
-    
     try:
-        # 1. 백업 파일 스테이징
-        subprocess.run(["git", "add", backup_path], check=True, capture_output=True)
-        subprocess.run(["git", "add", WORLD_DATA_FILE], check=True, capture_output=True)
+        # 1. 백업 파일 스테이징 (git 프로세스 1회로 모든 경로 추가)
+        paths = [backup_path]
+        history_path = os.path.join(BACKUP_DIR, HISTORY_BACKUP_FILE)
+        if os.path.exists(history_path):
+            paths.append(history_path)
+        paths.append(WORLD_DATA_FILE)
+        returncode, _, stderr = await _run_git("add", "--", *paths)
+        if returncode != 0:
+            print(f"[GIT ERROR] Git command failed: {stderr.strip()}")
+            return
         
         # 2. 커밋
         commit_msg = f"[AUTO-BACKUP] World data backup {timestamp}"
-        result = subprocess.run(
-            ["git", "commit", "-m", commit_msg],
-            capture_output=True,
-            text=True
-        )
+        returncode, stdout, stderr = await _run_git("commit", "-m", commit_msg)
         
-        if result.returncode == 0:
+        if returncode == 0:
             print(f"[GIT] Committed: {commit_msg}")
             
             # 3. 푸시
-            push_result = subprocess.run(
-                ["git", "push"],
-                capture_output=True,
-                text=True
-            )
+            push_returncode, _, push_stderr = await _run_git("push")
             
-            if push_result.returncode == 0:
+            if push_returncode == 0:
                 print(f"[GIT] Pushed to remote repository successfully!")
             else:
-                print(f"[GIT ERROR] Push failed: {push_result.stderr}")
+                print(f"[GIT ERROR] Push failed: {push_stderr}")
         else:
             # 변경사항이 없으면 커밋 스킵
-            if "nothing to commit" in result.stdout or "nothing to commit" in result.stderr:
+            if "nothing to commit" in stdout or "nothing to commit" in stderr:
                 print("[GIT] No changes to commit.")
             else:
-                print(f"[GIT ERROR] Commit failed: {result.stderr}")
+                print(f"[GIT ERROR] Commit failed: {stderr}")
                 
     except FileNotFoundError:
         print("[GIT ERROR] Git is not installed or not in PATH.")
-    except subprocess.CalledProcessError as e:
-        print(f"[GIT ERROR] Git command failed: {e}")
     except Exception as e:
         print(f"[GIT ERROR] Unexpected error: {e}")
 
@@ -1538,75 +2211,85 @@ async def backup_db_to_json_file():
     """DB의 모든 내용을 JSON 파일로 추출 (백업용)"""
     db = await get_db()
     
-    # backup 폴더 생성
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-    
-    # 타임스탬프 생성 (YYYYMMDD_HHMM)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    backup_filename = f"world_data_{timestamp}.json"
+    timestamp = _backup_timestamp()
+    backup_filename = f"world_data_{timestamp}.json.gz" if BACKUP_COMPRESS_GZIP else f"world_data_{timestamp}.json"
     backup_path = os.path.join(BACKUP_DIR, backup_filename)
     
-    # DB에서 전체 상태 추출
-    json_content = await db.export_to_json()
-    
-    # 파일로 저장
-    with open(backup_path, "w", encoding="utf-8") as f:
-        f.write(json_content)
-    
-    print(f"[BACKUP] DB exported to: {backup_path}")
+    # DB에서 전체 상태를 스트리밍으로 추출 (history 제외 — 아래 JSONL에 증분으로 추가)
+    # 전체 JSON 문자열을 메모리에 만들지 않고 row 단위로 스트리밍 — open/gzip 압축/write는 워커 스레드에서
+    if BACKUP_COMPRESS_GZIP:
+        opener = lambda: gzip.open(backup_path, "wt", encoding="utf-8", compresslevel=1)
+    else:
+        opener = lambda: open(backup_path, "w", encoding="utf-8")
+    await write_text_stream(opener, db.iter_export_json(include_history=False))
+    await asyncio.to_thread(_record_backup, backup_path)  # sha256 of a multi-MB file
+    
+    # History: 마지막 백업 이후의 로그만 append (매번 전체 재인코딩하지 않음)
+    history_path = os.path.join(BACKUP_DIR, HISTORY_BACKUP_FILE)
+    last_id = int(await db.get_rule("history_backup_last_id") or 0)
+    new_last_id = await db.append_logs_to_jsonl(history_path, after_id=last_id)
+    if new_last_id != last_id:
+        await db.set_rule("history_backup_last_id", new_last_id)
+    
+    print(f"[BACKUP] DB exported to: {backup_path} (history +{new_last_id - last_id} ids → {history_path})")
     return backup_path, timestamp
 
-async def midnight_backup_scheduler():
-    """매일 자정에 백업 실행하는 스케줄러 (DB → JSON 덤프)"""
+async def run_midnight_backup():
+    """자정 백업 (DB → JSON 추출 + 선택적 Git 푸시)"""
+    print("[SCHEDULER] Midnight backup starting...")
+    try:
+        backup_path, timestamp = await backup_db_to_json_file()
+        
+        # Git 자동 푸시 (비동기 subprocess — 이벤트 루프를 막지 않음)
+        if GIT_AUTO_PUSH:
+            await git_commit_and_push(backup_path, timestamp)
+    except Exception as e:
+        print(f"[SCHEDULER ERROR] Backup failed: {e}")
+
+async def run_midnight_log_archive():
+    """logs를 아카이브하고 DB에는 최근 N개만 남김 (world state는 유지)"""
+    print("[LOGS] Midnight log archive starting...")
+    try:
+        db = await get_db()
+        result = await db.archive_and_trim_logs(
+            archive_dir=LOG_ARCHIVE_DIR,
+            keep_last=LOG_ARCHIVE_KEEP_LAST,
+            compress_gzip=LOG_ARCHIVE_COMPRESS_GZIP,
+        )
+        if result:
+            print(f"[LOGS] Archived {result['archived']} rows to {result['path']} (kept last {result['kept']})")
+        else:
+            print(f"[LOGS] No archive needed (<= {LOG_ARCHIVE_KEEP_LAST} rows)")
+    except Exception as e:
+        print(f"[LOGS ERROR] Log archive failed: {e}")
+
+async def midnight_scheduler(run_backup: bool, run_log_archive: bool):
+    """
+    매일 자정 작업을 타이머 하나로 실행
+    - 백업 먼저: history JSONL 증분이 trim 전에 로그를 가져가도록
+    - 그 다음 로그 아카이브 (같은 DB 커넥션 재사용)
+    """
     while True:
         # 자정까지 대기
         seconds_until_midnight = get_seconds_until_midnight()
-        print(f"[SCHEDULER] Next backup in {seconds_until_midnight/3600:.1f} hours (at midnight)")
-        
+        print(f"[SCHEDULER] Next midnight run in {seconds_until_midnight/3600:.1f} hours")
         await asyncio.sleep(seconds_until_midnight)
         
-        # 자정 백업 실행 (DB → JSON 추출)
-        print("[SCHEDULER] Midnight backup starting...")
-        try:
-            backup_path, timestamp = await backup_db_to_json_file()
-            
-            # Git 자동 푸시
-            if GIT_AUTO_PUSH:
-                git_commit_and_push(backup_path, timestamp)
-        except Exception as e:
-            print(f"[SCHEDULER ERROR] Backup failed: {e}")
+        if run_backup:
+            await run_midnight_backup()
+        if run_log_archive:
+            await run_midnight_log_archive()
         
         # 1분 대기 (같은 자정에 중복 실행 방지)
         await asyncio.sleep(60)
 
-async def midnight_log_archive_scheduler():
-    """매일 자정에 logs를 아카이브하고 DB에는 최근 N개만 남김 (world state는 유지)"""
-    while True:
-        seconds_until_midnight = get_seconds_until_midnight()
-        print(f"[LOGS] Next log archive in {seconds_until_midnight/3600:.1f} hours (at midnight)")
-        await asyncio.sleep(seconds_until_midnight)
-
-        print("[LOGS] Midnight log archive starting...")
-        try:
-            db = await get_db()
-            result = await db.archive_and_trim_logs(
-                archive_dir=LOG_ARCHIVE_DIR,
-                keep_last=LOG_ARCHIVE_KEEP_LAST,
-                compress_gzip=LOG_ARCHIVE_COMPRESS_GZIP,
-            )
-            if result:
-                print(f"[LOGS] Archived {result['archived']} rows to {result['path']} (kept last {result['kept']})")
-            else:
-                print(f"[LOGS] No archive needed (<= {LOG_ARCHIVE_KEEP_LAST} rows)")
-        except Exception as e:
-            print(f"[LOGS ERROR] Log archive failed: {e}")
-
-        await asyncio.sleep(60)
-
 # === FastAPI Application ===
 scheduler_task = None
-log_archive_task = None
-memory_cleanup_task = None
+backup_janitor_task = None
+history_consumer_task = None
+history_queue: asyncio.Queue = asyncio.Queue(maxsize=HISTORY_QUEUE_MAXSIZE)
+write_behind_task = None
+write_behind_queue: asyncio.Queue = asyncio.Queue(maxsize=PERSIST_QUEUE_MAXSIZE)
 
 # Global database instance
 db_instance: Optional[Database] = None
@@ -1625,18 +2308,16 @@ async def migrate_json_to_db_if_needed():
         print(f"[MIGRATION] Found {WORLD_DATA_FILE}, migrating to SQLite...")
         
         try:
-            # JSON 파일 읽기
-            with open(WORLD_DATA_FILE, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
+            # JSON 파일 읽기 (수 MB 가능 → 이벤트 루프 밖에서 read + parse)
+            json_data = await asyncio.to_thread(_read_json_file, WORLD_DATA_FILE)
             
             # DB로 마이그레이션
             await migrate_from_json(db_instance, json_data)
             
-            # backup 폴더 생성 및 JSON 파일 이동
-            os.makedirs(BACKUP_DIR, exist_ok=True)
+            # JSON 파일을 backup 폴더로 이동
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = os.path.join(BACKUP_DIR, f"world_data_migrated_{timestamp}.json")
-            shutil.move(WORLD_DATA_FILE, backup_path)
+            await asyncio.to_thread(shutil.move, WORLD_DATA_FILE, backup_path)
             
             print(f"[MIGRATION] Original JSON moved to: {backup_path}")
             print("[MIGRATION] Migration completed! Now using SQLite database.")
@@ -1647,37 +2328,177 @@ async def migrate_json_to_db_if_needed():
     
     return db_instance
 
+def normalize_user_records(users: dict) -> int:
+    """
+    One-pass user schema normalization at load time, so connects can trust it:
+    - legacy string entries → dict format
+    - position → {"x": int, "y": int, "z": int}
+    - missing attributes / skills / inventory / status filled with defaults
+    Returns the number of legacy entries converted.
+    """
+    converted = 0
+    for uuid, user_data in users.items():
+        if not isinstance(user_data, dict):
+            users[uuid] = {
+                "nickname": user_data,
+                "name_set": True,
+                "position": {"x": 0, "y": 0, "z": 0},
+                "status": "Healthy",
+                "inventory": {},
+                "attributes": {},
+                "skills": {},
+                "time_offset": 0,
+                "last_exercise": {}
+            }
+            converted += 1
+            continue
+        pos = user_data.get("position")
+        if not isinstance(pos, dict):
+            pos = {}
+        try:
+            user_data["position"] = {
+                "x": int(pos.get("x", 0) or 0),
+                "y": int(pos.get("y", 0) or 0),
+                "z": int(pos.get("z", 0) or 0)
+            }
+        except (TypeError, ValueError, OverflowError):
+            # One corrupt row must not abort boot — that user respawns at the origin
+            print(f"[LOAD WARN] Invalid position for user {uuid}: {pos!r} → reset to (0, 0, 0)")
+            user_data["position"] = {"x": 0, "y": 0, "z": 0}
+        user_data.setdefault("status", "Healthy")
+        user_data.setdefault("inventory", {})
+        user_data.setdefault("attributes", {})
+        user_data.setdefault("skills", {})
+    return converted
+
 async def load_world_data_from_db() -> dict:
-    """Load world_data cache from DB (API compatibility)"""
-    global db_instance
-    if db_instance is None:
-        db_instance = await get_db()
-    return await db_instance.get_full_world_state()
+    """Load world_data cache from DB (API compatibility) — user records come back normalized"""
+    data = ensure_world_sections(await db_instance.get_full_world_state())
+    normalize_user_records(data["users"])
+    return data
 
-async def periodic_memory_cleanup():
-    """Periodically trim in-memory structures to avoid RAM issues on small servers."""
-    global world_data
+async def record_history(entry: dict):
+    """
+    Record an action in history.
+    - In-memory deque append is immediate (O(1), no lock)
+    - DB log row is queued and written in batches by history_consumer
+    """
+    world_data["history"].append(entry)
+    history_prompt_tail.append(to_json(entry))
+    try:
+        history_queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        await history_queue.put(entry)
+
+async def history_consumer():
+    """Drain queued history entries into the logs table (one transaction per batch)"""
+    while True:
+        batch = [await history_queue.get()]
+        while len(batch) < HISTORY_FLUSH_BATCH and not history_queue.empty():
+            batch.append(history_queue.get_nowait())
+        try:
+            await db_instance.add_logs(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[HISTORY ERROR] {e}")
+        finally:
+            for _ in batch:
+                history_queue.task_done()
+
+# write_behind marker for modified objects: the row is built once at flush time from world_data["objects"]
+DEFERRED_OBJECT_ROW = object()
+
+async def write_behind(table: str, key: str, row):
+    """
+    Queue a pre-serialized row (Database.*_row) for write_behind_writer; row=None deletes the key.
+    Rows are built by the caller at call time, so later in-memory mutations never leak in.
+    row=DEFERRED_OBJECT_ROW ("objects" only) serializes the current object at flush instead,
+    so an object modified N times within one window is encoded once, not N times.
+    """
+    item = (table, key, row)
+    try:
+        write_behind_queue.put_nowait(item)
+    except asyncio.QueueFull:
+        await write_behind_queue.put(item)
+
+async def write_behind_writer():
+    """Drain queued rows: wait up to WRITE_BEHIND_FLUSH_MS for more, then one transaction for the batch"""
+    loop = asyncio.get_running_loop()
     while True:
+        batch = [await write_behind_queue.get()]
+        deadline = loop.time() + WRITE_BEHIND_FLUSH_MS / 1000
+        while len(batch) < WRITE_BEHIND_FLUSH_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(write_behind_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Last write wins per (table, key): a player saved 5 times in one window is written once
+        latest = {}
+        for table, key, row in batch:
+            latest.pop((table, key), None)  # re-insert so ordering follows the latest write
+            latest[(table, key)] = row
+        upserts: Dict[str, List[tuple]] = {}
+        deletes: Dict[str, List[str]] = {}
+        deferred = []
+        for (table, key), row in latest.items():
+            if row is None:
+                deletes.setdefault(table, []).append(key)
+            elif row is DEFERRED_OBJECT_ROW:
+                deferred.append(key)
+            else:
+                upserts.setdefault(table, []).append(row)
         try:
-            # Bound in-memory history list
-            history = world_data.get("history")
-            if isinstance(history, list) and len(history) > MAX_IN_MEMORY_HISTORY:
-                world_data["history"] = history[-MAX_IN_MEMORY_HISTORY:]
+            if deferred:
+                # Snapshot modified objects under the read lock (gone = destroyed elsewhere → nothing to save)
+                rows = upserts.setdefault("objects", [])
+                async with world_data_lock.reader():
+                    objs = world_data.get("objects", EMPTY_MAP)
+                    for key in deferred:
+                        obj = objs.get(key)
+                        if obj is None:
+                            continue
+                        # One bad object must not drop the rest of the batch
+                        try:
+                            rows.append(Database.object_row(key, obj))
+                        except Exception as e:
+                            print(f"[PERSIST ERROR] write-behind: could not serialize object {key}: {e}")
+            await db_instance.write_rows(upserts, deletes)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            # Never let cleanup crash the server
-            print(f"[CLEANUP ERROR] {e}")
+            print(f"[PERSIST ERROR] write-behind batch: {e}")
+        finally:
+            for _ in batch:
+                write_behind_queue.task_done()
 
-        await asyncio.sleep(MEMORY_CLEANUP_INTERVAL_SECONDS)
+async def backup_janitor():
+    """Periodically prune old backup files (retention sweep off the write path)"""
+    while True:
+        await asyncio.sleep(BACKUP_CLEANUP_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_cleanup_old_backups)
+        except Exception as e:
+            print(f"[CLEANUP ERROR] Backup sweep failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global world_data, scheduler_task, log_archive_task, db_instance, memory_cleanup_task, all_nicknames
+    global world_data, scheduler_task, db_instance, all_nicknames, history_consumer_task, backup_janitor_task, write_behind_task
     
     # Initialize SQLite DB + JSON migration
     db_instance = await migrate_json_to_db_if_needed()
-    
+    # 이후 모든 경로는 db_instance가 열려 있다고 가정 (per-call get_db() 가드 없음)
+    if db_instance is None:
+        raise RuntimeError("DB failed to initialize")
+
     # Load world_data cache from DB
     world_data = await load_world_data_from_db()
+    invalidate_supporters_cache()
+    world_data["history"] = deque(world_data.get("history") or [], maxlen=MAX_IN_MEMORY_HISTORY)
+    reset_history_prompt_tail()
     
     # Register Welcome Kit to DB
     await register_welcome_kit_to_db()
@@ -1685,6 +2506,9 @@ async def lifespan(app: FastAPI):
     # Initialize Omni-Laboratory near spawn
     await register_omni_laboratory_to_db()
     
+    # Build object spatial index (after all startup objects are in the cache)
+    object_index.rebuild(world_data["objects"])
+    
     # Initialize all_nicknames set (Optimization O(1))
     all_nicknames = set()
     users = world_data.get("users", {})
@@ -1702,37 +2526,45 @@ async def lifespan(app: FastAPI):
     
     print(f"[SERVER] World loaded from SQLite. Objects: {len(world_data.get('objects', {}))}, Users: {len(world_data.get('users', {}))}")
     
-    # Start midnight auto-backup scheduler
-    if GIT_AUTO_PUSH:
-        scheduler_task = asyncio.create_task(midnight_backup_scheduler())
-        print("[SCHEDULER] Midnight auto-backup scheduler started!")
+    # Start midnight scheduler (auto-backup + log archive share one timer)
+    if GIT_AUTO_PUSH or LOG_ARCHIVE_ENABLED:
+        scheduler_task = asyncio.create_task(midnight_scheduler(
+            run_backup=GIT_AUTO_PUSH,
+            run_log_archive=LOG_ARCHIVE_ENABLED,
+        ))
+        if GIT_AUTO_PUSH:
+            print("[SCHEDULER] Midnight auto-backup scheduler started!")
+        if LOG_ARCHIVE_ENABLED:
+            print("[LOGS] Midnight log archive scheduler started!")
 
-    # Start midnight log archive scheduler
-    if LOG_ARCHIVE_ENABLED:
-        log_archive_task = asyncio.create_task(midnight_log_archive_scheduler())
-        print("[LOGS] Midnight log archive scheduler started!")
-
-    # Memory cleanup loop
-    memory_cleanup_task = asyncio.create_task(periodic_memory_cleanup())
+    # Backup retention sweep
+    backup_janitor_task = asyncio.create_task(backup_janitor())
+    
+    # Background DB writers
+    history_consumer_task = asyncio.create_task(history_consumer())
+    write_behind_task = asyncio.create_task(write_behind_writer())
     
     yield
     
-    # On shutdown
-    if scheduler_task:
-        scheduler_task.cancel()
-        print("[SCHEDULER] Backup scheduler stopped.")
-
-    if log_archive_task:
-        log_archive_task.cancel()
-        print("[LOGS] Log archive scheduler stopped.")
-
-    if memory_cleanup_task:
-        memory_cleanup_task.cancel()
-        print("[CLEANUP] Memory cleanup loop stopped.")
+    # On shutdown: stop periodic tasks together so shutdown waits for the slowest, not the sum
+    periodic_tasks = [t for t in (scheduler_task, backup_janitor_task) if t]
+    for task in periodic_tasks:
+        task.cancel()
+    await asyncio.gather(*periodic_tasks, return_exceptions=True)
+    print("[SCHEDULER] Periodic tasks stopped.")
+    
+    # Flush pending background writes before closing DB (both queues drain concurrently)
+    await asyncio.gather(history_queue.join(), write_behind_queue.join())
+    writer_tasks = [t for t in (history_consumer_task, write_behind_task) if t]
+    for task in writer_tasks:
+        task.cancel()
+    await asyncio.gather(*writer_tasks, return_exceptions=True)
+    print("[PERSIST] Background DB writers drained and stopped.")
     
     # Close DB connection
     await close_db()
     print("[SERVER] Database connection closed.")
+    log_listener.stop()
     print("[SERVER] Shutdown complete.")
 
 app = FastAPI(title="undefined", lifespan=lifespan)
@@ -1746,6 +2578,16 @@ async def health_check():
     """Health check endpoint for uptime monitors (e.g., UptimeRobot)."""
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    """Lightweight runtime metrics (/do queue depth, connections)"""
+    return {
+        "do_capacity": DO_SEMAPHORE.capacity,
+        "do_in_use": DO_SEMAPHORE.in_use,
+        "do_waiting": DO_SEMAPHORE.waiting,
+        "active_connections": manager.get_active_count(),
+    }
+
 @app.get("/", response_class=HTMLResponse)
 async def get_home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -1756,6 +2598,19 @@ async def get_home(request: Request):
 # ╚═══════════════════════════════════════════════════════════════════════════════╝
 
 BMC_WEBHOOK_SECRET = os.getenv("BMC_WEBHOOK_SECRET", "")  # Optional: for verification
+# AI 응답의 마크다운 코드블록 (닫는 ``` 가 없으면 끝까지)
+_JSON_FENCE_PATTERN = re.compile(r'```json(.*?)(?:```|\Z)', re.DOTALL)
+_CODE_FENCE_PATTERN = re.compile(r'```(.*?)(?:```|\Z)', re.DOTALL)
+UUID_PATTERN = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+# Nicknames (/name and first-time set_nickname): word chars (Unicode — 한글 OK) and '-',
+# capped so oversized input is rejected before any dict lookup
+NICKNAME_MAX_LEN = 32
+NICKNAME_PATTERN = re.compile(r'[\w\-]+')
+NICKNAME_ERROR = f"[ERROR] Nickname must be 1-{NICKNAME_MAX_LEN} letters, digits, '_' or '-'."
+
+def validate_nickname(nickname: str) -> bool:
+    """Shared nickname rule for every rename path"""
+    return len(nickname) <= NICKNAME_MAX_LEN and NICKNAME_PATTERN.fullmatch(nickname) is not None
 
 @app.post("/webhook/bmc")
 async def bmc_webhook(request: Request):
@@ -1774,7 +2629,7 @@ async def bmc_webhook(request: Request):
             return {"status": "unauthorized"}
     
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         
         # BMC webhook payload structure
         supporter_name = data.get("supporter_name", "Anonymous")
@@ -1789,20 +2644,16 @@ async def bmc_webhook(request: Request):
         uuid_candidate = None
         
         # Try to find UUID pattern in message
-        import re
-        uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-        match = re.search(uuid_pattern, supporter_message.lower())
+        match = UUID_PATTERN.search(supporter_message.lower())
         
         if match:
             uuid_candidate = match.group(0)
             
             # Check if this UUID exists in our users
-            if uuid_candidate in world_data.get("users", {}):
+            if uuid_candidate in world_data["users"]:
                 # Register as supporter
-                if "supporters" not in world_data:
-                    world_data["supporters"] = {}
-                
                 user_data = world_data["users"][uuid_candidate]
+                now_iso = datetime.now().isoformat()
                 nickname = user_data["nickname"] if isinstance(user_data, dict) else user_data
                 
                 world_data["supporters"][uuid_candidate] = {
@@ -1810,20 +2661,23 @@ async def bmc_webhook(request: Request):
                     "is_supporter": True,
                     "supporter_name": supporter_name,
                     "amount": amount,
-                    "registered_at": datetime.now().isoformat()
+                    "registered_at": now_iso
                 }
                 
+                invalidate_supporters_cache()
+                
                 # DB에 저장
                 db = await get_db()
                 await db.save_supporter(uuid_candidate, world_data["supporters"][uuid_candidate])
+                manager.refresh_supporter(uuid_candidate)
                 
                 print(f"[BMC] ✅ Registered supporter: {nickname} (UUID: {uuid_candidate[:8]}...)")
                 
                 # Broadcast to all connected users
-                announce_msg = json.dumps({
+                announce_msg = to_json({
                     "type": "system",
                     "content": f"🌟 [SUPPORTER] Thank you {nickname} for supporting the server! ☕💛",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": now_iso
                 })
                 await manager.broadcast(announce_msg)
                 
@@ -1841,22 +2695,17 @@ async def bmc_webhook(request: Request):
 
 
 @app.get("/api/supporters")
-async def get_supporters():
-    """Public API: List all supporters (nicknames only, no UUIDs)"""
-    supporters = world_data.get("supporters", {})
-    return {
-        "count": len([s for s in supporters.values() if isinstance(s, dict)]),
-        "supporters": [
-            {"nickname": s.get("nickname", "?"), "since": s.get("registered_at", "?")}
-            for s in supporters.values() 
-            if isinstance(s, dict) and s.get("is_supporter")
-        ]
-    }
+async def get_supporters(request: Request):
+    """Public API: List all supporters (nicknames only, no UUIDs) — ETag/304 for repeat polls"""
+    etag = supporters_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=get_supporters_api_body(), media_type="application/json", headers={"ETag": etag})
 
 
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
-    global world_data, db_instance
+    global world_data
     
     # Initialize users dictionary if not exists
     async with world_data_lock:
@@ -1868,24 +2717,11 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             user_data = world_data["users"][user_id]
             is_new_user = False  # Existing user in DB, skip tutorial
             
-            # Support both old string format and new dict format
+            # Records are normalized at load (normalize_user_records); legacy strings only
+            # appear if something inserted one at runtime
             if isinstance(user_data, dict):
                 nickname = user_data["nickname"]
-                # Load saved position (default to 0,0,0, force integers)
-                saved_position = user_data.get("position", {"x": 0, "y": 0, "z": 0})
-                if "z" not in saved_position:
-                    saved_position["z"] = 0
-                # Ensure all coordinates are integers
-                saved_position = {
-                    "x": int(saved_position.get("x", 0) or 0),
-                    "y": int(saved_position.get("y", 0) or 0),
-                    "z": int(saved_position.get("z", 0) or 0)
-                }
-                # Initialize attributes and skills if missing (backward compatibility)
-                if "attributes" not in user_data:
-                    user_data["attributes"] = {}
-                if "skills" not in user_data:
-                    user_data["skills"] = {}
+                saved_position = dict(user_data["position"])
             else:
                 # Migrate legacy string format to new dict format
                 nickname = user_data
@@ -1938,9 +2774,6 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             is_new_user = True
             
     # DB Save (Outside Lock if possible, or ensure thread safety)
-    # db_instance methods are async and use aiosqlite, which is thread-safe per connection mostly
-    if db_instance is None:
-        db_instance = await get_db()
     
     # 여기서 world_data["users"][user_id]를 다시 읽어야 하는데 락이 필요할 수 있음.
     # 하지만 로컬 변수로 복사해둔 데이터가 없으므로 다시 읽거나, 위에서 복사해뒀어야 함.
@@ -1949,18 +2782,20 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     # 현재 구조상 Lock 밖에서 읽으면 그 사이에 변경될 수 있음.
     # -> 해결책: Lock 범위 안에서 데이터를 복사(deep copy)하여 DB 저장용 변수로 빼내거나,
     #    DB 저장 호출 자체를 Lock 안에서 수행 (단, DB I/O가 길어지면 락 점유 시간 길어짐)
-    #    여기서는 초기 접속시 한 번이므로 락 안에서 복사 후 밖에서 저장하는 방식 선택.
-    
-    async with world_data_lock:
-        user_data_for_db = world_data["users"][user_id].copy()
+    #    여기서는 락 안에서 row tuple로 직렬화 후, 밖에서 배치 writer 큐에 넣는 방식 선택.
     
-    await db_instance.save_user(user_id, user_data_for_db)
+    async with world_data_lock.reader():
+        user_row = Database.user_row(user_id, world_data["users"][user_id])
+    await write_behind("users", user_id, user_row)
     
     await manager.connect(websocket, nickname)
     
     # Store UUID-nickname mapping
     manager.nickname_to_uuid[nickname] = user_id
     
+    # 접속 시점 타임스탬프 (identity/init/welcome 메시지 공통)
+    joined_iso = datetime.now().isoformat()
+    
     # Initialize player_data from world_data
     manager.player_data[nickname] = {
         "id": nickname,
@@ -1973,48 +2808,54 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         "pinned_ids": world_data["users"][user_id].get("pinned_ids", []),
         "time_offset": world_data["users"][user_id].get("time_offset", 0),
         "last_exercise": world_data["users"][user_id].get("last_exercise", {}),
-        "joined_at": datetime.now().isoformat()
+        "is_supporter": is_supporter(user_id),  # cached for chat; refreshed via manager.refresh_supporter
+        "joined_at": joined_iso
     }
+    manager.reindex_player(manager.player_data[nickname])
     
     player_pos = [saved_position["x"], saved_position["y"], saved_position["z"]]
     
-    # Send identity
-    supporter_status = is_supporter(user_id)
-    await manager.send_personal(json.dumps({
+    # Connect-time frames for this client are bundled into one session_init message
+    session_frames: List[dict] = []
+    
+    # Identity
+    supporter_status = manager.player_data[nickname]["is_supporter"]
+    session_frames.append({
         "type": "identity",
         "user_id": user_id,
         "nickname": nickname,
         "is_new": is_new_user,
         "is_supporter": supporter_status,
         "position": player_pos,
-        "timestamp": datetime.now().isoformat()
-    }), nickname)
+        "timestamp": joined_iso
+    })
     
-    # Send init_position for HUD update
-    await manager.send_personal(json.dumps({
+    # init_position for HUD update
+    session_frames.append({
         "type": "init_position",
         "x": saved_position["x"],
         "y": saved_position["y"],
         "z": saved_position["z"],
-        "timestamp": datetime.now().isoformat()
-    }), nickname)
+        "timestamp": joined_iso
+    })
     
     print(f"[LOAD] {nickname} connected at position ({saved_position['x']}, {saved_position['y']}, z={saved_position['z']})")
     
     # Join message
     if is_new_user:
-        welcome_msg = json.dumps({
+        welcome_msg = {
             "type": "system",
             "content": f"[SYSTEM] A new soul '{nickname}' has been born into the world. Their potential has been woven by the design of Pathos ★.",
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": joined_iso
+        }
     else:
-        welcome_msg = json.dumps({
+        welcome_msg = {
             "type": "system",
             "content": f"[SYSTEM] {nickname} has returned to the world.",
-            "timestamp": datetime.now().isoformat()
-        })
-    await manager.broadcast(welcome_msg)
+            "timestamp": joined_iso
+        }
+    session_frames.append(welcome_msg)
+    await manager.broadcast(to_json(welcome_msg), exclude=nickname)
     
     # Send current location info
     # Use saved_position for location description
@@ -2040,26 +2881,34 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             "Use '/pin [name]' to remember important things forever. "
             "The Genesis Monolith (0,0,0) pulses in the distance. Begin your journey."
         )
-        await manager.send_personal(json.dumps({
+        session_frames.append({
             "type": "narrative",
             "content": tutorial_intro,
-            "timestamp": datetime.now().isoformat()
-        }), nickname)
+            "timestamp": joined_iso
+        })
     else:
         # Returning users see standard location info
         # Use the location description generated above using saved_position
         
-        await manager.send_personal(json.dumps({
+        session_frames.append({
             "type": "narrative",
             "content": f"Welcome back, {nickname}.\n\n{location_info}",
-            "timestamp": datetime.now().isoformat()
-        }), nickname)
+            "timestamp": joined_iso
+        })
+    
+    await manager.send_personal(to_json({
+        "type": "session_init",
+        "frames": session_frames,
+        "timestamp": joined_iso
+    }), nickname)
     
     try:
         while True:
             try:
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                message = orjson.loads(data)
+                # 메시지 1건당 타임스탬프 1회 계산
+                now_iso = datetime.now().isoformat()
                 
                 msg_type = message.get("type", "chat")
                 content = message.get("content", "")
@@ -2077,7 +2926,9 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 elif msg_type == "set_nickname":
                     # New user nickname setting (only allowed once)
                     new_nickname = message.get("new_nickname", "").strip()
-                    if new_nickname and is_new_user:
+                    if new_nickname and is_new_user and not validate_nickname(new_nickname):
+                        await manager.send_message(nickname, "error", NICKNAME_ERROR, now_iso)
+                    elif new_nickname and is_new_user:
                         success = False
                         user_data_for_db = None
                         
@@ -2085,11 +2936,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         async with world_data_lock:
                             # Check for duplicate nickname using global set
                             if new_nickname in all_nicknames:
-                                await manager.send_personal(json.dumps({
-                                    "type": "error",
-                                    "content": f"[ERROR] Nickname '{new_nickname}' is already taken.",
-                                    "timestamp": datetime.now().isoformat()
-                                }), nickname)
+                                await manager.send_message(nickname, "error", f"[ERROR] Nickname '{new_nickname}' is already taken.", now_iso)
                             else:
                                 # Change nickname
                                 old_nickname = nickname
@@ -2121,50 +2968,40 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                                  manager.disconnect(old_nickname)
                                  nickname = new_nickname
                                  
-                            if db_instance is None:
-                                db_instance = await get_db()
-                            await db_instance.save_user(user_id, user_data_for_db)
+                            await write_behind("users", user_id, Database.user_row(user_id, user_data_for_db))
                             
                             is_new_user = False
                             await manager.connect(websocket, nickname, accept=False)  # Reuse existing socket
                             
                             # Notify change
-                            await manager.send_personal(json.dumps({
+                            await manager.send_personal(to_json({
                                 "type": "nickname_changed",
                                 "nickname": nickname,
-                                "timestamp": datetime.now().isoformat()
+                                "timestamp": now_iso
                             }), nickname)
                             
                             # Broadcast to everyone
-                            await manager.broadcast(json.dumps({
+                            await manager.broadcast(to_json({
                                 "type": "system",
                                 "content": f"[SYSTEM] {old_nickname} is now known as '{nickname}'.",
-                                "timestamp": datetime.now().isoformat()
+                                "timestamp": now_iso
                             }))
 
                             # Account safety tip
-                            await manager.send_personal(json.dumps({
-                                "type": "system",
-                                "content": "💡 [ACCOUNT SAFETY] Save your recovery code with /export to prevent losing your character!",
-                                "timestamp": datetime.now().isoformat()
-                            }), nickname)
+                            await manager.send_message(nickname, "system", "💡 [ACCOUNT SAFETY] Save your recovery code with /export to prevent losing your character!", now_iso)
                     else:
-                        await manager.send_personal(json.dumps({
-                            "type": "error",
-                            "content": "[ERROR] You cannot change your name anymore.",
-                            "timestamp": datetime.now().isoformat()
-                        }), nickname)
+                        await manager.send_message(nickname, "error", "[ERROR] You cannot change your name anymore.", now_iso)
                 elif msg_type == "chat":
                     # General chat (with supporter status)
-                    chat_msg = json.dumps({
+                    chat_msg = to_json({
                         "type": "chat",
                         "sender": nickname,
                         "content": content,
-                        "is_supporter": is_supporter(user_id),
-                        "timestamp": datetime.now().isoformat()
+                        "is_supporter": manager.player_data.get(nickname, EMPTY_MAP).get("is_supporter", False),
+                        "timestamp": now_iso
                     })
                     await manager.broadcast(chat_msg)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 continue
             except WebSocketDisconnect:
                 raise
@@ -2175,10 +3012,10 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 
     except WebSocketDisconnect:
         manager.cleanup_client_state(nickname)
-        disconnect_msg = json.dumps({
+        disconnect_msg = to_json({
             "type": "system",
             "content": f"[SYSTEM] {nickname} has left the world.",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": frame_timestamp()
         })
         await manager.broadcast(disconnect_msg)
     except Exception as e:
@@ -2187,16 +3024,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     finally:
         manager.cleanup_client_state(nickname)
 
-async def handle_command(client_id: str, command: str, api_key: str, model: str = "gpt-4o", user_id: str = None):
-    """Command processing"""
-    global world_data, db_instance
-    
-    parts = command.strip().split(" ", 1)
-    cmd = parts[0].lower()
-    args = parts[1] if len(parts) > 1 else ""
-    
-    if cmd == "/help":
-        help_text = """[COMMANDS]
+HELP_TEXT = """[COMMANDS]
 /do <action> - Execute action (AI judgment)
 /look [-p|-o|-i] [target] - Observe surroundings, people(-p), objects(-o), or items(-i)
 /check - Check physical status (injuries, hunger, fatigue)
@@ -2230,720 +3058,125 @@ async def handle_command(client_id: str, command: str, api_key: str, model: str
 - Use /export to see your unique ID code.
 - Save this code! If you lose your account, use /import <code> to recover it.
 - Without this code, character recovery is impossible."""
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": help_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-    
-    elif cmd == "/donate":
-        # Donation link info
-        await manager.send_personal(json.dumps({
-            "type": "donate_info",
-            "uuid": user_id,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-    
-    elif cmd == "/supporters":
-        # List all supporters
-        supporters = world_data.get("supporters", {})
-        supporter_list = [
-            s.get("nickname", "?") 
-            for s in supporters.values() 
-            if isinstance(s, dict) and s.get("is_supporter")
-        ]
-        
-        if supporter_list:
-            supporter_text = f"""🌟 [SUPPORTERS - {len(supporter_list)} total]
-
-These amazing people support the server:
 
-{chr(10).join([f"  ★ {name}" for name in supporter_list])}
+# /help frame is immutable apart from its timestamp: encode the body once, splice the timestamp per request
+_HELP_FRAME_PREFIX = frame_prefix("system", HELP_TEXT)
+
+# Registry views (/materials, /blueprints, /rules) only change on discovery → rendered + encoded once per change
+_registry_frames: Dict[str, tuple] = {}
+
+def invalidate_registry_cache():
+    """Drop cached registry frames (call after a material / blueprint is registered)"""
+    _registry_frames.clear()
+
+def _registry_size(registry: dict) -> int:
+    return len(registry) - (1 if "_README" in registry else 0)
+
+def _cached_registry(name: str, key, build) -> str:
+    """Return the string cached under name for key, rebuilding when key changes"""
+    cached = _registry_frames.get(name)
+    if cached is None or cached[0] != key:
+        cached = (key, build())
+        _registry_frames[name] = cached
+    return cached[1]
+
+def _cached_registry_frame(name: str, key, render) -> str:
+    """Frame prefix (/materials, /blueprints, /rules) cached under name for key"""
+    return _cached_registry(name, key, lambda: frame_prefix("system", render()))
+
+def _render_materials_prompt() -> str:
+    """Quick Craft materials section of the /do prompt (JSON)"""
+    registry = [k for k in world_data["materials"] if k != "_README"]
+    return to_json({
+        "registered_count": len(registry),
+        "materials": registry or ["(No inventions registered yet)"],
+        "note": "Materials in this list can be Quick Crafted (instant craft if you have ingredients)"
+    })
 
-Thank you all! 💛
-Type /donate to join them!"""
-        else:
-            supporter_text = """🌟 [SUPPORTERS]
+def _render_blueprints_prompt() -> str:
+    """Quick Craft blueprints section of the /do prompt (JSON)"""
+    registry = {k: {"name": v.get("name"), "materials": v.get("base_materials", [])}
+                for k, v in world_data["object_types"].items() if k != "_README"}
+    return to_json({
+        "registered_count": len(registry),
+        "blueprints": registry or {"(No blueprints registered yet)": {}},
+        "note": "Objects in this list can be Quick Crafted (instant craft if you have materials + facility)"
+    })
 
-No supporters yet!
-Be the first to support: /donate"""
-        
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": supporter_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+def _render_materials_text() -> str:
+    materials = world_data["materials"]
+    discoveries = {k: v for k, v in materials.items() if k != "_README" and isinstance(v, dict)}
     
-    elif cmd == "/name":
-        # Nickname change command
-        new_nickname = args.strip()
-        
-        if not new_nickname:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Usage: /name <new_nickname>",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-        
-        # Already current nickname
-        if new_nickname == client_id:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] That is already your nickname.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-        
-        success = False
-        old_nickname = client_id
-        user_data_copy = None
-
-        # [LOCK] Critical Section for Uniqueness Check & Update
-        async with world_data_lock:
-            # Duplicate check O(1)
-            if new_nickname in all_nicknames:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": f"[ERROR] Nickname '{new_nickname}' is already taken.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-                # Lock will release automatically
-            else:
-                # 1. Update world_data
-                if user_id and user_id in world_data["users"]:
-                    if isinstance(world_data["users"][user_id], dict):
-                        world_data["users"][user_id]["nickname"] = new_nickname
-                    else:
-                        world_data["users"][user_id] = {"nickname": new_nickname, "name_set": True, "position": {"x": 0, "y": 0, "z": 0}, "status": "Healthy", "inventory": {}}
-                    
-                    if old_nickname in all_nicknames:
-                        all_nicknames.remove(old_nickname)
-                    all_nicknames.add(new_nickname)
-                    
-                    user_data_copy = world_data["users"][user_id].copy()
-                    success = True
-                else:
-                    # Should not happen if user_id is valid
-                    pass
-        # [LOCK END]
-
-        if success and user_data_copy:
-            # 2. Save to SQLite DB (Async)
-            if db_instance is None:
-                db_instance = await get_db()
-            await db_instance.save_user(user_id, user_data_copy)
-            
-            # 3. Update manager internal state
-            if old_nickname in manager.active_connections:
-                manager.active_connections[new_nickname] = manager.active_connections.pop(old_nickname)
-            
-            if old_nickname in manager.connection_times:
-                manager.connection_times[new_nickname] = manager.connection_times.pop(old_nickname)
-            
-            if old_nickname in manager.player_data:
-                manager.player_data[new_nickname] = manager.player_data.pop(old_nickname)
-                manager.player_data[new_nickname]["id"] = new_nickname
-            
-            if old_nickname in manager.nickname_to_uuid:
-                del manager.nickname_to_uuid[old_nickname]
-            manager.nickname_to_uuid[new_nickname] = user_id
-            
-            # 4. Notify user
-            await manager.send_personal(json.dumps({
-                "type": "nickname_changed",
-                "nickname": new_nickname,
-                "timestamp": datetime.now().isoformat()
-            }), new_nickname)
-            
-            # 5. Global broadcast
-            await manager.broadcast(json.dumps({
-                "type": "system",
-                "content": f"[SYSTEM] {old_nickname} changed their name to {new_nickname}.",
-                "timestamp": datetime.now().isoformat()
-            }))
-            
-            # 6. Backup tip
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": "💡 [TIP] To prevent losing your character, use /export and save your unique ID code somewhere safe!",
-                "timestamp": datetime.now().isoformat()
-            }), new_nickname)
-            
-            print(f"[NAME] {old_nickname} -> {new_nickname}")
-        elif not success and new_nickname not in existing_names: # Failed for other reasons
-             await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Failed to change nickname (User not found).",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-    
-    elif cmd == "/grant":
-        # ADMIN ONLY: Manually grant supporter status
-        # Usage: /grant <target_uuid>
-        # Security: Only specific admin UUIDs can use this
-        if not is_admin(user_id):
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Admin only command.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-        
-        target_uuid = args.strip()
-        if not target_uuid:
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": "[ADMIN] Usage: /grant <uuid>",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-        
-        # Check if target UUID exists
-        if target_uuid in world_data.get("users", {}):
-            if "supporters" not in world_data:
-                world_data["supporters"] = {}
-            
-            user_data = world_data["users"][target_uuid]
-            target_nickname = user_data["nickname"] if isinstance(user_data, dict) else user_data
-            
-            world_data["supporters"][target_uuid] = {
-                "nickname": target_nickname,
-                "is_supporter": True,
-                "granted_by": client_id,
-                "registered_at": datetime.now().isoformat()
-            }
-            
-            # DB에 저장
-            db = await get_db()
-            await db.save_supporter(target_uuid, world_data["supporters"][target_uuid])
-            
-            # Notify admin
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": f"[ADMIN] ✅ Granted supporter status to: {target_nickname}",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            
-            # Announce to all
-            announce_msg = json.dumps({
-                "type": "system",
-                "content": f"🌟 [SUPPORTER] Thank you {target_nickname} for supporting the server! ☕💛",
-                "timestamp": datetime.now().isoformat()
-            })
-            await manager.broadcast(announce_msg)
-        else:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": f"[ERROR] UUID not found: {target_uuid[:8]}...",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-        
-    elif cmd == "/export":
-        # Account recovery code (UUID) - with copy button
-        await manager.send_personal(json.dumps({
-            "type": "uuid_display",
-            "uuid": user_id,
-            "content": "[SECURITY] Your unique ID code. If you lose this code, you cannot recover your account.",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/import":
-        # 계정 복구: 입력한 UUID로 계정 이전
-        target_uuid = args.strip()
-        
-        if not target_uuid:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "> [ERROR] Usage: /import <unique_code>",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-            
-        # UUID가 users 목록에 존재하는지 확인
-        if target_uuid in world_data.get("users", {}):
-            # 존재하면 로그인 성공 메시지 전송
-            await manager.send_personal(json.dumps({
-                "type": "login_success",
-                "user_id": target_uuid,
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-        else:
-            # Code not found
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "> [ERROR] Invalid identification code.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-        
-    elif cmd == "/look":
-        player = manager.player_data.get(client_id, {})
-        pos = ensure_int_position(player.get("position", [0, 0, 0]))
-        inventory = player.get("inventory", {})
-        
-        # Predefined item descriptions for hardcoded or common items
-        PREDEFINED_ITEM_DATA = {
-            "architects_warm_heart": {
-                "name": "Architect's Warm Heart",
-                "description": "Living in the world is lonelier and harder than one might think. Therefore, I offer the Architect's warm heart to all of you in 'undefined'. Though it possesses no special abilities or functions... it is simply warm. In this 'undefined' space, never forget that you are not just mere data, and that someone is listening to and remembering your voice.",
-                "properties": {"Type": "Memento", "Temperature": "Warm", "Effect": "Comforting"}
-            }
-        }
-        
-        if args:
-            arg_parts = args.strip().split(" ", 1)
-            flag = None
-            target_str = args.strip()
-            
-            if arg_parts[0] in ["-p", "-o", "-i"]:
-                flag = arg_parts[0]
-                target_str = arg_parts[1] if len(arg_parts) > 1 else ""
-            
-            target = target_str.lower().replace(" ", "_")
-            found_obj = None
-            
-            # 1. Search in Predefined Data (Items) - if no flag or -i
-            if not flag or flag == "-i":
-                for key, data in PREDEFINED_ITEM_DATA.items():
-                    if target in key or key in target:
-                        found_obj = data
-                        break
-            
-            # 2. Search in Nearby Players - if no flag or -p
-            if not found_obj and (not flag or flag == "-p"):
-                for pid, pdata in manager.player_data.items():
-                    if target == pid.lower() or target == pdata.get("nickname", "").lower():
-                        ppos = ensure_int_position(pdata.get("position", [999, 999, 999]))
-                        is_nearby = (abs(ppos[0] - pos[0]) <= 3 and 
-                                     abs(ppos[1] - pos[1]) <= 3 and 
-                                     abs(ppos[2] - pos[2]) <= 3)
-                        if is_nearby:
-                            found_obj = {
-                                "name": pdata.get("nickname", pid),
-                                "description": f"A fellow survivor named {pdata.get('nickname', pid)}. They seem to be navigating this 'undefined' world just like you.",
-                                "properties": {
-                                    "Status": pdata.get("status", "Unknown"),
-                                    "Position": f"({ppos[0]}, {ppos[1]}, {ppos[2]})"
-                                }
-                            }
-                            break
-
-            # 3. Search in world_data["objects"] (Nearby or Owned) - if no flag or -o
-            if not found_obj and (not flag or flag == "-o"):
-                async with world_data_lock:
-                    all_objects = world_data.get("objects", {})
-                    for obj_id, obj in all_objects.items():
-                        obj_name = obj.get("name", "").lower()
-                        obj_name_en = obj.get("name_en", "").lower()
-                        obj_name_ko = obj.get("name_ko", "").lower()
-                        
-                        # Flexible target match
-                        clean_target = target.replace("_", " ")
-                        if not (clean_target in obj_name or clean_target in obj_name_en or clean_target in obj_name_ko or 
-                                target in obj_id.lower()):
-                            continue
-                            
-                        # Nearby check
-                        obj_pos = ensure_int_position(obj.get("position", [999, 999, 999]))
-                        is_nearby = (abs(obj_pos[0] - pos[0]) <= 3 and 
-                                     abs(obj_pos[1] - pos[1]) <= 3 and 
-                                     abs(obj_pos[2] - pos[2]) <= 3)
-                        
-                        if is_nearby:
-                            found_obj = obj
-                            break
-                            
-                        # Inventory check (Owned)
-                        is_owned = (obj.get("owner_uuid") == user_id)
-                        # Ensure both sides are lower-cased and normalized for comparison
-                        obj_name_clean = obj_name.replace(" ", "_")
-                        obj_name_en_clean = obj_name_en.replace(" ", "_")
-                        
-                        in_inventory = any(inv_item.lower().replace(" ", "_") in [obj_name_clean, obj_name_en_clean, obj_id.lower()] 
-                                          for inv_item in inventory.keys())
-                        
-                        if is_owned and in_inventory:
-                            found_obj = obj
-                            continue
-
-            # 4. Search blueprints (object_types) or generic inventory match - if no flag or -i
-            if not found_obj and (not flag or flag == "-i"):
-                # Find matching item in inventory first
-                matching_inv_item = None
-                for inv_item in inventory.keys():
-                    inv_item_clean = inv_item.lower().replace(" ", "_")
-                    if target in inv_item_clean or inv_item_clean in target:
-                        matching_inv_item = inv_item
-                        break
-                
-                if matching_inv_item:
-                    async with world_data_lock:
-                        object_types = world_data.get("object_types", {})
-                        inv_item_clean = matching_inv_item.lower().replace(" ", "_")
-                        
-                        # Match inventory item name with a registered blueprint
-                        for bp_id, bp in object_types.items():
-                            bp_name = bp.get("name", "").lower()
-                            if bp_name == matching_inv_item.lower() or bp_id.lower() == inv_item_clean:
-                                found_obj = bp.copy()
-                                found_obj["properties"] = {
-                                    **bp.get("properties", {}),
-                                    "Quantity": inventory[matching_inv_item],
-                                    "Status": "Carried in inventory"
-                                }
-                                break
-                    
-                    if not found_obj:
-                        # Default fallback if no blueprint exists
-                        found_obj = {
-                            "name": matching_inv_item,
-                            "description": f"You are carrying this item: {matching_inv_item}.",
-                            "properties": {"Quantity": inventory[matching_inv_item]}
-                        }
-            
-            if found_obj:
-                obj_name = found_obj.get("name_en", found_obj.get("name", "Something"))
-                obj_desc = found_obj.get("description", "No description available.")
-                
-                # Use a cleaner, text-based visual style instead of raw Markdown
-                description = f"─── {obj_name.upper()} ───\n\n{obj_desc}"
-                
-                props = found_obj.get("properties", {})
-                if props:
-                    description += "\n\n[PROPERTIES]"
-                    for k, v in props.items():
-                        description += f"\n  • {k}: {v}"
-            else:
-                cat_name = "target"
-                if flag == "-p": cat_name = "person"
-                elif flag == "-o": cat_name = "object"
-                elif flag == "-i": cat_name = "item"
-                description = f"> [SEARCH] You look for the {cat_name} '{target_str}' but see nothing of the sort nearby or in your pockets."
-        else:
-            # Default /look behavior (Summary)
-            description = await get_location_description_detailed(pos, client_id)
-        
-        await manager.send_personal(json.dumps({
-            "type": "narrative",
-            "content": description,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/check":
-        player = manager.player_data.get(client_id, {})
-        status = player.get("status", "Healthy")
-        pos = player.get("position", [0, 0, 0])
-        attributes = player.get("attributes", {})
-        skills = player.get("skills", {})
-        
-        # Physical status with sensory description
-        check_text = f"""[BODY CHECK]
-You slowly examine your physical condition...
-
-Location: ({pos[0]}, {pos[1]}, {pos[2] if len(pos) > 2 else 0})
-Status: {status}
-
-[ATTRIBUTES] (Potential shaped by Pathos ★)
-"""
-        if attributes:
-            for attr, val in attributes.items():
-                check_text += f"  • {attr}: {val}\n"
-        else:
-            check_text += "  (Unknown potential)\n"
-            
-        if skills:
-            check_text += "\n[SKILLS] (Earned mastery)\n"
-            for skill, level in skills.items():
-                check_text += f"  • {skill}: {level}\n"
-        
-        check_text += "\nYou flex your fingers and take a deep breath."
-        
-        # Add descriptions for status effects
-        if "부상" in status or "injured" in status.lower():
-            check_text += "\nA throbbing pain pulses from your wounds."
-        if "배고픔" in status or "hungry" in status.lower():
-            check_text += "\nYour stomach growls loudly."
-        if "피로" in status or "fatigue" in status.lower():
-            check_text += "\nYour eyelids feel heavy and your muscles ache."
-            
-        await manager.send_personal(json.dumps({
-            "type": "narrative",
-            "content": check_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/inven":
-        player = manager.player_data.get(client_id, {})
-        inventory = player.get("inventory", {})
-        
-        if not inventory:
-            inven_text = """[INVENTORY CHECK]
-You search your pockets and hands...
-Nothing. You are empty-handed."""
-        else:
-            items_desc = []
-            for item, count in inventory.items():
-                if count == 1:
-                    items_desc.append(f"  • {item}")
-                else:
-                    items_desc.append(f"  • {item} (x{count})")
-            
-            inven_text = f"""[INVENTORY CHECK]
-You search your pockets and hands...
-
-{chr(10).join(items_desc)}
-
-You are carrying {len(inventory)} type(s) of items."""
-        
-        await manager.send_personal(json.dumps({
-            "type": "narrative",
-            "content": inven_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/materials":
-        # Materials registry check
-        materials = world_data.get("materials", {})
-        discoveries = {k: v for k, v in materials.items() if k != "_README" and isinstance(v, dict)}
-        
-        if not discoveries:
-            materials_text = """[📚 MATERIALS REGISTRY]
+    if not discoveries:
+        return """[📚 MATERIALS REGISTRY]
 No new materials have been invented yet.
 
 Gather materials and try synthesizing new substances!
 Example: /do melt 90% copper and 10% tin in a crucible to create an alloy"""
-        else:
-            total = materials.get("_README", {}).get("total_discoveries", len(discoveries))
-            
-            materials_list = []
-            for mat_id, mat in discoveries.items():
-                creator = mat.get("creator", "Unknown")
-                name = mat.get("name", mat_id)
-                recipe = mat.get("recipe", "?")
-                materials_list.append(f"  🔬 [{name}] - Creator: {creator}\n     └ Recipe: {recipe}")
-            
-            materials_text = f"""[📚 MATERIALS REGISTRY] - {total} registered
+    
+    total = materials.get("_README", EMPTY_MAP).get("total_discoveries", len(discoveries))
+    
+    materials_block = "\n".join(
+        f"  🔬 [{mat.get('name', mat_id)}] - Creator: {mat.get('creator', 'Unknown')}\n     └ Recipe: {mat.get('recipe', '?')}"
+        for mat_id, mat in discoveries.items()
+    )
+    
+    return f"""[📚 MATERIALS REGISTRY] - {total} registered
 
-{chr(10).join(materials_list)}
+{materials_block}
 
 Invent new materials to leave your name in the registry!"""
-        
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": materials_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/blueprints":
-        # Blueprints registry check
-        object_types = world_data.get("object_types", {})
-        blueprints = {k: v for k, v in object_types.items() if k != "_README" and isinstance(v, dict)}
-        
-        if not blueprints:
-            blueprints_text = """[📐 BLUEPRINTS REGISTRY]
+
+_BLUEPRINT_CATEGORY_EMOJI = {
+    "tool": "🔧", "weapon": "⚔️", "armor": "🛡️",
+    "furniture": "🪑", "structure": "🏗️", "consumable": "🍖",
+    "container": "📦", "misc": "📎"
+}
+
+def _render_blueprints_text() -> str:
+    object_types = world_data["object_types"]
+    blueprints = {k: v for k, v in object_types.items() if k != "_README" and isinstance(v, dict)}
+    
+    if not blueprints:
+        return """[📐 BLUEPRINTS REGISTRY]
 No new objects have been designed yet.
 
 Use materials and tools to create new items!
 Example: /do heat an iron ingot and hammer it into a sword shape"""
-        else:
-            total = object_types.get("_README", {}).get("total_blueprints", len(blueprints))
-            
-            category_emoji = {
-                "tool": "🔧", "weapon": "⚔️", "armor": "🛡️",
-                "furniture": "🪑", "structure": "🏗️", "consumable": "🍖",
-                "container": "📦", "misc": "📎"
-            }
-            
-            blueprints_list = []
-            for bp_id, bp in blueprints.items():
-                creator = bp.get("creator", "Unknown")
-                name = bp.get("name", bp_id)
-                category = bp.get("category", "misc")
-                emoji = category_emoji.get(category, "📎")
-                materials = ", ".join(bp.get("base_materials", ["?"]))
-                blueprints_list.append(f"  {emoji} [{name}] - Designer: {creator}\n     └ Materials: {materials}")
-            
-            blueprints_text = f"""[📐 BLUEPRINTS REGISTRY] - {total} registered
+    
+    total = object_types.get("_README", EMPTY_MAP).get("total_blueprints", len(blueprints))
+    
+    blueprints_block = "\n".join(
+        f"  {_BLUEPRINT_CATEGORY_EMOJI.get(bp.get('category', 'misc'), '📎')} [{bp.get('name', bp_id)}]"
+        f" - Designer: {bp.get('creator', 'Unknown')}\n     └ Materials: {', '.join(bp.get('base_materials', ['?']))}"
+        for bp_id, bp in blueprints.items()
+    )
+    
+    return f"""[📐 BLUEPRINTS REGISTRY] - {total} registered
 
-{chr(10).join(blueprints_list)}
+{blueprints_block}
 
 Design new objects to leave your name in the registry!"""
-        
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": blueprints_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+
+# /look: predefined item descriptions for hardcoded or common items (read-only)
+PREDEFINED_ITEM_DATA = {
+    "architects_warm_heart": {
+        "name": "Architect's Warm Heart",
+        "description": "Living in the world is lonelier and harder than one might think. Therefore, I offer the Architect's warm heart to all of you in 'undefined'. Though it possesses no special abilities or functions... it is simply warm. In this 'undefined' space, never forget that you are not just mere data, and that someone is listening to and remembering your voice.",
+        "properties": {"Type": "Memento", "Temperature": "Warm", "Effect": "Comforting"}
+    }
+}
+
+def _render_rules_text(rules: dict) -> str:
+    meta = rules.get("_META", EMPTY_MAP)
+    core = rules.get("core_identity", EMPTY_MAP)
+    engines = rules.get("engines", EMPTY_MAP)
+    protocols = rules.get("protocols", EMPTY_MAP)
     
-    elif cmd == "/pin":
-        target_name = args.strip()
-        if not target_name:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Usage: /pin <object_name>",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-            
-        player = manager.player_data.get(client_id, {})
-        pinned_ids = player.get("pinned_ids", [])
-        
-        if len(pinned_ids) >= 10:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] You can only pin up to 10 objects.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-
-        # Search for object in world_data
-        found_obj = None
-        async with world_data_lock:
-            for obj_id, obj in world_data.get("objects", {}).items():
-                if obj.get("name", "").lower() == target_name.lower():
-                    found_obj = obj
-                    break
-        
-        if found_obj:
-            obj_id = found_obj["id"]
-            if obj_id not in pinned_ids:
-                pinned_ids.append(obj_id)
-                player["pinned_ids"] = pinned_ids
-                await manager.save_player_to_db(client_id)
-                await manager.send_personal(json.dumps({
-                    "type": "system",
-                    "content": f"📌 [PINNED] AI will now always remember '{found_obj['name']}'.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-            else:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": f"[ERROR] '{found_obj['name']}' is already pinned.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-        else:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": f"[ERROR] Object '{target_name}' not found. You must discover it first.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-
-    elif cmd == "/unpin":
-        target_name = args.strip()
-        if not target_name:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Usage: /unpin <object_name>",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-
-        player = manager.player_data.get(client_id, {})
-        pinned_ids = player.get("pinned_ids", [])
-        
-        removed = False
-        target_obj_name = ""
-        
-        async with world_data_lock:
-            for pid in list(pinned_ids):
-                obj = world_data.get("objects", {}).get(pid)
-                if obj and obj.get("name", "").lower() == target_name.lower():
-                    pinned_ids.remove(pid)
-                    target_obj_name = obj.get("name")
-                    removed = True
-                    break
-        
-        if removed:
-            player["pinned_ids"] = pinned_ids
-            await manager.save_player_to_db(client_id)
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": f"📍 [UNPINNED] '{target_obj_name}' removed from priority memory.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-        else:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": f"[ERROR] '{target_name}' is not in your pinned list.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-
-    elif cmd == "/pinned":
-        player = manager.player_data.get(client_id, {})
-        pinned_ids = player.get("pinned_ids", [])
-        
-        if not pinned_ids:
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": "[📌 PINNED LIST] Empty. Use /pin <name> to bookmark important things.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-            
-        pinned_names = []
-        async with world_data_lock:
-            for pid in pinned_ids:
-                obj = world_data.get("objects", {}).get(pid)
-                if obj:
-                    pos = obj.get("position", [0, 0, 0])
-                    pinned_names.append(f"• {obj['name']} ({pos[0]}, {pos[1]}, {pos[2] if len(pos) > 2 else 0})")
-        
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": f"[📌 PINNED LIST]\n{chr(10).join(pinned_names)}",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-
-    elif cmd == "/find":
-        # Search world objects
-        query = args.strip().lower()
-        results = []
-        
-        async with world_data_lock:
-            objects = world_data.get("objects", {})
-            total_count = len(objects)
-            
-            for obj in objects.values():
-                name = obj.get("name", "Unknown")
-                # If query exists, perform partial match. If empty, list all (limit 50).
-                if query:
-                    if query in name.lower():
-                        pos = obj.get("position", [0, 0, 0])
-                        results.append(f"• {name} ({pos[0]}, {pos[1]})")
-                else:
-                    pos = obj.get("position", [0, 0, 0])
-                    results.append(f"• {name} ({pos[0]}, {pos[1]})")
-                    
-                # Hard limit to prevent spamming
-                if len(results) >= 50:
-                    break
-        
-        if results:
-            title = f"[🔎 SEARCH RESULT: '{query}']" if query else f"[🔎 WORLD OBJECTS] (Showing first {len(results)}/{total_count})"
-            content = f"{title}\n{chr(10).join(results)}"
-            if len(results) >= 50:
-                content += "\n... (Too many results. Please refine your search)"
-        else:
-            content = f"[🔎 SEARCH] No objects found matching '{query}'."
-            
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+    engines_block = "\n".join(f"  • {eng.get('name', key)}" for key, eng in engines.items())
+    protocols_block = "\n".join(f"  • {proto.get('name', key)}" for key, proto in protocols.items())
     
-    elif cmd == "/rules":
-        # Current world rules (load from world_rules.json in real-time)
-        rules = load_rules()
-        meta = rules.get("_META", {})
-        core = rules.get("core_identity", {})
-        engines = rules.get("engines", {})
-        protocols = rules.get("protocols", {})
-        
-        engine_names = [eng.get("name", key) for key, eng in engines.items()]
-        protocol_names = [proto.get("name", key) for key, proto in protocols.items()]
-        
-        rules_text = f"""[📜 WORLD RULES] - Hot-Swappable Rules System
+    return f"""[📜 WORLD RULES] - Hot-Swappable Rules System
 
 Version: {meta.get('version', 'Unknown')}
 Last Modified: {meta.get('last_modified', 'Unknown')}
@@ -2952,480 +3185,916 @@ Last Modified: {meta.get('last_modified', 'Unknown')}
 {core.get('role', 'Unknown')}
 
 [7 SIMULATION ENGINES]
-{chr(10).join(f'  • {name}' for name in engine_names)}
+{engines_block}
 
 [PROTOCOLS]
-{chr(10).join(f'  • {name}' for name in protocol_names)}
+{protocols_block}
 
 [LIVE REGISTRY]
-  • Materials: {len([k for k in world_data.get('materials', {}).keys() if k != '_README'])} registered
-  • Blueprints: {len([k for k in world_data.get('object_types', {}).keys() if k != '_README'])} registered
-  • Natural Elements: {len(world_data.get('natural_elements', {}))}
+  • Materials: {_registry_size(world_data['materials'])} registered
+  • Blueprints: {_registry_size(world_data['object_types'])} registered
+  • Natural Elements: {len(world_data['natural_elements'])}
 
 💡 All rules update in real-time without server restart.
    New materials/blueprints are available to all users immediately."""
-        
-        await manager.send_personal(json.dumps({
+
+# ═══════════════════════════════════════════════════════════════════
+#                          COMMAND HANDLERS
+#   handle_command → _COMMANDS[cmd](client_id, args, api_key, model, user_id, now, now_iso)
+# ═══════════════════════════════════════════════════════════════════
+
+async def _cmd_help(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    await manager.send_personal(stamp_frame(_HELP_FRAME_PREFIX, now_iso), client_id)
+
+async def _cmd_donate(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Donation link info
+    await manager.send_personal(to_json({
+        "type": "donate_info",
+        "uuid": user_id,
+        "timestamp": now_iso
+    }), client_id)
+
+async def _cmd_supporters(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # List all supporters (rendered once per supporters change)
+    await manager.send_message(client_id, "system", get_supporters_text(), now_iso)
+
+async def _cmd_name(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Nickname change command
+    new_nickname = args.strip()
+
+    if not new_nickname:
+        await manager.send_message(client_id, "error", "[ERROR] Usage: /name <new_nickname>", now_iso)
+        return
+
+    if not validate_nickname(new_nickname):
+        await manager.send_message(client_id, "error", NICKNAME_ERROR, now_iso)
+        return
+
+    # Already current nickname
+    if new_nickname == client_id:
+        await manager.send_message(client_id, "error", "[ERROR] That is already your nickname.", now_iso)
+        return
+
+    success = False
+    old_nickname = client_id
+    user_data_copy = None
+
+    # [LOCK] Critical Section for Uniqueness Check & Update
+    async with world_data_lock:
+        # Duplicate check O(1)
+        if new_nickname in all_nicknames:
+            await manager.send_message(client_id, "error", f"[ERROR] Nickname '{new_nickname}' is already taken.", now_iso)
+            # Lock will release automatically
+        else:
+            # 1. Update world_data
+            if user_id and user_id in world_data["users"]:
+                if isinstance(world_data["users"][user_id], dict):
+                    world_data["users"][user_id]["nickname"] = new_nickname
+                else:
+                    world_data["users"][user_id] = {"nickname": new_nickname, "name_set": True, "position": {"x": 0, "y": 0, "z": 0}, "status": "Healthy", "inventory": {}}
+
+                if old_nickname in all_nicknames:
+                    all_nicknames.remove(old_nickname)
+                all_nicknames.add(new_nickname)
+
+                user_data_copy = world_data["users"][user_id].copy()
+                success = True
+            else:
+                # Should not happen if user_id is valid
+                pass
+    # [LOCK END]
+
+    if success and user_data_copy:
+        # 2. Save to SQLite DB (write-behind, ordered after any queued save of this user)
+        await write_behind("users", user_id, Database.user_row(user_id, user_data_copy))
+
+        # 3. Update manager internal state (one pass over each map)
+        manager.rename(old_nickname, new_nickname, user_id)
+
+        # 4. Announcement for everyone else; the renamed user gets it inside one batch frame
+        announce = {
             "type": "system",
-            "content": rules_text,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
-        
-    elif cmd == "/move":
-        player = manager.player_data.get(client_id, {})
-        if player.get("is_dead", False):
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[DEAD] You are dead. Type /respawn to return to life.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-            return
-        await handle_move(client_id, args)
-        
-    elif cmd == "/users":
-        active_users = list(manager.active_connections.keys())
-        msg = f"【ACTIVE SOULS】 Currently connected: {', '.join(active_users)}"
-        await manager.send_personal(json.dumps({
+            "content": f"[SYSTEM] {old_nickname} changed their name to {new_nickname}.",
+            "timestamp": now_iso
+        }
+        await manager.broadcast(to_json(announce), exclude=new_nickname)
+
+        # 5. Notify user: rename + announcement + backup tip in a single frame
+        await manager.send_personal(to_json({
+            "type": "batch",
+            "frames": [
+                {"type": "nickname_changed", "nickname": new_nickname, "timestamp": now_iso},
+                announce,
+                {"type": "system", "content": "💡 [TIP] To prevent losing your character, use /export and save your unique ID code somewhere safe!", "timestamp": now_iso}
+            ],
+            "timestamp": now_iso
+        }), new_nickname)
+
+        print(f"[NAME] {old_nickname} -> {new_nickname}")
+    elif not success and new_nickname not in all_nicknames: # Failed for other reasons
+         await manager.send_message(client_id, "error", "[ERROR] Failed to change nickname (User not found).", now_iso)
+
+async def _cmd_grant(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # ADMIN ONLY: Manually grant supporter status
+    # Usage: /grant <target_uuid>
+    # Security: Only specific admin UUIDs can use this
+    if not is_admin(user_id):
+        await manager.send_message(client_id, "error", "[ERROR] Admin only command.", now_iso)
+        return
+
+    target_uuid = args.strip()
+    if not target_uuid:
+        await manager.send_message(client_id, "system", "[ADMIN] Usage: /grant <uuid>", now_iso)
+        return
+
+    if len(target_uuid) != 36 or not UUID_PATTERN.fullmatch(target_uuid):
+        await manager.send_message(client_id, "error", "[ERROR] Invalid UUID format.", now_iso)
+        return
+
+    # Check if target UUID exists
+    if target_uuid in world_data["users"]:
+        user_data = world_data["users"][target_uuid]
+        target_nickname = user_data["nickname"] if isinstance(user_data, dict) else user_data
+
+        world_data["supporters"][target_uuid] = {
+            "nickname": target_nickname,
+            "is_supporter": True,
+            "granted_by": client_id,
+            "registered_at": now_iso
+        }
+
+        invalidate_supporters_cache()
+
+        # DB에 저장
+        db = await get_db()
+        await db.save_supporter(target_uuid, world_data["supporters"][target_uuid])
+        manager.refresh_supporter(target_uuid)
+
+        # Notify admin
+        await manager.send_message(client_id, "system", f"[ADMIN] ✅ Granted supporter status to: {target_nickname}", now_iso)
+
+        # Announce to all
+        announce_msg = to_json({
             "type": "system",
-            "content": msg,
-            "timestamp": datetime.now().isoformat()
+            "content": f"🌟 [SUPPORTER] Thank you {target_nickname} for supporting the server! ☕💛",
+            "timestamp": now_iso
+        })
+        await manager.broadcast(announce_msg)
+    else:
+        await manager.send_message(client_id, "error", f"[ERROR] UUID not found: {target_uuid[:8]}...", now_iso)
+
+async def _cmd_export(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Account recovery code (UUID) - with copy button
+    await manager.send_personal(to_json({
+        "type": "uuid_display",
+        "uuid": user_id,
+        "content": "[SECURITY] Your unique ID code. If you lose this code, you cannot recover your account.",
+        "timestamp": now_iso
+    }), client_id)
+
+async def _cmd_import(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # 계정 복구: 입력한 UUID로 계정 이전
+    target_uuid = args.strip()
+
+    if not target_uuid:
+        await manager.send_message(client_id, "error", "> [ERROR] Usage: /import <unique_code>", now_iso)
+        return
+
+    # 형식이 UUID가 아니면 users 조회 없이 바로 거절 (임의 길이 입력 방지)
+    if len(target_uuid) != 36 or not UUID_PATTERN.fullmatch(target_uuid):
+        await manager.send_message(client_id, "error", "> [ERROR] Invalid identification code.", now_iso)
+        return
+
+    # UUID가 users 목록에 존재하는지 확인
+    if target_uuid in world_data["users"]:
+        # 존재하면 로그인 성공 메시지 전송
+        await manager.send_personal(to_json({
+            "type": "login_success",
+            "user_id": target_uuid,
+            "timestamp": now_iso
         }), client_id)
-        
-    elif cmd == "/say":
-        if args:
-            parts = args.split(' ', 1)
-            if len(parts) < 2:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[USAGE] /say [nickname/all] [message]",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-                return
-            
-            target_nickname = parts[0]
-            message = parts[1]
-            
-            # ADMIN BROADCAST
-            if target_nickname.lower() == "all":
-                if is_admin(user_id):
-                    broadcast_msg = json.dumps({
-                        "type": "chat",
-                        "speaker": f"【ADMIN】 {client_id}",
-                        "original": message,
-                        "content": f'【GLOBAL FROM {client_id}】: "{message}"',
-                        "is_supporter": True,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    await manager.broadcast(broadcast_msg)
-                    return
-                else:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": "[ERROR] Only admins can use '/say all'.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
+    else:
+        # Code not found
+        await manager.send_message(client_id, "error", "> [ERROR] Invalid identification code.", now_iso)
 
-            if target_nickname not in manager.active_connections:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": f"[ERROR] User '{target_nickname}' is not online.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-                return
+async def _cmd_look(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    pos = ensure_int_position(player.get("position", [0, 0, 0]))
+    inventory = player.get("inventory", {})
 
-            # Send to target
-            await manager.send_personal(json.dumps({
-                "type": "chat",
-                "speaker": client_id,
-                "original": message,
-                "content": f'【WHISPER from {client_id}】: "{message}"',
-                "is_supporter": is_supporter(user_id) if user_id else False,
-                "timestamp": datetime.now().isoformat()
-            }), target_nickname)
-            
-            # Confirm to sender
-            await manager.send_personal(json.dumps({
-                "type": "chat",
-                "speaker": client_id,
-                "content": f'【To {target_nickname}】: "{message}"',
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-
-    elif cmd == "/give":
-        if args:
-            parts = args.split(' ')
-            if len(parts) < 3:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[USAGE] /give [nickname/all] [item_name] [quantity]",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
+    if args:
+        arg_parts = args.strip().split(" ", 1)
+        flag = None
+        target_str = args.strip()
+
+        if arg_parts[0] in ("-p", "-o", "-i"):
+            flag = arg_parts[0]
+            target_str = arg_parts[1] if len(arg_parts) > 1 else ""
+
+        target = target_str.lower().replace(" ", "_")
+        found_obj = None
+
+        # 1. Search in Predefined Data (Items) - if no flag or -i
+        if not flag or flag == "-i":
+            for key, data in PREDEFINED_ITEM_DATA.items():
+                if target in key or key in target:
+                    found_obj = data
+                    break
+
+        # 2. Search in Nearby Players - if no flag or -p
+        if not found_obj and (not flag or flag == "-p"):
+            for pid, pdata in manager.player_data.items():
+                if target == pid.lower() or target == pdata.get("nickname", "").lower():
+                    ppos = ensure_int_position(pdata.get("position", [999, 999, 999]))
+                    is_nearby = (abs(ppos[0] - pos[0]) <= 3 and 
+                                 abs(ppos[1] - pos[1]) <= 3 and 
+                                 abs(ppos[2] - pos[2]) <= 3)
+                    if is_nearby:
+                        found_obj = {
+                            "name": pdata.get("nickname", pid),
+                            "description": f"A fellow survivor named {pdata.get('nickname', pid)}. They seem to be navigating this 'undefined' world just like you.",
+                            "properties": {
+                                "Status": pdata.get("status", "Unknown"),
+                                "Position": f"({ppos[0]}, {ppos[1]}, {ppos[2]})"
+                            }
+                        }
+                        break
+
+        # 3. Search in world_data["objects"] (Nearby or Owned) - if no flag or -o
+        if not found_obj and (not flag or flag == "-o"):
+            async with world_data_lock.reader():
+                all_objects = world_data["objects"]
+                for obj_id, obj in all_objects.items():
+                    obj_name = obj.get("name", "").lower()
+                    obj_name_en = obj.get("name_en", "").lower()
+                    obj_name_ko = obj.get("name_ko", "").lower()
+
+                    # Flexible target match
+                    clean_target = target.replace("_", " ")
+                    if not (clean_target in obj_name or clean_target in obj_name_en or clean_target in obj_name_ko or 
+                            target in obj_id.lower()):
+                        continue
+
+                    # Nearby check
+                    obj_pos = ensure_int_position(obj.get("position", [999, 999, 999]))
+                    is_nearby = (abs(obj_pos[0] - pos[0]) <= 3 and 
+                                 abs(obj_pos[1] - pos[1]) <= 3 and 
+                                 abs(obj_pos[2] - pos[2]) <= 3)
+
+                    if is_nearby:
+                        found_obj = obj
+                        break
+
+                    # Inventory check (Owned)
+                    is_owned = (obj.get("owner_uuid") == user_id)
+                    # Ensure both sides are lower-cased and normalized for comparison
+                    obj_name_clean = obj_name.replace(" ", "_")
+                    obj_name_en_clean = obj_name_en.replace(" ", "_")
+
+                    in_inventory = any(inv_item.lower().replace(" ", "_") in [obj_name_clean, obj_name_en_clean, obj_id.lower()] 
+                                      for inv_item in inventory.keys())
+
+                    if is_owned and in_inventory:
+                        found_obj = obj
+                        continue
+
+        # 4. Search blueprints (object_types) or generic inventory match - if no flag or -i
+        if not found_obj and (not flag or flag == "-i"):
+            # Find matching item in inventory first
+            matching_inv_item = None
+            for inv_item in inventory.keys():
+                inv_item_clean = inv_item.lower().replace(" ", "_")
+                if target in inv_item_clean or inv_item_clean in target:
+                    matching_inv_item = inv_item
+                    break
+
+            if matching_inv_item:
+                async with world_data_lock.reader():
+                    object_types = world_data["object_types"]
+                    inv_item_clean = matching_inv_item.lower().replace(" ", "_")
+
+                    # Match inventory item name with a registered blueprint
+                    for bp_id, bp in object_types.items():
+                        bp_name = bp.get("name", "").lower()
+                        if bp_name == matching_inv_item.lower() or bp_id.lower() == inv_item_clean:
+                            found_obj = bp.copy()
+                            found_obj["properties"] = {
+                                **bp.get("properties", {}),
+                                "Quantity": inventory[matching_inv_item],
+                                "Status": "Carried in inventory"
+                            }
+                            break
+
+                if not found_obj:
+                    # Default fallback if no blueprint exists
+                    found_obj = {
+                        "name": matching_inv_item,
+                        "description": f"You are carrying this item: {matching_inv_item}.",
+                        "properties": {"Quantity": inventory[matching_inv_item]}
+                    }
+
+        if found_obj:
+            obj_name = found_obj.get("name_en", found_obj.get("name", "Something"))
+            obj_desc = found_obj.get("description", "No description available.")
+
+            # Use a cleaner, text-based visual style instead of raw Markdown
+            description = f"─── {obj_name.upper()} ───\n\n{obj_desc}"
+
+            props = found_obj.get("properties", {})
+            if props:
+                description += "\n\n[PROPERTIES]"
+                for k, v in props.items():
+                    description += f"\n  • {k}: {v}"
+        else:
+            cat_name = "target"
+            if flag == "-p": cat_name = "person"
+            elif flag == "-o": cat_name = "object"
+            elif flag == "-i": cat_name = "item"
+            description = f"> [SEARCH] You look for the {cat_name} '{target_str}' but see nothing of the sort nearby or in your pockets."
+    else:
+        # Default /look behavior (Summary)
+        description = await get_location_description_detailed(pos, client_id)
+
+    await manager.send_message(client_id, "narrative", description, now_iso)
+
+async def _cmd_check(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    status = player.get("status", "Healthy")
+    pos = player.get("position", _ORIGIN)
+    attributes = player.get("attributes", EMPTY_MAP)
+    skills = player.get("skills", EMPTY_MAP)
+
+    # Physical status with sensory description
+    check_text = f"""[BODY CHECK]
+You slowly examine your physical condition...
+
+Location: ({pos[0]}, {pos[1]}, {pos[2] if len(pos) > 2 else 0})
+Status: {status}
+
+[ATTRIBUTES] (Potential shaped by Pathos ★)
+"""
+    if attributes:
+        for attr, val in attributes.items():
+            check_text += f"  • {attr}: {val}\n"
+    else:
+        check_text += "  (Unknown potential)\n"
+
+    if skills:
+        check_text += "\n[SKILLS] (Earned mastery)\n"
+        for skill, level in skills.items():
+            check_text += f"  • {skill}: {level}\n"
+
+    check_text += "\nYou flex your fingers and take a deep breath."
+
+    # Add descriptions for status effects
+    if "부상" in status or "injured" in status.lower():
+        check_text += "\nA throbbing pain pulses from your wounds."
+    if "배고픔" in status or "hungry" in status.lower():
+        check_text += "\nYour stomach growls loudly."
+    if "피로" in status or "fatigue" in status.lower():
+        check_text += "\nYour eyelids feel heavy and your muscles ache."
+
+    await manager.send_message(client_id, "narrative", check_text, now_iso)
+
+async def _cmd_inven(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    inventory = player.get("inventory", EMPTY_MAP)
+
+    if not inventory:
+        inven_text = """[INVENTORY CHECK]
+You search your pockets and hands...
+Nothing. You are empty-handed."""
+    else:
+        items_block = "\n".join(
+            f"  • {item}" if count == 1 else f"  • {item} (x{count})"
+            for item, count in inventory.items()
+        )
+
+        inven_text = f"""[INVENTORY CHECK]
+You search your pockets and hands...
+
+{items_block}
+
+You are carrying {len(inventory)} type(s) of items."""
+
+    await manager.send_message(client_id, "narrative", inven_text, now_iso)
+
+async def _cmd_materials(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Materials registry check (rendered once per registry change)
+    prefix = _cached_registry_frame("materials", len(world_data["materials"]), _render_materials_text)
+    await manager.send_personal(stamp_frame(prefix, now_iso), client_id)
+
+async def _cmd_blueprints(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Blueprints registry check (rendered once per registry change)
+    prefix = _cached_registry_frame("blueprints", len(world_data["object_types"]), _render_blueprints_text)
+    await manager.send_personal(stamp_frame(prefix, now_iso), client_id)
+
+async def _cmd_pin(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    target_name = args.strip()
+    if not target_name:
+        await manager.send_message(client_id, "error", "[ERROR] Usage: /pin <object_name>", now_iso)
+        return
+
+    player = manager.player_data.get(client_id, {})
+    pinned_ids = player.get("pinned_ids", [])
+
+    if len(pinned_ids) >= 10:
+        await manager.send_message(client_id, "error", "[ERROR] You can only pin up to 10 objects.", now_iso)
+        return
+
+    # Search for object in world_data
+    found_obj = None
+    async with world_data_lock.reader():
+        for obj_id, obj in world_data["objects"].items():
+            if obj.get("name", "").lower() == target_name.lower():
+                found_obj = obj
+                break
+
+    if found_obj:
+        obj_id = found_obj["id"]
+        if obj_id not in pinned_ids:
+            pinned_ids.append(obj_id)
+            player["pinned_ids"] = pinned_ids
+            await manager.save_player_to_db(client_id)
+            await manager.send_message(client_id, "system", f"📌 [PINNED] AI will now always remember '{found_obj['name']}'.", now_iso)
+        else:
+            await manager.send_message(client_id, "error", f"[ERROR] '{found_obj['name']}' is already pinned.", now_iso)
+    else:
+        await manager.send_message(client_id, "error", f"[ERROR] Object '{target_name}' not found. You must discover it first.", now_iso)
+
+async def _cmd_unpin(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    target_name = args.strip()
+    if not target_name:
+        await manager.send_message(client_id, "error", "[ERROR] Usage: /unpin <object_name>", now_iso)
+        return
+
+    player = manager.player_data.get(client_id, {})
+    pinned_ids = player.get("pinned_ids", [])
+
+    removed = False
+    target_obj_name = ""
+
+    async with world_data_lock.reader():
+        for pid in list(pinned_ids):
+            obj = world_data["objects"].get(pid)
+            if obj and obj.get("name", "").lower() == target_name.lower():
+                pinned_ids.remove(pid)
+                target_obj_name = obj.get("name")
+                removed = True
+                break
+
+    if removed:
+        player["pinned_ids"] = pinned_ids
+        await manager.save_player_to_db(client_id)
+        await manager.send_message(client_id, "system", f"📍 [UNPINNED] '{target_obj_name}' removed from priority memory.", now_iso)
+    else:
+        await manager.send_message(client_id, "error", f"[ERROR] '{target_name}' is not in your pinned list.", now_iso)
+
+async def _cmd_pinned(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    pinned_ids = player.get("pinned_ids", [])
+
+    if not pinned_ids:
+        await manager.send_message(client_id, "system", "[📌 PINNED LIST] Empty. Use /pin <name> to bookmark important things.", now_iso)
+        return
+
+    pinned_names = []
+    async with world_data_lock.reader():
+        for pid in pinned_ids:
+            obj = world_data["objects"].get(pid)
+            if obj:
+                pos = obj.get("position", [0, 0, 0])
+                pinned_names.append(f"• {obj['name']} ({pos[0]}, {pos[1]}, {pos[2] if len(pos) > 2 else 0})")
+
+    await manager.send_message(client_id, "system", "[📌 PINNED LIST]\n" + "\n".join(pinned_names), now_iso)
+
+async def _cmd_find(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Search world objects
+    query = args.strip().lower()
+    results = []
+
+    async with world_data_lock.reader():
+        objects = world_data["objects"]
+        total_count = len(objects)
+
+        for obj in objects.values():
+            name = obj.get("name", "Unknown")
+            # If query exists, perform partial match. If empty, list all (limit 50).
+            if query:
+                if query in name.lower():
+                    pos = obj.get("position", [0, 0, 0])
+                    results.append(f"• {name} ({pos[0]}, {pos[1]})")
+            else:
+                pos = obj.get("position", [0, 0, 0])
+                results.append(f"• {name} ({pos[0]}, {pos[1]})")
+
+            # Hard limit to prevent spamming
+            if len(results) >= 50:
+                break
+
+    if results:
+        title = f"[🔎 SEARCH RESULT: '{query}']" if query else f"[🔎 WORLD OBJECTS] (Showing first {len(results)}/{total_count})"
+        content = title + "\n" + "\n".join(results)
+        if len(results) >= 50:
+            content += "\n... (Too many results. Please refine your search)"
+    else:
+        content = f"[🔎 SEARCH] No objects found matching '{query}'."
+
+    await manager.send_message(client_id, "system", content, now_iso)
+
+async def _cmd_rules(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Current world rules (world_rules.json is re-read only when its stamp changes)
+    rules_stamp = get_rules_stamp()
+    key = (
+        rules_stamp,
+        len(world_data["materials"]),
+        len(world_data["object_types"]),
+        len(world_data["natural_elements"]),
+    )
+    prefix = _cached_registry_frame("rules", key, lambda: _render_rules_text(load_rules(rules_stamp)))
+    await manager.send_personal(stamp_frame(prefix, now_iso), client_id)
+
+async def _cmd_move(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    if player.get("is_dead", False):
+        await manager.send_message(client_id, "error", "[DEAD] You are dead. Type /respawn to return to life.", now_iso)
+        return
+    await handle_move(client_id, args)
+
+async def _cmd_users(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    active_users = list(manager.active_connections.keys())
+    msg = f"【ACTIVE SOULS】 Currently connected: {', '.join(active_users)}"
+    await manager.send_message(client_id, "system", msg, now_iso)
+
+async def _cmd_say(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    if args:
+        parts = args.split(' ', 1)
+        if len(parts) < 2:
+            await manager.send_message(client_id, "error", "[USAGE] /say [nickname/all] [message]", now_iso)
+            return
+
+        target_nickname = parts[0]
+        message = parts[1]
+
+        # ADMIN BROADCAST
+        if target_nickname.lower() == "all":
+            if is_admin(user_id):
+                broadcast_msg = to_json({
+                    "type": "chat",
+                    "speaker": f"【ADMIN】 {client_id}",
+                    "original": message,
+                    "content": f'【GLOBAL FROM {client_id}】: "{message}"',
+                    "is_supporter": True,
+                    "timestamp": now_iso
+                })
+                await manager.broadcast(broadcast_msg)
                 return
-            
-            target_nickname = parts[0]
-            try:
-                quantity = int(parts[-1])
-                item_name = " ".join(parts[1:-1])
-            except ValueError:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[ERROR] Quantity must be a number at the end. Example: /give Nick Stone 5",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
+            else:
+                await manager.send_message(client_id, "error", "[ERROR] Only admins can use '/say all'.", now_iso)
                 return
 
-            if quantity <= 0:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[ERROR] Quantity must be positive.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
+        if target_nickname not in manager.active_connections:
+            await manager.send_message(client_id, "error", f"[ERROR] User '{target_nickname}' is not online.", now_iso)
+            return
+
+        # Send to target
+        await manager.send_personal(to_json({
+            "type": "chat",
+            "speaker": client_id,
+            "original": message,
+            "content": f'【WHISPER from {client_id}】: "{message}"',
+            "is_supporter": manager.player_data.get(client_id, EMPTY_MAP).get("is_supporter", False),
+            "timestamp": now_iso
+        }), target_nickname)
+
+        # Confirm to sender
+        await manager.send_personal(to_json({
+            "type": "chat",
+            "speaker": client_id,
+            "content": f'【To {target_nickname}】: "{message}"',
+            "timestamp": now_iso
+        }), client_id)
+
+async def _cmd_give(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    if args:
+        parts = args.split(' ')
+        if len(parts) < 3:
+            await manager.send_message(client_id, "error", "[USAGE] /give [nickname/all] [item_name] [quantity]", now_iso)
+            return
+
+        target_nickname = parts[0]
+        try:
+            quantity = int(parts[-1])
+            item_name = " ".join(parts[1:-1])
+        except ValueError:
+            await manager.send_message(client_id, "error", "[ERROR] Quantity must be a number at the end. Example: /give Nick Stone 5", now_iso)
+            return
+
+        if quantity <= 0:
+            await manager.send_message(client_id, "error", "[ERROR] Quantity must be positive.", now_iso)
+            return
+
+        # Check sender inventory (Admin skips this check for 'all' or creates items?)
+        # Usually admin 'give all' should be an 'infinite' give.
+        # But the user asked for /give to be remote transfer.
+        # Let's check if user is admin.
+        is_user_admin = is_admin(user_id)
+        if target_nickname.lower() == "all":
+            if not is_user_admin:
+                await manager.send_message(client_id, "error", "[ERROR] Only admins can use '/give all'.", now_iso)
                 return
 
-            # Check sender inventory (Admin skips this check for 'all' or creates items?)
-            # Usually admin 'give all' should be an 'infinite' give.
-            # But the user asked for /give to be remote transfer.
-            # Let's check if user is admin.
-            is_user_admin = is_admin(user_id)
-            if target_nickname.lower() == "all":
-                if not is_user_admin:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": "[ERROR] Only admins can use '/give all'.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
-                
-                # --- ADMIN GIVE ALL (Instant) ---
-                gift_item_name = item_name
-                online_count = 0
-                total_count = 0
-                
-                if "users" in world_data:
-                    db = await get_db()
-                    for u_id, u_data in list(world_data["users"].items()):
-                        if not isinstance(u_data, dict): continue
-                        inv = u_data.setdefault("inventory", {})
-                        
-                        # Special Case: WELCOME_KIT
-                        if gift_item_name.upper() == "WELCOME_KIT":
-                            for kit_item, kit_qty in WELCOME_KIT_ITEMS.items():
-                                found = None
-                                for inv_item in inv:
-                                    if inv_item.lower() == kit_item.lower():
-                                        found = inv_item
-                                        break
-                                if found: inv[found] += kit_qty * quantity
-                                else: inv[kit_item] = kit_qty * quantity
-                            msg_content = f"【GIFT】 The Omni-Engine has granted everyone {quantity}x 'Welcome Kit'!"
-                        else:
+            # --- ADMIN GIVE ALL (Instant) ---
+            gift_item_name = item_name
+            online_count = 0
+            total_count = 0
+
+            if "users" in world_data:
+                for u_id, u_data in list(world_data["users"].items()):
+                    if not isinstance(u_data, dict): continue
+                    inv = u_data.setdefault("inventory", {})
+
+                    # Special Case: WELCOME_KIT
+                    if gift_item_name.upper() == "WELCOME_KIT":
+                        for kit_item, kit_qty in WELCOME_KIT_ITEMS.items():
                             found = None
                             for inv_item in inv:
-                                if inv_item.lower() == gift_item_name.lower():
+                                if inv_item.lower() == kit_item.lower():
                                     found = inv_item
                                     break
-                            if found: inv[found] += quantity
-                            else: inv[gift_item_name] = quantity
-                            msg_content = f"【GIFT】 The Omni-Engine has granted everyone {quantity}x '{gift_item_name}'!"
-
-                        await db.save_user(u_id, u_data)
-                        total_count += 1
-                        u_nick = u_data.get("nickname")
-                        if u_nick and u_nick in manager.active_connections:
-                            manager.player_data[u_nick]["inventory"] = inv
-                            await manager.send_personal(json.dumps({
-                                "type": "system",
-                                "content": msg_content,
-                                "timestamp": datetime.now().isoformat()
-                            }), u_nick)
-                            online_count += 1
-                
-                await manager.send_personal(json.dumps({
-                    "type": "system",
-                    "content": f"【ADMIN】 Successfully granted '{gift_item_name}' to {total_count} users ({online_count} currently online).",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-                return
-            
-            elif is_user_admin:
-                # --- ADMIN GIVE TO ONE (Instant Spawn) ---
-                target_uuid = manager.get_uuid_by_nickname(target_nickname)
-                if not target_uuid:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": f"[ERROR] User '{target_nickname}' not found.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
-                
-                is_online = target_nickname in manager.active_connections
-                t_data = manager.player_data.get(target_nickname) if is_online else None
-                
-                if not t_data:
-                    # Offline check
-                    if target_uuid in world_data.get("users", {}):
-                        t_data = world_data["users"][target_uuid]
+                            if found: inv[found] += kit_qty * quantity
+                            else: inv[kit_item] = kit_qty * quantity
+                        msg_content = f"【GIFT】 The Omni-Engine has granted everyone {quantity}x 'Welcome Kit'!"
                     else:
-                        db = await get_db()
-                        t_data = await db.get_user(target_uuid)
-                
-                if not t_data:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": f"[ERROR] Could not load data for {target_nickname}.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
+                        found = None
+                        for inv_item in inv:
+                            if inv_item.lower() == gift_item_name.lower():
+                                found = inv_item
+                                break
+                        if found: inv[found] += quantity
+                        else: inv[gift_item_name] = quantity
+                        msg_content = f"【GIFT】 The Omni-Engine has granted everyone {quantity}x '{gift_item_name}'!"
+
+                    await write_behind("users", u_id, Database.user_row(u_id, u_data))
+                    total_count += 1
+                    u_nick = u_data.get("nickname")
+                    if u_nick and u_nick in manager.active_connections:
+                        manager.player_data[u_nick]["inventory"] = inv
+                        await manager.send_message(u_nick, "system", msg_content, now_iso)
+                        online_count += 1
+
+            await manager.send_message(client_id, "system", f"【ADMIN】 Successfully granted '{gift_item_name}' to {total_count} users ({online_count} currently online).", now_iso)
+            return
 
-                inv = t_data.setdefault("inventory", {})
-                found = None
-                for inv_item in inv:
-                    if inv_item.lower() == item_name.lower():
-                        found = inv_item
-                        break
-                if found: inv[found] += quantity
-                else: inv[item_name] = quantity
-                
-                if is_online:
-                    await manager.save_player_to_db(target_nickname)
-                    await manager.send_personal(json.dumps({
-                        "type": "system",
-                        "content": f"【GIFT】 Admin has granted you {quantity}x '{item_name}'!",
-                        "timestamp": datetime.now().isoformat()
-                    }), target_nickname)
+        elif is_user_admin:
+            # --- ADMIN GIVE TO ONE (Instant Spawn) ---
+            target_uuid = manager.get_uuid_by_nickname(target_nickname)
+            if not target_uuid:
+                await manager.send_message(client_id, "error", f"[ERROR] User '{target_nickname}' not found.", now_iso)
+                return
+
+            is_online = target_nickname in manager.active_connections
+            t_data = manager.player_data.get(target_nickname) if is_online else None
+
+            if not t_data:
+                # Offline check
+                if target_uuid in world_data["users"]:
+                    t_data = world_data["users"][target_uuid]
                 else:
-                    world_data.setdefault("users", {})[target_uuid] = t_data
                     db = await get_db()
-                    await db.save_user(target_uuid, t_data)
-                
-                await manager.send_personal(json.dumps({
-                    "type": "system",
-                    "content": f"【ADMIN】 Successfully granted {quantity}x '{item_name}' to {target_nickname}.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
+                    t_data = await db.get_user(target_uuid)
+
+            if not t_data:
+                await manager.send_message(client_id, "error", f"[ERROR] Could not load data for {target_nickname}.", now_iso)
                 return
-            
+
+            inv = t_data.setdefault("inventory", {})
+            found = None
+            for inv_item in inv:
+                if inv_item.lower() == item_name.lower():
+                    found = inv_item
+                    break
+            if found: inv[found] += quantity
+            else: inv[item_name] = quantity
+
+            if is_online:
+                await manager.save_player_to_db(target_nickname)
+                await manager.send_message(target_nickname, "system", f"【GIFT】 Admin has granted you {quantity}x '{item_name}'!", now_iso)
             else:
-                # --- REGULAR PLAYER GIVE (Transfer with Delay) ---
-                sender_data = manager.player_data.get(client_id, {})
-                sender_inv = sender_data.get("inventory", {})
-                
-                found_item = None
-                # Regular give: check inventory
-                for inv_item in sender_inv:
-                    if inv_item.lower() == item_name.lower():
-                        found_item = inv_item
-                        break
-                
-                if not found_item or sender_inv[found_item] < quantity:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": f"[ERROR] You don't have enough '{item_name}'.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
+                world_data["users"][target_uuid] = t_data
+                await write_behind("users", target_uuid, Database.user_row(target_uuid, t_data))
 
-                if target_nickname not in manager.active_connections:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": f"[ERROR] User '{target_nickname}' is not online.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
-                    return
-                
-                # --- DELIVERY DELAY LOGIC ---
-                # Calculate Manhattan distance
-                sender_pos = sender_data.get("position", [0, 0, 0])
-                target_data = manager.player_data.get(target_nickname, {})
-                target_pos = target_data.get("position", [0, 0, 0])
-                
-                # Capture UUID and check target exists BEFORE sleep
-                target_uuid = manager.get_uuid_by_nickname(target_nickname)
-                if not target_uuid:
-                    await manager.send_personal(json.dumps({
-                        "type": "error",
-                        "content": f"[ERROR] Could not resolve identity for {target_nickname}.",
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
+            await manager.send_message(client_id, "system", f"【ADMIN】 Successfully granted {quantity}x '{item_name}' to {target_nickname}.", now_iso)
+            return
+
+        else:
+            # --- REGULAR PLAYER GIVE (Transfer with Delay) ---
+            sender_data = manager.player_data.get(client_id, {})
+            sender_inv = sender_data.get("inventory", {})
+
+            found_item = None
+            # Regular give: check inventory
+            for inv_item in sender_inv:
+                if inv_item.lower() == item_name.lower():
+                    found_item = inv_item
+                    break
+
+            if not found_item or sender_inv[found_item] < quantity:
+                await manager.send_message(client_id, "error", f"[ERROR] You don't have enough '{item_name}'.", now_iso)
+                return
+
+            if target_nickname not in manager.active_connections:
+                await manager.send_message(client_id, "error", f"[ERROR] User '{target_nickname}' is not online.", now_iso)
+                return
+
+            # --- DELIVERY DELAY LOGIC ---
+            # Calculate Manhattan distance
+            sender_pos = sender_data.get("position", [0, 0, 0])
+            target_data = manager.player_data.get(target_nickname, {})
+            target_pos = target_data.get("position", [0, 0, 0])
+
+            # Capture UUID and check target exists BEFORE sleep
+            target_uuid = manager.get_uuid_by_nickname(target_nickname)
+            if not target_uuid:
+                await manager.send_message(client_id, "error", f"[ERROR] Could not resolve identity for {target_nickname}.", now_iso)
+                return
+
+            dist = abs(sender_pos[0] - target_pos[0]) + abs(sender_pos[1] - target_pos[1])
+            delay = min(max(dist // 5, 1), 30)
+
+            # Deduct from sender immediately
+            sender_inv[found_item] -= quantity
+            if sender_inv[found_item] <= 0:
+                del sender_inv[found_item]
+
+            await manager.save_player_to_db(client_id)
+
+            # Notify sender
+            await manager.send_message(client_id, "system", f"【SHIPPING】 You sent {quantity}x '{found_item}' to {target_nickname}. Due to distance ({dist} units), it will arrive in {delay} real-world seconds.", now_iso)
+
+            # Background delivery task
+            async def deliver(t_uuid, t_nick, item, qty):
+                await asyncio.sleep(delay)
+
+                is_online = t_nick in manager.active_connections
+                r_data = None
+
+                if is_online:
+                    r_data = manager.player_data.get(t_nick)
+
+                # If not online or somehow missing from player_data, load from world_data/DB
+                if not r_data:
+                    is_online = False
+                    if t_uuid in world_data["users"]:
+                        r_data = world_data["users"][t_uuid]
+                    else:
+                        # Last resort: Load from DB
+                        db = await get_db()
+                        all_users = await db.get_all_users()
+                        r_data = all_users.get(t_uuid)
+
+                if not r_data:
+                    print(f"[ERROR] Delivery failed: target {t_uuid} not found after delay.")
                     return
 
-                dist = abs(sender_pos[0] - target_pos[0]) + abs(sender_pos[1] - target_pos[1])
-                delay = min(max(dist // 5, 1), 30)
-                
-                # Deduct from sender immediately
-                sender_inv[found_item] -= quantity
-                if sender_inv[found_item] <= 0:
-                    del sender_inv[found_item]
-                
-                await manager.save_player_to_db(client_id)
-                
-                # Notify sender
-                await manager.send_personal(json.dumps({
-                    "type": "system",
-                    "content": f"【SHIPPING】 You sent {quantity}x '{found_item}' to {target_nickname}. Due to distance ({dist} units), it will arrive in {delay} real-world seconds.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
+                r_inv = r_data.setdefault("inventory", {})
+
+                target_found_item = None
+                for inv_item in r_inv:
+                    if inv_item.lower() == item.lower():
+                        target_found_item = inv_item
+                        break
+
+                if target_found_item:
+                    r_inv[target_found_item] += qty
+                else:
+                    r_inv[item] = qty
+
+                # Save result
+                if is_online:
+                    await manager.save_player_to_db(t_nick)
+                else:
+                    # Offline Force Save
+                    world_data["users"][t_uuid] = r_data
+                    await write_behind("users", t_uuid, Database.user_row(t_uuid, r_data))
+
+                # Notify receiver if online
+                if t_nick in manager.active_connections:
+                    await manager.send_message(t_nick, "system", f"【ARRIVED】 {client_id}'s gift ({qty}x '{item}') has arrived!")
 
-                # Background delivery task
-                async def deliver(t_uuid, t_nick, item, qty):
-                    await asyncio.sleep(delay)
-                    
-                    is_online = t_nick in manager.active_connections
-                    r_data = None
-                    
-                    if is_online:
-                        r_data = manager.player_data.get(t_nick)
-                    
-                    # If not online or somehow missing from player_data, load from world_data/DB
-                    if not r_data:
-                        is_online = False
-                        if t_uuid in world_data.get("users", {}):
-                            r_data = world_data["users"][t_uuid]
-                        else:
-                            # Last resort: Load from DB
-                            db = await get_db()
-                            all_users = await db.get_all_users()
-                            r_data = all_users.get(t_uuid)
-                    
-                    if not r_data:
-                        print(f"[ERROR] Delivery failed: target {t_uuid} not found after delay.")
-                        return
-                    
-                    r_inv = r_data.setdefault("inventory", {})
-                    
-                    target_found_item = None
-                    for inv_item in r_inv:
-                        if inv_item.lower() == item.lower():
-                            target_found_item = inv_item
-                            break
-                    
-                    if target_found_item:
-                        r_inv[target_found_item] += qty
-                    else:
-                        r_inv[item] = qty
+                # Notify sender of completion
+                if client_id in manager.active_connections:
+                    await manager.send_message(client_id, "system", f"【DELIVERED】 Your gift to {t_nick} has been successfully delivered.")
 
-                    # Save result
-                    if is_online:
-                        await manager.save_player_to_db(t_nick)
-                    else:
-                        # Offline Force Save
-                        world_data.setdefault("users", {})[t_uuid] = r_data
-                        db = await get_db()
-                        await db.save_user(t_uuid, r_data)
-                    
-                    # Notify receiver if online
-                    if t_nick in manager.active_connections:
-                        await manager.send_personal(json.dumps({
-                            "type": "system",
-                            "content": f"【ARRIVED】 {client_id}'s gift ({qty}x '{item}') has arrived!",
-                            "timestamp": datetime.now().isoformat()
-                        }), t_nick)
-                    
-                    # Notify sender of completion
-                    if client_id in manager.active_connections:
-                        await manager.send_personal(json.dumps({
-                            "type": "system",
-                            "content": f"【DELIVERED】 Your gift to {t_nick} has been successfully delivered.",
-                            "timestamp": datetime.now().isoformat()
-                        }), client_id)
-
-                # Run delivery in background with captured data
-                asyncio.create_task(deliver(target_uuid, target_nickname, found_item, quantity))
-                return
-            
-    elif cmd == "/do":
-        # Rate Limiting (2.0s cooldown)
-        last_time = manager.last_action_time.get(client_id)
-        if last_time and (datetime.now() - last_time).total_seconds() < 2.0:
-             await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[SLOW DOWN] Please wait a moment before acting again.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
-             return
-        
-        manager.last_action_time[client_id] = datetime.now()
-
-        # 죽음 상태 체크
-        player = manager.player_data.get(client_id, {})
-        if player.get("is_dead", False):
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[DEAD] You are dead. Type /respawn to return to life.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            # Run delivery in background with captured data
+            asyncio.create_task(deliver(target_uuid, target_nickname, found_item, quantity))
             return
-        
-        if not args:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Please enter an action. Example: /do pick up a stone",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+
+async def _cmd_do(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    # Rate Limiting (2.0s cooldown)
+    last_time = manager.last_action_time.get(client_id)
+    if last_time and (now - last_time).total_seconds() < 2.0:
+         await manager.send_message(client_id, "error", "[SLOW DOWN] Please wait a moment before acting again.", now_iso)
+         return
+
+    manager.last_action_time[client_id] = now
+
+    # 죽음 상태 체크
+    player = manager.player_data.get(client_id, EMPTY_MAP)
+    if player.get("is_dead", False):
+        await manager.send_message(client_id, "error", "[DEAD] You are dead. Type /respawn to return to life.", now_iso)
+        return
+
+    if not args:
+        await manager.send_message(client_id, "error", "[ERROR] Please enter an action. Example: /do pick up a stone", now_iso)
+        return
+
+    # Free Tier: API Key가 없으면 서버 키 사용
+    is_guest = False
+    use_api_key = api_key
+    use_model = model
+
+    if not api_key:
+        if SERVER_API_KEY:
+            use_api_key = SERVER_API_KEY
+            use_model = SERVER_DEFAULT_MODEL  # 서버 기본 모델 사용
+            is_guest = True
+            logger.info("[Guest] %s using server API key with model %s", client_id, use_model)
+        else:
+            await manager.send_message(client_id, "error", "[ERROR] No API Key. Server free tier is not available.", now_iso)
             return
-        
-        # Free Tier: API Key가 없으면 서버 키 사용
-        is_guest = False
-        use_api_key = api_key
-        use_model = model
-        
-        if not api_key:
-            if SERVER_API_KEY:
-                use_api_key = SERVER_API_KEY
-                use_model = SERVER_DEFAULT_MODEL  # 서버 기본 모델 사용
-                is_guest = True
-                print(f"[Guest] {client_id} using server API key with model {use_model}")
-            else:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[ERROR] No API Key. Server free tier is not available.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-                return
-            
-        # Concurrency limiter: /do is the heaviest path (AI + DB writes)
-        if DO_SEMAPHORE.locked():
-            await manager.send_personal(json.dumps({
-                "type": "system",
-                "content": DO_QUEUE_WAITING_MESSAGE,
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
 
+    # Concurrency limiter: /do is the heaviest path (AI + DB writes)
+    if DO_SEMAPHORE.locked():
+        await manager.send_personal(stamp_frame(_DO_WAITING_FRAME_PREFIX, now_iso), client_id)
+
+    try:
+        async with DO_SEMAPHORE:
+            await process_action(client_id, args, use_api_key, use_model, is_guest)
+    except Exception as e:
+        # Prevent semaphore leakage or unhandled exceptions from crashing the loop
+        print(f"[DO ERROR] Unhandled exception in semaphore block: {e}")
         try:
-            async with DO_SEMAPHORE:
-                await process_action(client_id, args, use_api_key, use_model, is_guest)
-        except Exception as e:
-            # Prevent semaphore leakage or unhandled exceptions from crashing the loop
-            print(f"[DO ERROR] Unhandled exception in semaphore block: {e}")
-            try:
-                await manager.send_personal(json.dumps({
-                    "type": "error",
-                    "content": "[SYSTEM ERROR] An unexpected error occurred while processing your action.",
-                    "timestamp": datetime.now().isoformat()
-                }), client_id)
-            except:
-                pass
+            await manager.send_message(client_id, "error", "[SYSTEM ERROR] An unexpected error occurred while processing your action.")
+        except:
+            pass
+
+async def _cmd_respawn(client_id: str, args: str, api_key: str, model: str, user_id: str, now: datetime, now_iso: str):
+    await handle_respawn(client_id)
+
+# Command dispatch table: one dict lookup instead of walking an if/elif chain
+_COMMANDS = {
+    "/help": _cmd_help,
+    "/donate": _cmd_donate,
+    "/supporters": _cmd_supporters,
+    "/name": _cmd_name,
+    "/grant": _cmd_grant,
+    "/export": _cmd_export,
+    "/import": _cmd_import,
+    "/look": _cmd_look,
+    "/check": _cmd_check,
+    "/inven": _cmd_inven,
+    "/materials": _cmd_materials,
+    "/blueprints": _cmd_blueprints,
+    "/pin": _cmd_pin,
+    "/unpin": _cmd_unpin,
+    "/pinned": _cmd_pinned,
+    "/find": _cmd_find,
+    "/rules": _cmd_rules,
+    "/move": _cmd_move,
+    "/users": _cmd_users,
+    "/say": _cmd_say,
+    "/give": _cmd_give,
+    "/do": _cmd_do,
+    "/respawn": _cmd_respawn,
+}
+
+async def handle_command(client_id: str, command: str, api_key: str, model: str = "gpt-4o", user_id: str = None):
+    """Command processing (dispatches to the _cmd_* handlers via _COMMANDS)"""
+    parts = command.strip().split(" ", 1)
+    cmd = parts[0].lower()
+    args = parts[1] if len(parts) > 1 else ""
     
-    elif cmd == "/respawn":
-        await handle_respawn(client_id)
-        
-    else:
-        await manager.send_personal(json.dumps({
-            "type": "error",
-            "content": f"[ERROR] Unknown command: {cmd}. Type /help for available commands.",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+    # One clock read per command: every reply of this invocation shares the timestamp
+    # (delayed /give deliveries and post-/do error replies still read the clock themselves)
+    now = datetime.now()
+    now_iso = now.isoformat()
+    
+    handler = _COMMANDS.get(cmd)
+    if handler is None:
+        await manager.send_message(client_id, "error", f"[ERROR] Unknown command: {cmd}. Type /help for available commands.", now_iso)
+        return
+    await handler(client_id, args, api_key, model, user_id, now, now_iso)
 
 async def handle_new_discovery(discovery: dict, creator_nickname: str):
     """Handle new material discovery - DB registration and global broadcast"""
-    global world_data, db_instance
+    global world_data
     
     material_id = discovery.get("id", "").lower().replace(" ", "_")
     material_name = discovery.get("name", "Unknown Material")
     
     # Check if already exists
-    if material_id in world_data.get("materials", {}):
+    if material_id in world_data["materials"]:
         print(f"[DISCOVERY] Material '{material_id}' already exists. Skipping.")
         return
     
@@ -3448,33 +4117,32 @@ async def handle_new_discovery(discovery: dict, creator_nickname: str):
     
     # Save to cache
     world_data["materials"][material_id] = new_material
+    invalidate_registry_cache()
     
     # Increment discovery count
     if "_README" in world_data["materials"]:
         world_data["materials"]["_README"]["total_discoveries"] = \
             world_data["materials"]["_README"].get("total_discoveries", 0) + 1
     
-    # Save to SQLite DB
-    if db_instance is None:
-        db_instance = await get_db()
-    await db_instance.save_material(material_id, new_material)
+    # Save to SQLite DB (write-behind)
+    await write_behind("materials", material_id, Database.material_row(material_id, new_material))
     
     print(f"[DISCOVERY] New material registered: {material_name} by {creator_nickname}")
     
     # Global broadcast - notify all users
-    discovery_msg = json.dumps({
+    discovery_msg = to_json({
         "type": "discovery",
         "content": f"📢 [BREAKING] {creator_nickname} has invented a new material [{material_name}] for the first time!",
         "material_id": material_id,
         "material_name": material_name,
         "creator": creator_nickname,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     })
     await manager.broadcast(discovery_msg)
 
 async def handle_new_object_type(object_type: dict, creator_nickname: str):
     """Handle new object type registration - DB registration and global broadcast"""
-    global world_data, db_instance
+    global world_data
     
     type_id = object_type.get("id", "").lower().replace(" ", "_")
     type_name = object_type.get("name", "Unknown Object")
@@ -3508,38 +4176,41 @@ async def handle_new_object_type(object_type: dict, creator_nickname: str):
     
     # Save to cache
     world_data["object_types"][type_id] = new_type
+    invalidate_registry_cache()
     
     # Increment blueprint count
     world_data["object_types"]["_README"]["total_blueprints"] = \
         world_data["object_types"]["_README"].get("total_blueprints", 0) + 1
     
-    # Save to SQLite DB
-    if db_instance is None:
-        db_instance = await get_db()
-    await db_instance.save_object_type(type_id, new_type)
+    # Save to SQLite DB (write-behind)
+    await write_behind("object_types", type_id, Database.object_type_row(type_id, new_type))
     
     print(f"[BLUEPRINT] New object type registered: {type_name} by {creator_nickname}")
     
     # Global broadcast - notify all users
     category_name = object_type.get("category", "misc")
     
-    blueprint_msg = json.dumps({
+    blueprint_msg = to_json({
         "type": "blueprint",
         "content": f"📐 [NEW BLUEPRINT] {creator_nickname} has established a crafting method for [{type_name}] ({category_name})!",
         "object_type_id": type_id,
         "object_type_name": type_name,
         "category": category_name,
         "creator": creator_nickname,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     })
     await manager.broadcast(blueprint_msg)
 
 async def handle_death(client_id: str):
     """Death handling - Coma system"""
-    global world_data, db_instance
+    global world_data
     
     player = ensure_player_data(client_id)
     pos = player.get("position", [0, 0])
+    # The player keeps moving its own position list in place, so the corpse needs one snapshot;
+    # death_position shares it (marker only, never mutated)
+    death_pos = pos.copy() if isinstance(pos, list) else [0, 0]
+    # Inventory is moved, not copied: the player gets a fresh {} below and the corpse owns the old dict
     inventory = player.get("inventory", {})
     
     # 1. Create corpse object (with inventory - lootable)
@@ -3548,46 +4219,45 @@ async def handle_death(client_id: str):
         "id": corpse_id,
         "name": f"Body of {client_id}",
         "name_en": f"Body of {client_id}",
-        "position": pos.copy() if isinstance(pos, list) else [0, 0],
+        "position": death_pos,
         "description": f"The limp body of {client_id} lies on the ground. It still retains some warmth.",
         "description_en": f"The limp body of {client_id} lies on the ground. Still warm.",
         "indestructible": False,
         "properties": {
             "type": "corpse",
             "owner": client_id,
-            "inventory": inventory.copy(),  # 인벤토리 이전 (약탈 가능)
+            "inventory": inventory,  # 인벤토리 이전 (약탈 가능) — ownership moves to the corpse
             "death_time": datetime.now().isoformat(),
             "lootable": True
         }
     }
     world_data["objects"][corpse_id] = corpse
+    object_index.index(corpse_id, corpse)
     
-    # DB에 시체 오브젝트 저장
-    if db_instance is None:
-        db_instance = await get_db()
-    await db_instance.save_object(corpse_id, corpse)
+    # DB에 시체 오브젝트 저장 (write-behind)
+    await write_behind("objects", corpse_id, Database.object_row(corpse_id, corpse))
     
     # 2. Update user status - COMA
     player["is_dead"] = True
     player["status"] = "COMA"
-    player["inventory"] = {}  # Clear inventory (transferred to corpse)
-    player["death_position"] = pos.copy() if isinstance(pos, list) else [0, 0]
+    player["inventory"] = {}  # Clear inventory (transferred to corpse, no longer aliased)
+    player["death_position"] = death_pos
     
     # Save to DB
     await manager.save_player_to_db(client_id)
     
     # 3. Death broadcast (to all players)
-    death_msg = json.dumps({
+    death_msg = to_json({
         "type": "death",
         "content": f"[BREAKING] {client_id} has fallen at ({pos[0]}, {pos[1]}). A body has been found.",
         "victim": client_id,
         "position": pos,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     })
     await manager.broadcast(death_msg)
     
     # 4. Personal message - COMA notification
-    await manager.send_personal(json.dumps({
+    await manager.send_personal(to_json({
         "type": "you_died",
         "content": """
 ▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓
@@ -3604,7 +4274,7 @@ async def handle_death(client_id: str):
         
 ▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓▓
 """,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     }), client_id)
 
 async def handle_respawn(client_id: str):
@@ -3612,11 +4282,7 @@ async def handle_respawn(client_id: str):
     player = ensure_player_data(client_id)
     
     if not player.get("is_dead", False):
-        await manager.send_personal(json.dumps({
-            "type": "error",
-            "content": "[ERROR] You are not in a coma.",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+        await manager.send_message(client_id, "error", "[ERROR] You are not in a coma.")
         return
     
     # Random location (near the landfill)
@@ -3626,13 +4292,14 @@ async def handle_respawn(client_id: str):
     player["is_dead"] = False
     player["status"] = "Weak - Just awakened"
     player["position"] = new_pos
+    manager.reindex_player(player)
     player["inventory"] = {}
     if "death_position" in player:
         del player["death_position"]
     
     # Respawn message
     biome = get_biome(new_pos[0], new_pos[1])
-    await manager.send_personal(json.dumps({
+    await manager.send_personal(to_json({
         "type": "respawn",
         "content": f"""
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -3651,30 +4318,45 @@ Your belongings remain with your corpse somewhere...
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """,
         "position": new_pos,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     }), client_id)
     
     # Save to DB
     await manager.save_player_to_db(client_id)
     
     # Global broadcast
-    respawn_msg = json.dumps({
+    respawn_msg = to_json({
         "type": "system",
         "content": f"[NOTICE] {client_id} has regained consciousness somewhere.",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     })
     await manager.broadcast(respawn_msg)
 
+@functools.lru_cache(maxsize=4096)
+def _int_position_coords(x, y, z) -> tuple:
+    """Convert raw (possibly float/str/None) coords to ints — cached, grid positions repeat heavily"""
+    return (
+        int(x) if x is not None else 0,
+        int(y) if y is not None else 0,
+        int(z) if z is not None else 0,
+    )
+
+def is_int_position(pos) -> bool:
+    """True if pos is already canonical [int, int, int]"""
+    return type(pos) is list and len(pos) == 3 and type(pos[0]) is int and type(pos[1]) is int and type(pos[2]) is int
+
 def ensure_int_position(pos) -> list:
-    """Ensure position is a list of 3 integers [x, y, z]"""
-    if not isinstance(pos, list):
-        return [0, 0, 0]
-    if len(pos) < 2:
+    """
+    Ensure position is a list of 3 integers [x, y, z]
+    - Canonical input is returned as-is (no allocation); callers only read it or store it back in place
+    - Anything else gets a fresh normalized list
+    """
+    if is_int_position(pos):
+        return pos
+    if not isinstance(pos, list) or len(pos) < 2:
         return [0, 0, 0]
-    x = int(pos[0]) if pos[0] is not None else 0
-    y = int(pos[1]) if pos[1] is not None else 0
-    z = int(pos[2]) if len(pos) > 2 and pos[2] is not None else 0
-    return [x, y, z]
+    z = pos[2] if len(pos) > 2 else 0
+    return list(_int_position_coords(pos[0], pos[1], z))
 
 # ═══════════════════════════════════════════════════════════════════
 #                          WELCOME KIT SYSTEM
@@ -3761,9 +4443,6 @@ WELCOME_KIT_ITEMS = {
 
 async def register_welcome_kit_to_db():
     """Register all welcome kit items as object types in the database"""
-    global db_instance
-    if db_instance is None:
-        db_instance = await get_db()
     
     print("[SYSTEM] Registering Welcome Kit items to DB...")
     for item_def in WELCOME_KIT_DEFINITION:
@@ -3846,9 +4525,7 @@ OMNI_LAB_OBJECTS = [
 
 async def register_omni_laboratory_to_db():
     """Register the Omni-Laboratory and its components to the world database and sync memory cache"""
-    global db_instance, world_data
-    if db_instance is None:
-        db_instance = await get_db()
+    global world_data
     
     print("[SYSTEM] Initializing Automated Omni-Laboratory near spawn...")
     for obj_data in OMNI_LAB_OBJECTS:
@@ -3865,10 +4542,109 @@ async def register_omni_laboratory_to_db():
 
 # ═══════════════════════════════════════════════════════════════════
 
+DEFAULT_ATTRIBUTES = {"Strength": 5, "Agility": 5, "Endurance": 5, "Intelligence": 5, "Willpower": 5}
+# Attribute decay per 24h of personal time without exercise (Law of Entropy); unlisted → 0.002
+ATTRIBUTE_DECAY_RATES = {"Endurance": 0.01, "Strength": 0.005, "Intelligence": 0.002, "Agility": 0.002, "Willpower": 0.002}
+# Attributes keep 3 decimal places (fine-grained growth); minimum 1.0 for biological viability
+ATTR_MIN = 1.0
+
+def clamp_attribute(value: float) -> float:
+    """Floor at ATTR_MIN and round to 3 decimals (inf / huge AI values pass through unchanged)"""
+    return round(max(ATTR_MIN, value), 3)
+
+_USER_UPDATE_CHANGE_KEYS = ("inventory_change", "attribute_change", "skill_change")
+
+def normalize_user_update(raw) -> dict:
+    """
+    Validate the AI's user_update once, before any handler runs (AI defensive check)
+    - *_change: dict only, non-numeric values dropped
+    - position_delta: [dx, dy, dz] ints (None → 0, missing z → 0); malformed → dropped
+    - protection_active: dict only
+    Handlers then iterate the sections without per-element isinstance checks.
+    """
+    if not isinstance(raw, dict) or not raw:
+        return {}
+    update = dict(raw)
+    for key in _USER_UPDATE_CHANGE_KEYS:
+        changes = update.pop(key, None)
+        if isinstance(changes, dict):
+            update[key] = {name: change for name, change in changes.items() if isinstance(change, (int, float))}
+    
+    delta = update.pop("position_delta", None)
+    if isinstance(delta, list) and len(delta) >= 2:
+        try:
+            update["position_delta"] = [
+                int(delta[0]) if delta[0] is not None else 0,
+                int(delta[1]) if delta[1] is not None else 0,
+                int(delta[2]) if len(delta) > 2 and delta[2] is not None else 0,
+            ]
+        except (TypeError, ValueError):
+            pass
+    
+    protection = update.get("protection_active")
+    if protection is not None and not isinstance(protection, dict):
+        del update["protection_active"]
+    return update
+
+# --- user_update section handlers (sync, in-memory only; run via USER_UPDATE_HANDLERS) ---
+def _apply_status(player: dict, status_desc):
+    player["status"] = status_desc
+
+def _apply_inventory(player: dict, inventory_change: dict):
+    inv = player.setdefault("inventory", {})
+    for item, change in inventory_change.items():
+        # One lookup per item: _MISSING marks "not held" (a held count may legitimately be 0)
+        count = inv.get(item, _MISSING)
+        if count is _MISSING:
+            if change > 0:
+                inv[item] = change
+            continue
+        count += change
+        if count <= 0:
+            del inv[item]
+        else:
+            inv[item] = count
+
+def _apply_attributes(player: dict, attribute_change: dict):
+    """Attribute Change Handler (Evolution System conceptualized by the User)"""
+    attrs = player.setdefault("attributes", {})
+    last_exercise = player.setdefault("last_exercise", {})
+    exercised_at = player.get("time_offset", 0)
+    
+    for attr, change in attribute_change.items():
+        attr_name = attr.capitalize()
+        
+        # Precise growth with floating point safety (missing attribute starts at 5.0)
+        new_val = float(attrs.get(attr_name, 5.0)) + float(change)
+        
+        # No absolute maximum cap. Growth is limited only by logic and tech requirements.
+        # Minimum stays at 1.0 for biological viability; 3 decimal places (Diminishing Returns)
+        attrs[attr_name] = clamp_attribute(new_val)
+        
+        # Update last exercise timestamp for this attribute
+        last_exercise[attr_name] = exercised_at
+
+def _apply_skills(player: dict, skill_change: dict):
+    """Skill Change Handler (Evolution System conceptualized by the User)"""
+    skills = player.setdefault("skills", {})
+    for skill, change in skill_change.items():
+        # Skill names are usually title-cased
+        skill_name = skill.title()
+        # Prevent negative skill levels
+        level = skills.get(skill_name, 0) + change
+        skills[skill_name] = level if level >= 0 else 0
+
+# Sections touch disjoint player fields, so order only matters for readability.
+# position_delta / is_dead stay inline in process_action (they await sends / death handling).
+USER_UPDATE_HANDLERS = (
+    ("status_desc", _apply_status),
+    ("inventory_change", _apply_inventory),
+    ("attribute_change", _apply_attributes),
+    ("skill_change", _apply_skills),
+)
+
 def ensure_player_data(client_id: str):
     """Initialize player_data if not exists (with z-axis and evolution fields)"""
-    DEFAULT_ATTRIBUTES = {"Strength": 5, "Agility": 5, "Endurance": 5, "Intelligence": 5, "Willpower": 5}
-    
     if client_id not in manager.player_data:
         manager.player_data[client_id] = {
             "id": client_id,
@@ -3877,13 +4653,17 @@ def ensure_player_data(client_id: str):
             "inventory": {},
             "attributes": DEFAULT_ATTRIBUTES.copy(),
             "skills": {},
+            "is_supporter": is_supporter(manager.get_uuid_by_nickname(client_id)),
             "joined_at": datetime.now().isoformat()
         }
+        manager.reindex_player(manager.player_data[client_id])
     else:
         player = manager.player_data[client_id]
-        # Ensure position is valid [x, y, z] integers
-        pos = player.get("position", [0, 0, 0])
-        player["position"] = ensure_int_position(pos)
+        # Ensure position is valid [x, y, z] integers (already canonical on the hot path → no write)
+        pos = player.get("position")
+        if not is_int_position(pos):
+            player["position"] = ensure_int_position(pos if pos is not None else [0, 0, 0])
+            manager.reindex_player(player)
         
         # Defensive check: Ensure attributes and skills exist for connected clients
         if "attributes" not in player or not player["attributes"]:
@@ -3897,186 +4677,240 @@ def ensure_player_data(client_id: str):
 
 def is_supporter(user_id: str) -> bool:
     """Check if user is a supporter (gold username)"""
-    global world_data
-    supporters = world_data.get("supporters", {})
-    return user_id in supporters and supporters[user_id].get("is_supporter", False)
+    entry = world_data["supporters"].get(user_id)
+    return bool(entry) and entry.get("is_supporter", False)
+
+# Rendered /supporters text and /api/supporters body — rebuilt only after invalidate_supporters_cache()
+_supporters_text: Optional[str] = None
+_supporters_api_body: Optional[bytes] = None
+_supporters_version = 0
+_SUPPORTERS_ETAG_SEED = format(int(time.time()), "x")  # new ETags after a restart
+
+def get_supporters_text() -> str:
+    """/supporters message body (cached while world_data["supporters"] is unchanged)"""
+    global _supporters_text
+    if _supporters_text is None:
+        supporters = world_data["supporters"]
+        supporter_lines = [
+            f"  ★ {s.get('nickname', '?')}"
+            for s in supporters.values() 
+            if isinstance(s, dict) and s.get("is_supporter")
+        ]
+        
+        if supporter_lines:
+            supporters_block = "\n".join(supporter_lines)
+            _supporters_text = f"""🌟 [SUPPORTERS - {len(supporter_lines)} total]
+
+These amazing people support the server:
+
+{supporters_block}
+
+Thank you all! 💛
+Type /donate to join them!"""
+        else:
+            _supporters_text = """🌟 [SUPPORTERS]
+
+No supporters yet!
+Be the first to support: /donate"""
+    return _supporters_text
+
+def get_supporters_api_body() -> bytes:
+    """/api/supporters JSON body (one pass over supporters, cached like the text)"""
+    global _supporters_api_body
+    if _supporters_api_body is None:
+        items = [
+            {"nickname": s.get("nickname", "?"), "since": s.get("registered_at", "?")}
+            for s in world_data["supporters"].values()
+            if isinstance(s, dict) and s.get("is_supporter")
+        ]
+        _supporters_api_body = orjson.dumps({"count": len(items), "supporters": items})
+    return _supporters_api_body
+
+def supporters_etag() -> str:
+    return f'W/"supporters-{_SUPPORTERS_ETAG_SEED}-{_supporters_version}"'
+
+def invalidate_supporters_cache():
+    """Call after any change to world_data["supporters"]"""
+    global _supporters_text, _supporters_api_body, _supporters_version
+    _supporters_text = None
+    _supporters_api_body = None
+    _supporters_version += 1
 
 def is_admin(user_id: str) -> bool:
     """Check if user is an admin (privileged commands)"""
-    admin_env = os.getenv("ADMIN_UUIDS", "").strip()
-    ADMIN_UUIDS = [uuid.strip() for uuid in admin_env.split(",") if uuid.strip()]
     return user_id in ADMIN_UUIDS
 
+# /move: direction → (dx, dy, display name), one lookup per move
+_DIRECTIONS = {
+    "north": (0, 1, "NORTH"), "n": (0, 1, "NORTH"),
+    "south": (0, -1, "SOUTH"), "s": (0, -1, "SOUTH"),
+    "east": (1, 0, "EAST"), "e": (1, 0, "EAST"),
+    "west": (-1, 0, "WEST"), "w": (-1, 0, "WEST")
+}
+
 async def handle_move(client_id: str, direction: str):
     """Handle movement"""
-    direction = direction.lower().strip()
-    
-    direction_map = {
-        "north": (0, 1), "n": (0, 1),
-        "south": (0, -1), "s": (0, -1),
-        "east": (1, 0), "e": (1, 0),
-        "west": (-1, 0), "w": (-1, 0)
-    }
-    
-    if direction not in direction_map:
-        await manager.send_personal(json.dumps({
-            "type": "error",
-            "content": "[ERROR] Specify direction: north/south/east/west (or n/s/e/w)",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+    entry = _DIRECTIONS.get(direction.lower().strip())
+    if entry is None:
+        await manager.send_message(client_id, "error", "[ERROR] Specify direction: north/south/east/west (or n/s/e/w)")
         return
     
-    dx, dy = direction_map[direction]
+    dx, dy, direction_name = entry
     player = ensure_player_data(client_id)
-    pos = player.get("position", [0, 0, 0])
+    pos = player.get("position", _ORIGIN)
     # Ensure z exists
     z = pos[2] if len(pos) > 2 else 0
     new_pos = [pos[0] + dx, pos[1] + dy, z]  # z축 유지 (수평 이동)
     
     player["position"] = new_pos
-    
-    # Save to DB
-    await manager.save_player_to_db(client_id)
-    
-    direction_en = {"north": "NORTH", "south": "SOUTH", "east": "EAST", "west": "WEST",
-                    "n": "NORTH", "s": "SOUTH", "e": "EAST", "w": "WEST"}
+    manager.reindex_player(player)
     
     # Get location description
     offset = player.get("time_offset", 0)
     location_desc = get_location_description(new_pos, offset)
-    move_msg = f"You move {direction_en[direction]}.\n{location_desc}"
+    move_msg = f"You move {direction_name}.\n{location_desc}"
     
-    await manager.send_personal(json.dumps({
+    await manager.send_personal(to_json({
         "type": "narrative",
         "content": move_msg,
         "position": new_pos,  # HUD update
-        "timestamp": datetime.now().isoformat()
+        "timestamp": frame_timestamp()
     }), client_id)
-
-def get_world_time(x: int, offset_hours: float = 0) -> dict:
-    """Calculate world time based on X coordinate and player's personal time offset"""
-    now = datetime.now() + timedelta(hours=offset_hours)
-    hour = now.hour
-    minute = now.minute
-    # 1 hour shift per 10 X units
-    adjusted_hour = (hour + (x // 10)) % 24
     
+    # Save to DB after the reply (write-behind: cache update + queued row, never a DB round-trip here)
+    await manager.save_player_to_db(client_id)
+
+def _local_time(offset_hours: float = 0, now: Optional[datetime] = None) -> datetime:
+    """Player's local clock: one clock read (or the caller's `now`) + personal time offset"""
+    if now is None:
+        now = datetime.now()
+    return now + timedelta(hours=offset_hours) if offset_hours else now
+
+def _world_hour(hour: int, x: int) -> int:
+    """World hour at column x — 1 hour shift per 10 X units"""
+    return (hour + (x // 10)) % 24
+
+def _world_time_at(local: datetime, x: int) -> dict:
+    """World time record at column x for a local clock"""
+    return _world_time_record(_world_hour(local.hour, x), local.minute)
+
+def get_world_time(x: int, offset_hours: float = 0, now: Optional[datetime] = None) -> dict:
+    """Calculate world time based on X coordinate and player's personal time offset
+    (pass `now` to share one clock read across time/weather lookups in the same request)"""
+    return _world_time_at(_local_time(offset_hours, now), x)
+
+def _day_period(adjusted_hour: int) -> str:
     if 5 <= adjusted_hour < 7:
-        period = "DAWN"
+        return "DAWN"
     elif 7 <= adjusted_hour < 12:
-        period = "MORNING"
+        return "MORNING"
     elif 12 <= adjusted_hour < 14:
-        period = "NOON"
+        return "NOON"
     elif 14 <= adjusted_hour < 18:
-        period = "AFTERNOON"
+        return "AFTERNOON"
     elif 18 <= adjusted_hour < 21:
-        period = "EVENING"
-    else:
-        period = "NIGHT"
-    
+        return "EVENING"
+    return "NIGHT"
+
+@functools.lru_cache(maxsize=24 * 60)
+def _world_time_record(adjusted_hour: int, minute: int) -> dict:
+    """One shared record per (hour, minute) of world time — read-only for callers"""
     return {
         "hour": adjusted_hour,
         "minute": minute,
-        "period": period,
+        "period": _day_period(adjusted_hour),
         "display": f"{adjusted_hour:02d}:{minute:02d}"
     }
 
+# Biome records are static: one shared dict per biome instead of a fresh literal per call.
+# Plain dicts (they go through to_json in the /do location context) — treat as read-only.
+_BIOME_OMNI_LAB = {
+    "type": "omni_lab",
+    "name": "Omni-Laboratory",
+    "name_en": "Omni-Laboratory",
+    "description": "A pinnacle of existence and creation. Shimmering white surfaces and automated systems defy the surrounding decay.",
+    "ambient": "Humming electronics, sterile air, whirring machinery"
+}
+_BIOME_JUNKYARD = {
+    "type": "junkyard",
+    "name": "Junkyard Wasteland",
+    "name_en": "Junkyard Wasteland",
+    "description": "Endless piles of scrap metal and garbage. The air reeks of oil and rust.",
+    "ambient": "Creaking metal in the wind, cawing crows"
+}
+_BIOME_SANCTUS = {
+    "type": "sanctus",
+    "name": "SANCTUS Outskirts",
+    "name_en": "SANCTUS Outskirts",
+    "description": "The edge of a massive city, illuminated by dazzling neon lights. High walls surround the city.",
+    "ambient": "Humming electronics, patrol drone propellers",
+    "restricted": True
+}
+_BIOME_RUINS = {"type": "ruins", "name": "Ruins", "name_en": "Ruins",
+                "description": "Abandoned buildings line the area. Broken windows, moss-covered walls.",
+                "ambient": "Wind whistling through collapsed concrete"}
+_BIOME_SLUM = {"type": "slum", "name": "Slums", "name_en": "Slums",
+               "description": "Shanty towns and makeshift shelters tangled together. Smoke and food smells mix.",
+               "ambient": "Distant murmuring crowds, barking dogs"}
+_BIOME_SWAMP = {"type": "swamp", "name": "Swampland", "name_en": "Swampland",
+                "description": "Foul-smelling swamps. Unknown things squirm in every puddle.",
+                "ambient": "Croaking frogs, buzzing mosquitoes, dripping water"}
+_BIOME_FOREST = {"type": "forest", "name": "Blighted Forest", "name_en": "Blighted Forest",
+                 "description": "Dark forest of twisted, withered trees. Sunlight barely reaches here.",
+                 "ambient": "Snapping dry branches, ominous bird calls"}
+_BIOME_DESERT = {"type": "desert", "name": "Arid Wasteland", "name_en": "Arid Wasteland",
+                 "description": "Parched earth and dust storms. The sunlight is blindingly harsh.",
+                 "ambient": "Swirling sandstorms, dead silence"}
+_BIOME_COAST = {"type": "coast", "name": "Polluted Coast", "name_en": "Polluted Coast",
+                "description": "Coastline with black oil slicks floating on the water. The stench is overwhelming.",
+                "ambient": "Waves crashing, seagull cries, smell of decay"}
+_BIOME_WASTELAND = {"type": "wasteland", "name": "Wasteland", "name_en": "Wasteland",
+                    "description": "Barren, desolate land. Occasional weeds and rocks.",
+                    "ambient": "Wind howling, gravel rolling"}
+_BIOME_PLAINS = {"type": "plains", "name": "Ashen Plains", "name_en": "Ashen Plains",
+                 "description": "Gray plains as if scorched by fire. Ash drifts in the wind.",
+                 "ambient": "Lonely wind, ash crunching underfoot"}
+
 def get_biome(x: int, y: int) -> dict:
-    """Biome determination by coordinates (Procedural Generation)"""
+    """Biome determination by coordinates (Procedural Generation) — returns a shared record, do not mutate"""
     # (1,1) area: Omni-Laboratory (Priority over Junkyard)
     if x == 1 and y == 1:
-        return {
-            "type": "omni_lab",
-            "name": "Omni-Laboratory",
-            "name_en": "Omni-Laboratory",
-            "description": "A pinnacle of existence and creation. Shimmering white surfaces and automated systems defy the surrounding decay.",
-            "ambient": "Humming electronics, sterile air, whirring machinery"
-        }
+        return _BIOME_OMNI_LAB
 
     # (0,0) area: Junkyard/Landfill
     if abs(x) <= 5 and abs(y) <= 5:
-        return {
-            "type": "junkyard",
-            "name": "Junkyard Wasteland",
-            "name_en": "Junkyard Wasteland",
-            "description": "Endless piles of scrap metal and garbage. The air reeks of oil and rust.",
-            "ambient": "Creaking metal in the wind, cawing crows"
-        }
+        return _BIOME_JUNKYARD
     
     # North (Y > 100): High-tech city SANCTUS
     if y > 100:
-        return {
-            "type": "sanctus",
-            "name": "SANCTUS Outskirts",
-            "name_en": "SANCTUS Outskirts",
-            "description": "The edge of a massive city, illuminated by dazzling neon lights. High walls surround the city.",
-            "ambient": "Humming electronics, patrol drone propellers",
-            "restricted": True
-        }
+        return _BIOME_SANCTUS
     
     # Rest determined by coordinates
     # Hash-based consistent biome generation
     seed = abs(x * 73 + y * 137) % 100
     
     if y > 50:  # North: Urbanizing
-        if seed < 40:
-            return {"type": "ruins", "name": "Ruins", "name_en": "Ruins",
-                    "description": "Abandoned buildings line the area. Broken windows, moss-covered walls.",
-                    "ambient": "Wind whistling through collapsed concrete"}
-        else:
-            return {"type": "slum", "name": "Slums", "name_en": "Slums",
-                    "description": "Shanty towns and makeshift shelters tangled together. Smoke and food smells mix.",
-                    "ambient": "Distant murmuring crowds, barking dogs"}
-    
+        return _BIOME_RUINS if seed < 40 else _BIOME_SLUM
     elif y < -50:  # South: Natural zone
-        if seed < 30:
-            return {"type": "swamp", "name": "Swampland", "name_en": "Swampland",
-                    "description": "Foul-smelling swamps. Unknown things squirm in every puddle.",
-                    "ambient": "Croaking frogs, buzzing mosquitoes, dripping water"}
-        else:
-            return {"type": "forest", "name": "Blighted Forest", "name_en": "Blighted Forest",
-                    "description": "Dark forest of twisted, withered trees. Sunlight barely reaches here.",
-                    "ambient": "Snapping dry branches, ominous bird calls"}
-    
+        return _BIOME_SWAMP if seed < 30 else _BIOME_FOREST
     elif x > 50:  # East: Desertification
-        return {"type": "desert", "name": "Arid Wasteland", "name_en": "Arid Wasteland",
-                "description": "Parched earth and dust storms. The sunlight is blindingly harsh.",
-                "ambient": "Swirling sandstorms, dead silence"}
-    
+        return _BIOME_DESERT
     elif x < -50:  # West: Coastline/Wetlands
-        return {"type": "coast", "name": "Polluted Coast", "name_en": "Polluted Coast",
-                "description": "Coastline with black oil slicks floating on the water. The stench is overwhelming.",
-                "ambient": "Waves crashing, seagull cries, smell of decay"}
-    
+        return _BIOME_COAST
     else:  # Central: Mixed wasteland
-        if seed < 50:
-            return {"type": "wasteland", "name": "Wasteland", "name_en": "Wasteland",
-                    "description": "Barren, desolate land. Occasional weeds and rocks.",
-                    "ambient": "Wind howling, gravel rolling"}
-        else:
-            return {"type": "plains", "name": "Ashen Plains", "name_en": "Ashen Plains",
-                    "description": "Gray plains as if scorched by fire. Ash drifts in the wind.",
-                    "ambient": "Lonely wind, ash crunching underfoot"}
-
-def get_weather(x: int, y: int, offset_hours: float = 0) -> dict:
-    """좌표와 시간에 따른 날씨 생성 (Meteorological Engine)"""
-    # 시간 기반 시드 (같은 시간대에는 같은 날씨)
-    now = datetime.now() + timedelta(hours=offset_hours)
-    hour = now.hour
-    day = now.day
+        return _BIOME_WASTELAND if seed < 50 else _BIOME_PLAINS
+
+# Climate bands by y: label i covers _CLIMATE_THRESHOLDS[i-1] < y <= _CLIMATE_THRESHOLDS[i]
+_CLIMATE_THRESHOLDS = (-80, -30, 50, 80)
+_CLIMATE_BANDS = ("tropical", "subtropical", "temperate", "cold_temperate", "arctic")
+
+@functools.lru_cache(maxsize=16384)
+def _weather_record(x: int, y: int, hour: int, day: int) -> dict:
+    """좌표와 시간에 따른 날씨 (Meteorological Engine): pure function of (x, y, local hour, day) — computed once per key, shared record"""
     weather_seed = abs(x * 31 + y * 17 + hour * 7 + day * 3) % 100
     
-    # 기후대 결정
-    if y > 80:  # 북극권
-        climate = "arctic"
-    elif y > 50:
-        climate = "cold_temperate"
-    elif y > -30:
-        climate = "temperate"
-    elif y > -80:
-        climate = "subtropical"
-    else:
-        climate = "tropical"
+    # 기후대 결정 (y > 80 북극권 … y <= -80 열대)
+    climate = _CLIMATE_BANDS[bisect.bisect_left(_CLIMATE_THRESHOLDS, y)]
     
     # 해안 여부
     is_coastal = abs(x) > 40
@@ -4167,8 +5001,8 @@ def get_weather(x: int, y: int, offset_hours: float = 0) -> dict:
             weather["description"] = "Calm weather. No notable conditions."
     
     # Time-based additional effects
-    time_info = get_world_time(x, offset_hours)
-    if time_info["period"] == "NIGHT":
+    # (same hour shift as get_world_time)
+    if _day_period(_world_hour(hour, x)) == "NIGHT":
         weather["visibility"] = "dark" if weather["visibility"] == "clear" else weather["visibility"]
         weather["effects"].append("darkness")
         if "description" in weather:
@@ -4176,24 +5010,23 @@ def get_weather(x: int, y: int, offset_hours: float = 0) -> dict:
     
     return weather
 
+def get_environment(x: int, y: int, offset_hours: float = 0, now: Optional[datetime] = None) -> tuple:
+    """(time_info, biome, weather) for one tile from a single clock read + offset (shared records, read-only)"""
+    local = _local_time(offset_hours, now)
+    return (
+        _world_time_at(local, x),
+        get_biome(x, y),
+        _weather_record(x, y, local.hour, local.day),
+    )
+
+# Altitude bands for integer z: label i covers _ALTITUDE_THRESHOLDS[i-1] <= z < _ALTITUDE_THRESHOLDS[i]
+_ALTITUDE_THRESHOLDS = (-100, -10, 0, 1, 10, 100, 5000)
+_ALTITUDE_LABELS = ("Deep Underground", "Underground", "Shallow Underground", "Surface",
+                    "Low Altitude", "High Altitude", "Very High Altitude", "Stratosphere")
+
 def get_altitude_description(z: int) -> str:
     """Z축 고도에 따른 설명"""
-    if z < -100:
-        return "Deep Underground"
-    elif z < -10:
-        return "Underground"
-    elif z < 0:
-        return "Shallow Underground"
-    elif z == 0:
-        return "Surface"
-    elif z < 10:
-        return "Low Altitude"
-    elif z < 100:
-        return "High Altitude"
-    elif z < 5000:
-        return "Very High Altitude"
-    else:
-        return "Stratosphere"
+    return _ALTITUDE_LABELS[bisect.bisect_right(_ALTITUDE_THRESHOLDS, z)]
 
 def get_location_description(position: List[int], offset_hours: float = 0) -> str:
     """Generate simple description for location (HUD) - with z-axis and time offset"""
@@ -4215,6 +5048,39 @@ def get_location_description(position: List[int], offset_hours: float = 0) -> st
     
     return f"[{time_info['period']}] {biome['name']} ({x}, {y}, z={z}) - {z_text}"
 
+# Weather effect codes → display names for 【EFFECTS】
+_WEATHER_EFFECTS_EN = {
+    'hypothermia_risk': 'Hypothermia Risk',
+    'movement_impaired': 'Movement Impaired',
+    'vision_blocked': 'Vision Blocked',
+    'tracks_visible': 'Tracks Visible',
+    'cold_damage': 'Frostbite Risk',
+    'wetness': 'Getting Wet',
+    'sound_masked': 'Sound Masked',
+    'projectiles_deflected': 'Projectiles Affected',
+    'fire_spread': 'Fire Spread Risk',
+    'flooding_risk': 'Flooding Risk',
+    'electronics_risk': 'Electronics Malfunction Risk',
+    'rust_accelerated': 'Accelerated Corrosion',
+    'dehydration_accelerated': 'Accelerated Dehydration',
+    'heat_exhaustion_risk': 'Heat Stroke Risk',
+    'lightning_risk': 'Lightning Risk',
+    'metal_hot': 'Hot Metal Burn Risk',
+    'vision_limited': 'Limited Vision',
+    'sound_distorted': 'Sound Distorted',
+    'stealth_bonus': 'Stealth Advantage',
+    'tracks_washed': 'Tracks Washed Away',
+    'scent_carried': 'Scents Carried',
+    'darkness': 'Darkness'
+}
+
+# /look at the origin (0, 0)
+_SPAWN_MONOLITH_TEXT = """
+
+【NOTABLE】 A black monolith stands tall among the garbage piles. 
+Faint letters are carved into its surface: "Hello, World!"
+Mountains of waste surround the area."""
+
 async def get_location_description_detailed(position: List[int], client_id: str) -> str:
     """Detailed location description (5 senses + weather) - with z-axis"""
     global world_data, manager
@@ -4223,19 +5089,15 @@ async def get_location_description_detailed(position: List[int], client_id: str)
     z = position[2] if len(position) > 2 else 0
     
     # Get player's personal time offset
-    player = manager.player_data.get(client_id, {})
+    player = manager.player_data.get(client_id, EMPTY_MAP)
     offset = player.get("time_offset", 0)
     
-    time_info = get_world_time(x, offset)
-    biome = get_biome(x, y)
-    weather = get_weather(x, y, offset)
+    time_info, biome, weather = get_environment(x, y, offset)
     
     # Check nearby objects
     nearby_objects = []
-    for obj_id, obj in world_data.get("objects", {}).items():
-        obj_pos = ensure_int_position(obj.get("position", [999, 999]))
-        if abs(obj_pos[0] - x) <= 2 and abs(obj_pos[1] - y) <= 2:
-            nearby_objects.append(obj)
+    for _, obj in object_index.within(x, y, 2, world_data["objects"]):
+        nearby_objects.append(obj)
     
     # Z-axis environmental description
     altitude_desc = get_altitude_description(z)
@@ -4261,64 +5123,36 @@ async def get_location_description_detailed(position: List[int], client_id: str)
     else:
         z_display = "Surface Level"
     
-    # Basic environment description
-    desc = f"""[{time_info['period']} - {time_info['display']}] {biome['name']} ({x}, {y}, z={z})
+    # Basic environment description (sections collected in parts, joined once)
+    parts = [f"""[{time_info['period']} - {time_info['display']}] {biome['name']} ({x}, {y}, z={z})
 【ELEVATION】 {z_display} ({altitude_desc})
 
 【SIGHT】 {biome['description']}
 【SOUND】 {biome['ambient']}
-【WEATHER】 {weather.get('description', 'No notable conditions')}{z_environment}"""
+【WEATHER】 {weather.get('description', 'No notable conditions')}{z_environment}"""]
     
     # Display weather effects
     if weather.get('effects'):
-        effects_en = {
-            'hypothermia_risk': 'Hypothermia Risk',
-            'movement_impaired': 'Movement Impaired',
-            'vision_blocked': 'Vision Blocked',
-            'tracks_visible': 'Tracks Visible',
-            'cold_damage': 'Frostbite Risk',
-            'wetness': 'Getting Wet',
-            'sound_masked': 'Sound Masked',
-            'projectiles_deflected': 'Projectiles Affected',
-            'fire_spread': 'Fire Spread Risk',
-            'flooding_risk': 'Flooding Risk',
-            'electronics_risk': 'Electronics Malfunction Risk',
-            'rust_accelerated': 'Accelerated Corrosion',
-            'dehydration_accelerated': 'Accelerated Dehydration',
-            'heat_exhaustion_risk': 'Heat Stroke Risk',
-            'lightning_risk': 'Lightning Risk',
-            'metal_hot': 'Hot Metal Burn Risk',
-            'vision_limited': 'Limited Vision',
-            'sound_distorted': 'Sound Distorted',
-            'stealth_bonus': 'Stealth Advantage',
-            'tracks_washed': 'Tracks Washed Away',
-            'scent_carried': 'Scents Carried',
-            'darkness': 'Darkness'
-        }
-        effect_list = [effects_en.get(e, e) for e in weather['effects'][:3]]
-        desc += f"\n【EFFECTS】 {', '.join(effect_list)}"
+        effect_list = [_WEATHER_EFFECTS_EN.get(e, e) for e in weather['effects'][:3]]
+        parts.append(f"\n【EFFECTS】 {', '.join(effect_list)}")
     
     # Spawn point special description
     if x == 0 and y == 0:
-        desc += """
-
-【NOTABLE】 A black monolith stands tall among the garbage piles. 
-Faint letters are carved into its surface: "Hello, World!"
-Mountains of waste surround the area."""
+        parts.append(_SPAWN_MONOLITH_TEXT)
     
     # Nearby objects description
     if nearby_objects:
-        desc += "\n\n【NEARBY OBJECTS】"
+        parts.append("\n\n【NEARBY OBJECTS】")
         for obj in nearby_objects[:5]:  # Max 5 items
             obj_name = obj.get("name_en", obj.get("name", "Something"))
             obj_desc = obj.get("description", "")
             if obj_desc:
-                desc += f"\n  • {obj_name}: {obj_desc[:50]}..."
+                parts.append(f"\n  • {obj_name}: {obj_desc[:50]}...")
             else:
-                desc += f"\n  • {obj_name}"
+                parts.append(f"\n  • {obj_name}")
         
         if len(nearby_objects) > 5:
-            desc += f"\n  ...and {len(nearby_objects) - 5} more."
+            parts.append(f"\n  ...and {len(nearby_objects) - 5} more.")
             
     # Check for other players nearby
     nearby_players = []
@@ -4329,13 +5163,44 @@ Mountains of waste surround the area."""
                 nearby_players.append(pid)
     
     if nearby_players:
-        desc += f"\n\n【PRESENCE】 You sense the presence of {', '.join(nearby_players)} nearby."
-    
-    return desc
+        parts.append(f"\n\n【PRESENCE】 You sense the presence of {', '.join(nearby_players)} nearby.")
+    
+    return "".join(parts)
+
+# === AI Error Classification ===
+# 우선순위는 (위에서 아래) 기존 if/elif 체인과 동일. 첫 매칭 카테고리가 아니라 가장 우선순위 높은 카테고리를 사용.
+AI_ERROR_DEFAULT_MESSAGE = "[ERROR] Reality is temporarily unstable. Please try again."
+AI_ERROR_CATEGORIES = [
+    ("auth", ("api_key", "auth", "invalid", "incorrect"), "[ERROR] Invalid API key. Please check your settings."),
+    ("model", ("model", "not found"), "[ERROR] Model configuration issue. Please verify the model name."),
+    ("quota", ("quota", "budget"), "💸 Budget/Quota exceeded. Please check your API key balance."),
+    ("rate", ("rate",), "⏳ Rate limit exceeded. Please slow down."),
+    ("limit", ("limit", "exceeded"), "⚠️ API usage limit reached. Please check your provider settings."),
+    ("timeout", ("timeout", "timed out"), "[ERROR] Request timed out. Please try again."),
+    ("network", ("connection", "network"), "[ERROR] Network error. Please check your internet."),
+]
+# 모든 키워드를 하나의 alternation으로 컴파일 → 에러 문자열을 한 번만 스캔
+AI_ERROR_PATTERN = re.compile("|".join(
+    f"(?P<{cat}>{'|'.join(re.escape(kw) for kw in keywords)})"
+    for cat, keywords, _ in AI_ERROR_CATEGORIES
+))
+
+@functools.lru_cache(maxsize=256)
+def classify_ai_error(error_lower: str) -> str:
+    """
+    Map a lowercased provider error message to a user-friendly message
+    (cached: provider 장애 시 동일한 메시지가 한꺼번에 몰려옴)
+    """
+    found = {m.lastgroup for m in AI_ERROR_PATTERN.finditer(error_lower)}
+    if found:
+        for cat, _, content in AI_ERROR_CATEGORIES:
+            if cat in found:
+                return content
+    return AI_ERROR_DEFAULT_MESSAGE
 
 async def process_action(client_id: str, action: str, api_key: str, model: str = "gpt-4o", is_guest: bool = False):
     """Action processing via AI"""
-    global world_data, db_instance
+    global world_data
     
     # Guest tag
     display_name = f"[Guest] {client_id}" if is_guest else client_id
@@ -4346,29 +5211,23 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
     # World state summary (nearby objects only)
     # [LOCK] Read world_data with lock to ensure consistency
     nearby_objects = {}
-    known_locations_list = []
-    recent_history_list = []
+    location_list = []
+    recent_history_json = "[]"
     pinned_objects = {}  # Priority memory for pinned entities
     
-    # Pre-fetch registries (copy to avoid lock contention during long JSON dumps if necessary, 
-    # though here we just access them quickly)
-    materials_registry_data = {}
-    object_types_registry_data = {}
 
-    async with world_data_lock:
+    async with world_data_lock.reader():
         # 0. Get user's pinned objects regardless of distance
         pinned_ids = player.get("pinned_ids", [])
         if pinned_ids:
             for pid in pinned_ids:
-                p_obj = world_data.get("objects", {}).get(pid)
+                p_obj = world_data["objects"].get(pid)
                 if p_obj:
                     pinned_objects[pid] = p_obj.copy() if isinstance(p_obj, dict) else p_obj
 
-        # 1. Nearby objects
-        for obj_id, obj in world_data.get("objects", {}).items():
-            obj_pos = ensure_int_position(obj.get("position", [999, 999]))
-            if abs(obj_pos[0] - pos[0]) <= 100 and abs(obj_pos[1] - pos[1]) <= 100:
-                nearby_objects[obj_id] = obj.copy() if isinstance(obj, dict) else obj # Shallow copy safe for now
+        # 1. Nearby objects (spatial index → only surrounding cells, then exact box check)
+        for obj_id, obj in object_index.within(pos[0], pos[1], 100, world_data["objects"]):
+            nearby_objects[obj_id] = obj.copy() if isinstance(obj, dict) else obj # Shallow copy safe for now
         
         # Limit nearby objects to prevent context overflow (Max 50)
         if len(nearby_objects) > 50:
@@ -4377,35 +5236,30 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 key=lambda item: abs(item[1].get("position", [0,0,0])[0] - pos[0]) + abs(item[1].get("position", [0,0,0])[1] - pos[1])
             )[:50])
 
-        # 2. Known Locations
-        for obj_id, obj in world_data.get("objects", {}).items():
-            obj_name = obj.get("name", obj_id)
-            obj_pos = ensure_int_position(obj.get("position", [0, 0, 0]))
-            
-            # Calculate distance from current position
-            dist = abs(obj_pos[0] - pos[0]) + abs(obj_pos[1] - pos[1]) + abs(obj_pos[2] - (pos[2] if len(pos) > 2 else 0))
-            
-            known_locations_list.append({
-                "id": obj_id,
-                "name": obj_name,
-                "position": obj_pos,
-                "distance": dist
-            })
+        # 2. Known Locations — closest 150 by Manhattan distance (heap: O(N log 150), no per-object dicts)
+        px, py = pos[0], pos[1]
+        pz = pos[2] if len(pos) > 2 else 0
+        
+        def _distance(item):
+            obj_pos = ensure_int_position(item[1].get("position", _ORIGIN))
+            return abs(obj_pos[0] - px) + abs(obj_pos[1] - py) + abs(obj_pos[2] - pz)
+        
+        # Concise format: "Name(x,y,z)"
+        for obj_id, obj in heapq.nsmallest(150, world_data["objects"].items(), key=_distance):
+            obj_pos = ensure_int_position(obj.get("position", _ORIGIN))
+            location_list.append(f"{obj.get('name', obj_id)}({obj_pos[0]},{obj_pos[1]},{obj_pos[2]})")
             
         # 3. History
-        recent_history_list = list(world_data.get("history", []))[-100:] # Increased history for better context
-        
-        # 4. Registries
-        materials = world_data.get("materials", {})
-        materials_registry_data = {k: v for k, v in materials.items() if k != "_README"}
+        # Tail only: walk the deque from the right instead of copying all MAX_IN_MEMORY_HISTORY entries
+        # Entries are already encoded (history_prompt_tail) → one join instead of re-encoding 100 dicts
+        recent_history_json = "[" + ",".join(history_prompt_tail) + "]"
         
-        object_types = world_data.get("object_types", {})
-        object_types_registry_data = {k: v for k, v in object_types.items() if k != "_README"}
+        # 4. Registries (For Quick Craft) — encoded once per registry change, shared by every /do
+        materials_registry = _cached_registry(
+            "materials_prompt", len(world_data["materials"]), _render_materials_prompt)
+        object_types_registry = _cached_registry(
+            "blueprints_prompt", len(world_data["object_types"]), _render_blueprints_prompt)
 
-    # Sort by distance and take top 150 (Outside Lock)
-    known_locations_list.sort(key=lambda x: x["distance"])
-    known_locations = known_locations_list[:150]
-    
     # --- Long-Term Memory Retrieval (RAG) ---
     retrieved_memories = []
     retrieved_facts = []
@@ -4461,7 +5315,7 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                     elif "description" in item: # It's an object/fact
                         if item["id"] not in seen_fact_ids:
                             # Categorize based on 'kind' property
-                            kind = item.get("properties", {}).get("kind", "object")
+                            kind = item.get("properties", EMPTY_MAP).get("kind", "object")
                             retrieved_facts.append({
                                 "type": kind,
                                 "name": item["name"],
@@ -4478,80 +5332,63 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
             retrieved_facts = retrieved_facts[:20]
                 
         except Exception as e:
-            print(f"[MEMORY RETRIEVAL ERROR] {e}")
-
-    # Convert to concise format: "Name(x,y,z)"
-    location_list = [f"{loc['name']}({loc['position'][0]},{loc['position'][1]},{loc['position'][2]})" 
-                     for loc in known_locations]
-    
-    world_state = json.dumps({
-        "nearby_objects": nearby_objects,
-        "pinned_important_entities": pinned_objects,  # AI priority memory
-        "known_locations": location_list,
-        "recent_history": recent_history_list,
-        "long_term_memories": retrieved_memories,    # RAG: Past actions
-        "established_facts": retrieved_facts,       # RAG: World knowledge & snapshots
-        "current_time": datetime.now().isoformat()
-    }, ensure_ascii=False)
+            logger.error("[MEMORY RETRIEVAL ERROR] %s", e)
+
+    # One clock read for the whole prompt (current_time, world time, weather)
+    now = datetime.now()
+    # recent_history is spliced in pre-encoded between the two halves (same key order as before)
+    world_state = "".join((
+        to_json({
+            "nearby_objects": nearby_objects,
+            "pinned_important_entities": pinned_objects,  # AI priority memory
+            "known_locations": location_list,
+        })[:-1],
+        ',"recent_history":', recent_history_json, ",",
+        to_json({
+            "long_term_memories": retrieved_memories,    # RAG: Past actions
+            "established_facts": retrieved_facts,       # RAG: World knowledge & snapshots
+            "current_time": now.isoformat()
+        })[1:],
+    ))
     
     # Player state
-    player_state = json.dumps({
+    player_state = to_json({
         "id": client_id,
         "position": pos,
         "status": player.get("status", "Healthy"),
         "inventory": player.get("inventory", {}),
         "attributes": player.get("attributes", {}),
         "skills": player.get("skills", {})
-    }, ensure_ascii=False)
+    })
     
     # Location context (biome, time, weather)
     offset = player.get("time_offset", 0)
-    time_info = get_world_time(pos[0], offset)
-    biome = get_biome(pos[0], pos[1])
-    weather = get_weather(pos[0], pos[1], offset)
-    location_context = json.dumps({
+    time_info, biome, weather = get_environment(pos[0], pos[1], offset, now)
+    location_context = to_json({
         "biome": biome,
         "time": time_info,
         "weather": weather,
         "coordinates": pos,
         "personal_time_offset": offset
-    }, ensure_ascii=False)
-    
-    # Materials registry (For Quick Craft)
-    # Use pre-fetched data
-    materials_registry = json.dumps({
-        "registered_count": len(materials_registry_data),
-        "materials": list(materials_registry_data.keys()) if materials_registry_data else ["(No inventions registered yet)"],
-        "note": "Materials in this list can be Quick Crafted (instant craft if you have ingredients)"
-    }, ensure_ascii=False)
-    
-    # Blueprints registry (For Quick Craft)
-    # Use pre-fetched data
-    object_types_registry = json.dumps({
-        "registered_count": len(object_types_registry_data),
-        "blueprints": {k: {"name": v.get("name"), "materials": v.get("base_materials", [])} 
-                       for k, v in object_types_registry_data.items()} if object_types_registry_data else {"(No blueprints registered yet)": {}},
-        "note": "Objects in this list can be Quick Crafted (instant craft if you have materials + facility)"
-    }, ensure_ascii=False)
+    })
     
     # Build system prompt (dynamically load world_rules.json on each request)
-    rules = load_rules()
+    # Stamp before reading so a concurrent edit invalidates on the next request
+    rules_stamp = get_rules_stamp()
+    rules = load_rules(rules_stamp)
     system_msg = build_system_prompt(
         rules=rules,
         world_state=world_state,
         player_state=player_state,
         location_context=location_context,
         materials_registry=materials_registry,
-        object_types_registry=object_types_registry
+        object_types_registry=object_types_registry,
+        rules_stamp=rules_stamp
     )
     
     try:
         # Processing message
-        await manager.send_personal(json.dumps({
-            "type": "system",
-            "content": "[PROCESSING...] Reality responds...",
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+        await manager.send_personal(stamp_frame(_PROCESSING_FRAME_PREFIX, frame_timestamp()), client_id)
         
         # LiteLLM call (60s timeout)
         try:
@@ -4574,75 +5411,49 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 timeout=60.0
             )
         except exceptions.RateLimitError:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "⏳ Rate limit exceeded. Please wait a moment and try again.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            await manager.send_message(client_id, "error", "⏳ Rate limit exceeded. Please wait a moment and try again.")
             return
         except exceptions.ContextWindowExceededError:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "⚠️ Memory full. The conversation history is too long.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            await manager.send_message(client_id, "error", "⚠️ Memory full. The conversation history is too long.")
             return
         except exceptions.AuthenticationError:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Invalid API Key. Please check your settings.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            await manager.send_message(client_id, "error", "[ERROR] Invalid API Key. Please check your settings.")
             return
         except exceptions.BadRequestError as e:
             # Model name errors, etc.
-            print(f"[LiteLLM BAD REQUEST] {e}")
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] Bad Request. Please check your model or input.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            logger.error("[LiteLLM BAD REQUEST] %s", e)
+            await manager.send_message(client_id, "error", "[ERROR] Bad Request. Please check your model or input.")
             return
         except asyncio.TimeoutError:
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] AI is not responding. Please try again later. (60s timeout)",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            await manager.send_personal(stamp_frame(_AI_TIMEOUT_FRAME_PREFIX, frame_timestamp()), client_id)
             return
         except Exception as e:
-            print(f"[LiteLLM UNEXPECTED ERROR] {e}")
-            await manager.send_personal(json.dumps({
-                "type": "error",
-                "content": "[ERROR] An internal AI error occurred. Please try again.",
-                "timestamp": datetime.now().isoformat()
-            }), client_id)
+            logger.error("[LiteLLM UNEXPECTED ERROR] %s", e)
+            await manager.send_message(client_id, "error", "[ERROR] An internal AI error occurred. Please try again.")
             return
         
         result_text = response.choices[0].message.content
+        # AI 응답 시각 (이후 메시지/팩트/히스토리/로그/에러 모두 동일 타임스탬프 사용)
+        responded_at = datetime.now()
+        now_iso = responded_at.isoformat()
+        # 프롬프트 기준 위치 (scene snapshot / fact 객체 공용)
+        sx, sy, sz = int(pos[0]), int(pos[1]), int(pos[2] if len(pos) > 2 else 0)
         
         # JSON 파싱 시도
         result = None
         try:
-            # 1. 마크다운 코드블록에서 JSON 추출
-            if "```json" in result_text:
-                json_str = result_text.split("```json")[1].split("```")[0]
-                result = json.loads(json_str.strip())
-            elif "```" in result_text:
-                json_str = result_text.split("```")[1].split("```")[0]
-                result = json.loads(json_str.strip())
-            else:
-                # 2. 순수 JSON 파싱 시도
-                result = json.loads(result_text.strip())
-        except (json.JSONDecodeError, IndexError):
+            # 1. 마크다운 코드블록에서 JSON 추출 (```json 우선, 없으면 첫 ``` 블록)
+            match = _JSON_FENCE_PATTERN.search(result_text) or _CODE_FENCE_PATTERN.search(result_text)
+            # 2. 코드블록이 없으면 순수 JSON 파싱 시도
+            result = orjson.loads((match.group(1) if match else result_text).strip())
+        except orjson.JSONDecodeError:
             # 3. { } 사이의 JSON 추출 시도
             try:
                 start = result_text.find('{')
                 end = result_text.rfind('}') + 1
                 if start != -1 and end > start:
-                    json_str = result_text[start:end]
-                    result = json.loads(json_str)
-            except (json.JSONDecodeError, ValueError):
+                    result = orjson.loads(result_text[start:end])
+            except orjson.JSONDecodeError:
                 pass
         
         # 4. 최종 실패 시 텍스트 그대로 사용
@@ -4705,8 +5516,8 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                          existing_names.add(str(item["name"]).lower())
             
              # 2. Existing objects (Lock required for thread safety)
-             async with world_data_lock:
-                 for obj in world_data.get("objects", {}).values():
+             async with world_data_lock.reader():
+                 for obj in world_data["objects"].values():
                      if obj.get("name"):
                          existing_names.add(str(obj["name"]).lower())
 
@@ -4735,32 +5546,32 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 if "calculated_value" in safe_locals:
                     calc_val = safe_locals["calculated_value"]
                     narrative += f"\n\n[🧮 CALCULATION: {calc_val}]"
-                    print(f"[MATH VERIFIED] Python calculated value: {calc_val}")
+                    logger.info("[MATH VERIFIED] Python calculated value: %s", calc_val)
 
                 # 2. Check for 'inventory_change' variable (Trading/Looting)
                 if "inventory_change" in safe_locals and isinstance(safe_locals["inventory_change"], dict):
                     # Override the AI's hallucinated inventory_change with the calculated one
                     if "user_update" not in result: result["user_update"] = {}
                     result["user_update"]["inventory_change"] = safe_locals["inventory_change"]
-                    print(f"[MATH VERIFIED] Python calculated inventory change: {safe_locals['inventory_change']}")
+                    logger.info("[MATH VERIFIED] Python calculated inventory change: %s", safe_locals['inventory_change'])
 
                 # 3. Check for Evolution variables (Stats growth)
                 for var_name in ["attribute_change", "skill_change", "position_delta"]:
                     if var_name in safe_locals and isinstance(safe_locals[var_name], (dict, list)):
                         if "user_update" not in result: result["user_update"] = {}
                         result["user_update"][var_name] = safe_locals[var_name]
-                        print(f"[MATH VERIFIED] Python calculated {var_name}: {safe_locals[var_name]}")
+                        logger.info("[MATH VERIFIED] Python calculated %s: %s", var_name, safe_locals[var_name])
                 
                 # 4. Check for Time variables
                 if "time_skip_hours" in safe_locals:
                     hours = float(safe_locals["time_skip_hours"])
                     player["time_offset"] = player.get("time_offset", 0) + hours
                     narrative += f"\n\n[⏰ TIME PASSED: {hours} hours]"
-                    print(f"[MATH VERIFIED] {client_id} time skip: {hours}h (Total offset: {player['time_offset']}h)")
+                    logger.info("[MATH VERIFIED] %s time skip: %sh (Total offset: %sh)", client_id, hours, player['time_offset'])
                     
             except Exception as e:
                 # Log detailed error on server, send sanitized message to client
-                print(f"[MATH ERROR] Failed to execute AI python code for {client_id}: {e}")
+                logger.error("[MATH ERROR] Failed to execute AI python code for %s: %s", client_id, e)
                 narrative += f"\n\n[SYSTEM] A calculation error occurred. Reality is slightly distorted."
 
         # Optional: persist the narrative itself as a location "scene snapshot" object.
@@ -4768,10 +5579,9 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
         scene_snapshot_saved = False
         if PERSIST_SCENE_SNAPSHOTS:
             try:
-                # Use the current player position used to build the prompt
-                sx, sy, sz = int(pos[0]), int(pos[1]), int(pos[2] if len(pos) > 2 else 0)
+                # Use the current player position used to build the prompt (sx, sy, sz)
                 scene_snapshot_id = f"scene_{sx}_{sy}_{sz}"
-                snapshot_text = narrative if isinstance(narrative, str) else json.dumps(narrative, ensure_ascii=False)
+                snapshot_text = narrative if isinstance(narrative, str) else to_json(narrative)
                 if len(snapshot_text) > MAX_SCENE_SNAPSHOT_CHARS:
                     snapshot_text = snapshot_text[:MAX_SCENE_SNAPSHOT_CHARS] + "…"
 
@@ -4787,19 +5597,18 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                     "properties": {
                         **(scene_obj.get("properties", {}) if isinstance(scene_obj.get("properties", {}), dict) else {}),
                         "kind": "scene_snapshot",
-                        "updated_at": datetime.now().isoformat(),
+                        "updated_at": now_iso,
                         "source_action": action,
                     }
                 })
                 world_data["objects"][scene_snapshot_id] = scene_obj
+                object_index.index(scene_snapshot_id, scene_obj)
 
-                if db_instance is None:
-                    db_instance = await get_db()
-                await db_instance.save_object(scene_snapshot_id, scene_obj)
+                await write_behind("objects", scene_snapshot_id, Database.object_row(scene_snapshot_id, scene_obj))
                 scene_snapshot_saved = True
             except Exception as e:
                 # Never let snapshotting crash the action.
-                print(f"[SNAPSHOT ERROR] Failed to persist scene snapshot: {e}")
+                logger.error("[SNAPSHOT ERROR] Failed to persist scene snapshot: %s", e)
 
         persisted = bool(has_world_update or has_discovery or has_blueprint or scene_snapshot_saved)
         if has_world_update:
@@ -4814,7 +5623,7 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
             persisted_reason = "narrative_only"
         
         # 1. Personal Result (Full Narrative)
-        personal_msg = json.dumps({
+        personal_msg = to_json({
             "type": "action",
             "actor": display_name,
             "action": action,
@@ -4831,37 +5640,36 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 "scene_snapshot": scene_snapshot_saved,
                 "scene_snapshot_id": scene_snapshot_id
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso
         })
         await manager.send_personal(personal_msg, client_id)
 
         # 2. Public Announcement (Summary)
         # Broadcast a summary to others nearby to prevent "narrative confusion"
-        public_msg = json.dumps({
+        public_msg = to_json({
             "type": "action_summary",
             "actor": display_name,
             "action": action,
             "success": result.get("success", True),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso
         })
         # Broadcast to players within a radius of 10
         await manager.broadcast_nearby(public_msg, pos, radius=10, exclude=client_id)
         
         # === Fact Extraction Handler ===
         if extracted_facts and isinstance(extracted_facts, list):
-            fact_tasks = []
+            fact_rows = []
             try:
                 # Store each fact as a persistent 'fact' object at the current location
-                sx, sy, sz = int(pos[0]), int(pos[1]), int(pos[2] if len(pos) > 2 else 0)
+                fact_stamp = responded_at.strftime('%Y%m%d%H%M%S')
                 
                 # [LOCK] Update world_data safely
                 async with world_data_lock:
-                    for idx, fact in enumerate(extracted_facts):
+                    for fact in extracted_facts:
                         if not fact or not isinstance(fact, str): continue
                         
-                        # Create a unique ID for the fact to prevent overwriting
-                        fact_hash = abs(hash(fact)) % 10000
-                        fact_id = f"fact_{sx}_{sy}_{sz}_{datetime.now().strftime('%H%M%S')}_{idx}_{fact_hash}"
+                        # Unique ID (never overwrites an earlier fact at this spot)
+                        fact_id = f"fact_{sx}_{sy}_{sz}_{fact_stamp}_{next(_fact_seq)}"
                         
                         fact_obj = {
                             "id": fact_id,
@@ -4871,79 +5679,38 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                             "properties": {
                                 "kind": "fact",
                                 "actor": display_name,
-                                "timestamp": datetime.now().isoformat()
+                                "timestamp": now_iso
                             }
                         }
                         
                         # Memory update
                         world_data["objects"][fact_id] = fact_obj
+                        object_index.index(fact_id, fact_obj)
                         
-                        # Add to task list for DB
-                        fact_tasks.append((fact_id, fact_obj.copy()))
+                        # Row serialized now (snapshot under the lock) — no defensive copy needed
+                        fact_rows.append((fact_id, Database.object_row(fact_id, fact_obj)))
                         
                         persisted = True
                         persisted_reason = "fact_extraction"
                 
-                # DB Update (Outside Lock)
-                if db_instance is None:
-                    db_instance = await get_db()
-                
-                for fid, fobj in fact_tasks:
-                    await db_instance.save_object(fid, fobj)
+                # DB Update (Outside Lock, write-behind → one transaction with the rest of the batch)
+                for fid, row in fact_rows:
+                    await write_behind("objects", fid, row)
                     
             except Exception as e:
-                print(f"[FACT ERROR] Failed to persist extracted facts: {e}")
+                logger.error("[FACT ERROR] Failed to persist extracted facts: %s", e)
 
         # World Update (Async - includes DB save)
         if world_update:
             await apply_world_update_async(world_update)
         
         # 유저 업데이트
-        user_update = result.get("user_update", {})
+        user_update = normalize_user_update(result.get("user_update"))
         if user_update:
-            if "status_desc" in user_update:
-                player["status"] = user_update["status_desc"]
-            if "inventory_change" in user_update and isinstance(user_update["inventory_change"], dict):
-                inv = player.get("inventory", {})
-                for item, change in user_update["inventory_change"].items():
-                    # Validate change is a number (AI defensive check)
-                    if not isinstance(change, (int, float)):
-                        continue
-                    if item in inv:
-                        inv[item] += change
-                        if inv[item] <= 0:
-                            del inv[item]
-                    elif change > 0:
-                        inv[item] = change
-                player["inventory"] = inv
-            
-            # === Attribute Change Handler (Evolution System conceptualized by the User) ===
-            if "attribute_change" in user_update and isinstance(user_update["attribute_change"], dict):
-                attrs = player.get("attributes", {})
-                last_exercise = player.get("last_exercise", {})
-                
-                for attr, change in user_update["attribute_change"].items():
-                    if not isinstance(change, (int, float)):
-                        continue
-                    attr_name = attr.capitalize()
-                    
-                    # Ensure the attribute exists before adding (defensive)
-                    if attr_name not in attrs:
-                        attrs[attr_name] = 5.0
-                    
-                    # Precise growth with floating point safety
-                    new_val = float(attrs[attr_name]) + float(change)
-                    
-                    # No absolute maximum cap. Growth is limited only by logic and tech requirements.
-                    # Minimum stays at 1.0 for biological viability.
-                    # Use 3 decimal places to support fine-grained growth (Diminishing Returns)
-                    attrs[attr_name] = round(max(1.0, new_val), 3)
-                    
-                    # Update last exercise timestamp for this attribute
-                    last_exercise[attr_name] = player.get("time_offset", 0)
-                
-                player["attributes"] = attrs
-                player["last_exercise"] = last_exercise
+            # Present sections are applied as-is (normalize_user_update already dropped malformed ones)
+            for key, apply_section in USER_UPDATE_HANDLERS:
+                if key in user_update:
+                    apply_section(player, user_update[key])
 
             # === Attribute Decay (The Law of Entropy) ===
             # Apply decay based on elapsed personal time since last exercise
@@ -4952,9 +5719,9 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
             attrs = player.get("attributes", {})
             
             # Get decay protection rules (Data-driven + Dynamic property check)
-            ae_rules = rules.get("engines", {}).get("attribute_engine", {})
-            decay_protection = ae_rules.get("law_of_entropy_decay", {}).get("decay_protection", 
-                               ae_rules.get("decay_protection", {}))
+            ae_rules = rules.get("engines", EMPTY_MAP).get("attribute_engine", EMPTY_MAP)
+            decay_protection = ae_rules.get("law_of_entropy_decay", EMPTY_MAP).get("decay_protection", 
+                               ae_rules.get("decay_protection", EMPTY_MAP))
             
             decay_occured = False
             inv = player.get("inventory", {}) # This might be just names or full objects
@@ -4970,8 +5737,8 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 # 2. Check dynamic properties of items in inventory
                 # (Assuming AI adds "protects_decay": ["AttributeName"] to item properties)
                 async def check_inventory_props():
-                    async with world_data_lock:
-                        for obj_id, obj in world_data.get("objects", {}).items():
+                    async with world_data_lock.reader():
+                        for obj_id, obj in world_data["objects"].items():
                             # If this object is "owned" by the user and in their inventory
                             if obj.get("owner_uuid") == user_id:
                                 props = obj.get("properties", {})
@@ -4986,8 +5753,7 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                 
                 if elapsed_hours >= 24:
                     # Decay rates per 24h
-                    rates = {"Endurance": 0.01, "Strength": 0.005, "Intelligence": 0.002, "Agility": 0.002, "Willpower": 0.002}
-                    rate = rates.get(attr_name, 0.002)
+                    rate = ATTRIBUTE_DECAY_RATES.get(attr_name, 0.002)
                     
                     # Generic protection check: 
                     # Does user have ANY item whose name or properties suggest protection?
@@ -4995,7 +5761,7 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                     is_protected = any(item in inv for item in protecting_items)
                     
                     # OR: Did AI explicitly mark this as protected in the session?
-                    if user_update.get("protection_active", {}).get(attr_name):
+                    if user_update.get("protection_active", EMPTY_MAP).get(attr_name):
                         is_protected = True
                     
                     if is_protected:
@@ -5003,7 +5769,7 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
                     
                     decay_amount = (elapsed_hours // 24) * rate
                     if decay_amount > 0:
-                        attrs[attr_name] = round(max(1.0, val - decay_amount), 3)
+                        attrs[attr_name] = clamp_attribute(val - decay_amount)
                         # Reset timer to current so we don't double decay next turn unless more time passes
                         last_exercise[attr_name] = current_time 
                         decay_occured = True
@@ -5011,63 +5777,42 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
             if decay_occured:
                 player["attributes"] = attrs
                 player["last_exercise"] = last_exercise
-                print(f"[ENTROPY] Attributes decayed for {client_id} due to inactivity.")
+                logger.info("[ENTROPY] Attributes decayed for %s due to inactivity.", client_id)
 
-            # === Skill Change Handler (Evolution System conceptualized by the User) ===
-            if "skill_change" in user_update and isinstance(user_update["skill_change"], dict):
-                skills = player.get("skills", {})
-                for skill, change in user_update["skill_change"].items():
-                    if not isinstance(change, (int, float)):
-                        continue
-                    # Skill names are usually title-cased
-                    skill_name = skill.title()
-                    if skill_name in skills:
-                        skills[skill_name] += change
-                    else:
-                        skills[skill_name] = change
-                    
-                    # Prevent negative skill levels
-                    if skills[skill_name] < 0:
-                        skills[skill_name] = 0
-                player["skills"] = skills
-            
             # === Position Delta Handler (Relative Movement) ===
-            if "position_delta" in user_update and user_update["position_delta"]:
-                delta = user_update["position_delta"]
-                if isinstance(delta, list) and len(delta) >= 2:
-                    # Ensure delta has z component
-                    dx = int(delta[0]) if delta[0] is not None else 0
-                    dy = int(delta[1]) if delta[1] is not None else 0
-                    dz = int(delta[2]) if len(delta) > 2 and delta[2] is not None else 0
-                    
-                    # Get current position
-                    current_pos = ensure_int_position(player.get("position", [0, 0, 0]))
-                    
-                    # Calculate new position
-                    new_pos = [
-                        current_pos[0] + dx,
-                        current_pos[1] + dy,
-                        current_pos[2] + dz
-                    ]
-                    
-                    player["position"] = new_pos
-                    
-                    # Log movement
-                    print(f"[MOVE] {client_id}: ({current_pos[0]},{current_pos[1]},{current_pos[2]}) -> ({new_pos[0]},{new_pos[1]},{new_pos[2]}) delta=({dx},{dy},{dz})")
-                    
-                    # Send position update to client
-                    await manager.send_personal(json.dumps({
-                        "type": "position_update",
-                        "position": new_pos,
-                        "timestamp": datetime.now().isoformat()
-                    }), client_id)
+            if "position_delta" in user_update:
+                # Already [dx, dy, dz] ints (normalize_user_update)
+                dx, dy, dz = user_update["position_delta"]
+                
+                # Get current position
+                current_pos = ensure_int_position(player.get("position", [0, 0, 0]))
+                
+                # Calculate new position
+                new_pos = [
+                    current_pos[0] + dx,
+                    current_pos[1] + dy,
+                    current_pos[2] + dz
+                ]
+                
+                player["position"] = new_pos
+                manager.reindex_player(player)
+                
+                # Log movement
+                logger.info("[MOVE] %s: (%s,%s,%s) -> (%s,%s,%s) delta=(%s,%s,%s)", client_id, *current_pos, *new_pos, dx, dy, dz)
+                
+                # Send position update to client
+                await manager.send_personal(to_json({
+                    "type": "position_update",
+                    "position": new_pos,
+                    "timestamp": now_iso
+                }), client_id)
             
             # === Death Handler ===
             if user_update.get("is_dead", False):
                 await handle_death(client_id)
             
-            # Save player state to DB
-            await manager.save_player_to_db(client_id)
+            # Save player state to DB (background)
+            await manager.schedule_save(client_id)
         
         # === New Material Discovery Handler ===
         if new_discovery and isinstance(new_discovery, dict) and new_discovery.get("id"):
@@ -5077,128 +5822,125 @@ async def process_action(client_id: str, action: str, api_key: str, model: str =
         if new_object_type and isinstance(new_object_type, dict) and new_object_type.get("id"):
             await handle_new_object_type(new_object_type, client_id)
         
-        # Record history (saved to DB)
+        # Record history (saved to DB) — summary sliced once, shared by history + log
+        summary = narrative[:200] if isinstance(narrative, str) else ""
         history_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso,
             "actor": client_id,
             "action": action,
-            "result": narrative[:200]  # Summary
+            "result": summary
         }
-        world_data["history"].append(history_entry)
-
-        # Memory guardrail: keep history bounded in RAM
-        if isinstance(world_data.get("history"), list) and len(world_data["history"]) > MAX_IN_MEMORY_HISTORY:
-            world_data["history"] = world_data["history"][-MAX_IN_MEMORY_HISTORY:]
-        
-        # Save logs to DB
-        if db_instance is None:
-            db_instance = await get_db()
-        await db_instance.add_log(
-            timestamp=history_entry["timestamp"],
-            actor=client_id,
-            action=action,
-            result=narrative[:200]
-        )
+        # deque append now + batched DB log write (history_consumer)
+        await record_history(history_entry)
         
     except asyncio.CancelledError:
         # Silently exit on task cancellation
-        print(f"[CANCELLED] Action cancelled for {client_id}")
+        logger.info("[CANCELLED] Action cancelled for %s", client_id)
         return
         
     except Exception as e:
-        # Log the full exception with traceback on the server
-        print(f"[LiteLLM ERROR] Client: {client_id}, Model: {model}, Error: {str(e)}")
-        print(f"[TRACEBACK]\n{traceback.format_exc()}")
+        # Log the full exception with traceback on the server (stdout write happens on the listener thread)
+        logger.exception("[LiteLLM ERROR] Client: %s, Model: %s, Error: %s", client_id, model, e)
         
-        # User-friendly messages by error type
-        error_content = "[ERROR] Reality is temporarily unstable. Please try again."
+        # User-friendly messages by error type (single regex pass)
+        error_content = classify_ai_error(str(e).lower())
         
-        error_lower = str(e).lower()
-        if "api_key" in error_lower or "auth" in error_lower or "invalid" in error_lower or "incorrect" in error_lower:
-            error_content = "[ERROR] Invalid API key. Please check your settings."
-        elif "model" in error_lower or "not found" in error_lower:
-            error_content = f"[ERROR] Model configuration issue. Please verify the model name."
-        elif "quota" in error_lower or "budget" in error_lower:
-            error_content = "💸 Budget/Quota exceeded. Please check your API key balance."
-        elif "rate" in error_lower:
-            error_content = "⏳ Rate limit exceeded. Please slow down."
-        elif "limit" in error_lower or "exceeded" in error_lower:
-            error_content = "⚠️ API usage limit reached. Please check your provider settings."
-        elif "timeout" in error_lower or "timed out" in error_lower:
-            error_content = "[ERROR] Request timed out. Please try again."
-        elif "connection" in error_lower or "network" in error_lower:
-            error_content = "[ERROR] Network error. Please check your internet."
-        
-        await manager.send_personal(json.dumps({
-            "type": "error",
-            "content": error_content,
-            "timestamp": datetime.now().isoformat()
-        }), client_id)
+        await manager.send_message(client_id, "error", error_content, frame_timestamp())
+
+def apply_object_updates(objs: dict, creates, destroys, modifies, tasks_save: list, tasks_delete: list, tasks_modify: list):
+    """
+    Apply create/destroy/modify to the objects dict in one synchronous pass.
+    (world_data_lock 안에서 호출 — await 없음, DB 작업은 tasks_save/tasks_delete/tasks_modify로 반환)
+    Modified objects are returned as ids only; write_behind serializes them at flush (DEFERRED_OBJECT_ROW).
+    """
+    to_int_pos = ensure_int_position
+    object_row = Database.object_row
+    
+    # 1. Handle Creation
+    if isinstance(creates, list):
+        for item in creates:
+            if isinstance(item, dict) and "id" in item:
+                # Ensure position is integers
+                if "position" in item:
+                    item["position"] = to_int_pos(item["position"])
+                objs[item["id"]] = item
+                object_index.index(item["id"], item)
+                # Serialize inside the lock: immutable row snapshot, no dict copy
+                tasks_save.append(object_row(item["id"], item))
+    
+    # 2. Handle Destruction
+    if isinstance(destroys, list):
+        for item_id in destroys:
+            obj = objs.get(item_id)
+            if obj is None or obj.get("indestructible", False):
+                continue
+            del objs[item_id]
+            object_index.unindex(item_id)
+            tasks_delete.append(item_id)
+    
+    # 3. Handle Modification
+    if isinstance(modifies, dict):
+        for item_id, changes in modifies.items():
+            # Strict existence check
+            obj = objs.get(item_id)
+            if obj is None:
+                continue
+            if not isinstance(changes, dict) or len(changes) == 0:
+                continue
+            if "position" in changes:
+                changes["position"] = to_int_pos(changes["position"])
+            
+            # Skip no-op modifications (LLM often repeats the current state)
+            if not any(obj.get(k) != v for k, v in changes.items()):
+                continue
+            
+            # Apply changes
+            obj.update(changes)
+            if "position" in changes:
+                object_index.index(item_id, obj)
+            tasks_modify.append(item_id)
 
 async def apply_world_update_async(update: dict):
     """월드 상태 업데이트 (비동기 - DB 저장 포함)"""
-    global world_data, db_instance
+    global world_data
     
-    if db_instance is None:
-        db_instance = await get_db()
+    # Nothing to apply (LLM often returns {}) → skip the lock entirely
+    creates = update.get("create") or []
+    destroys = update.get("destroy") or []
+    modifies = update.get("modify") or {}
+    if not creates and not destroys and not modifies:
+        return
     
     # DB Tasks
     tasks_save = []
     tasks_delete = []
+    tasks_modify = []
 
     # [LOCK] Memory Update Critical Section
     async with world_data_lock:
-        # 1. Objects dictionary validation
+        # Objects dictionary validation
         if "objects" not in world_data:
             world_data["objects"] = {}
-
-        # 2. Handle Creation
-        creates = update.get("create", [])
-        if isinstance(creates, list):
-            for item in creates:
-                if isinstance(item, dict) and "id" in item:
-                    # Ensure position is integers
-                    if "position" in item:
-                        item["position"] = ensure_int_position(item["position"])
-                    world_data["objects"][item["id"]] = item
-                    tasks_save.append((item["id"], item.copy())) # Copy for DB
         
-        # 3. Handle Destruction
-        destroys = update.get("destroy", [])
-        if isinstance(destroys, list):
-            for item_id in destroys:
-                if item_id in world_data["objects"]:
-                    obj = world_data["objects"][item_id]
-                    if not obj.get("indestructible", False):
-                        del world_data["objects"][item_id]
-                        tasks_delete.append(item_id)
-        
-        # 4. Handle Modification
-        modifies = update.get("modify", {})
-        if isinstance(modifies, dict):
-            for item_id, changes in modifies.items():
-                # Strict existence check
-                if item_id in world_data["objects"]:
-                    if not isinstance(changes, dict) or len(changes) == 0:
-                        continue
-                    if "position" in changes:
-                        changes["position"] = ensure_int_position(changes["position"])
-                    
-                    # Apply changes
-                    world_data["objects"][item_id].update(changes)
-                    tasks_save.append((item_id, world_data["objects"][item_id].copy())) # Copy for DB
+        apply_object_updates(world_data["objects"], creates, destroys, modifies, tasks_save, tasks_delete, tasks_modify)
 
     # [LOCK END] - Process DB tasks outside lock
     
-    # Process saves
-    for obj_id, obj_data in tasks_save:
-        await db_instance.save_object(obj_id, obj_data)
-        
-    # Process deletes
+    # Saves and deletes share the write-behind queue, so a create→destroy in one window stays ordered
+    for row in tasks_save:
+        await write_behind("objects", row[0], row)
+    for obj_id in tasks_modify:
+        await write_behind("objects", obj_id, DEFERRED_OBJECT_ROW)
     for obj_id in tasks_delete:
-        await db_instance.delete_object(obj_id)
+        await write_behind("objects", obj_id, None)
+
 # === Entry Point ===
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop (requirements.txt) when installed — uvicorn builds its loop from it (faster socket I/O for WS fan-out);
+    # stock asyncio otherwise (e.g. Windows). find_spec checks availability without a side-effect import.
+    event_loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    print(f"[SERVER] Event loop: {event_loop}")
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=event_loop, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
 